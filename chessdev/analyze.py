@@ -0,0 +1,252 @@
+"""Batch game analysis: engine scores for every position, blunder flags, one report per game.
+
+Input is a PGN archive (.pgn / .pgn.gz, e.g. from server.py --archive) or a move log
+with one game per line: UCI moves separated by spaces, optionally "<fen> | <moves>".
+Games are sent to a process pool in chunks. Reports are written as JSON lines in
+input order as chunks finish, and that file is the checkpoint: with --resume, games
+already in it are skipped.
+
+    python analyze.py games.pgn -o report.jsonl --depth 4 --workers 8
+    python analyze.py games.pgn -o report.jsonl --resume
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import chess
+import chess.pgn
+
+from pgn_archive import iter_game_texts
+
+# The engine lives with the offline client; its modules import each other by name
+ENGINE_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chessserver", "gpt")
+)
+if ENGINE_DIR not in sys.path:
+    sys.path.append(ENGINE_DIR)
+
+from chess_logic import ChessLogic, move_to_uci  # noqa: E402
+from engine import MATE_BOUND, MATE_SCORE, Engine  # noqa: E402
+
+# Centipawns lost by a move, from the mover's point of view
+BLUNDER = 200
+MISTAKE = 100
+INACCURACY = 50
+# Scores are clamped to this so a missed mate doesn't count as a 100000 cp loss
+SCORE_CLAMP = 1000
+
+_engine = None
+_limits = None
+
+
+def _init_worker(depth, nodes, tt_size):
+    global _engine, _limits
+    _engine = Engine(tt_size)
+    _limits = {"depth": depth, "nodes": nodes}
+
+
+def read_games(path):
+    """Yield (game_id, text) for every game; text is PGN or a move log line."""
+    if path.endswith((".pgn", ".pgn.gz")):
+        for game_id, text in enumerate(iter_game_texts(path)):
+            yield game_id, text
+        return
+    with open(path) as f:
+        game_id = 0
+        for line in f:
+            if line.strip():
+                yield game_id, line
+                game_id += 1
+
+
+def parse_game(text):
+    """(headers, start FEN, [uci, ...]) from PGN text or a move log line."""
+    if text.lstrip().startswith("["):
+        game = chess.pgn.read_game(io.StringIO(text))
+        headers = dict(game.headers)
+        return headers, game.board().fen(), [move.uci() for move in game.mainline_moves()]
+    fen, _, moves = text.rpartition("|")
+    return {}, fen.strip() or chess.STARTING_FEN, moves.split()
+
+
+def position_search(engine, logic, limits):
+    """(score for the side to move, best move) in centipawns; mates are +-MATE_SCORE."""
+    moves = logic.legal_moves()
+    if not moves:
+        return (-MATE_SCORE if logic.in_check() else 0), 0
+    if len(moves) == 1:
+        # Engine.search doesn't score forced moves; score the reply instead
+        undo = logic.make(moves[0])
+        try:
+            return -position_search(engine, logic, limits)[0], moves[0]
+        finally:
+            logic.unmake(moves[0], undo)
+    result = engine.search(logic, **limits)
+    return result.score, result.move
+
+
+def clamp(score):
+    return max(-SCORE_CLAMP, min(SCORE_CLAMP, score))
+
+
+def analyze_game(game_id, text, thresholds):
+    """Compact report for one game."""
+    blunder, mistake, inaccuracy = thresholds
+    headers, fen, moves = parse_game(text)
+    logic = ChessLogic(fen)
+    report = {
+        "id": game_id,
+        "white": headers.get("White", "?"),
+        "black": headers.get("Black", "?"),
+        "result": headers.get("Result", "*"),
+        "plies": 0,
+        "acpl": [0, 0],
+        "blunders": [],
+        "mistakes": [0, 0],
+        "inaccuracies": [0, 0],
+    }
+    lost = [0, 0]
+    counted = [0, 0]
+    score, best = position_search(_engine, logic, _limits)
+    for ply, uci in enumerate(moves):
+        side = logic.side
+        move = logic.parse_uci(uci)
+        if move is None:
+            report["error"] = f"illegal move {uci} at ply {ply}"
+            break
+        logic.make(move)
+        # Every position is searched once: its score is the opponent's view of this move
+        next_score, next_best = position_search(_engine, logic, _limits)
+        loss = max(0, clamp(score) + clamp(next_score))
+        lost[side] += loss
+        counted[side] += 1
+        if loss >= blunder:
+            report["blunders"].append(
+                [ply, uci, move_to_uci(best) if best and best != move else None, loss]
+            )
+        elif loss >= mistake:
+            report["mistakes"][side] += 1
+        elif loss >= inaccuracy:
+            report["inaccuracies"][side] += 1
+        score, best = next_score, next_best
+        report["plies"] = ply + 1
+    report["acpl"] = [lost[s] // counted[s] if counted[s] else 0 for s in (0, 1)]
+    if abs(score) > MATE_BOUND:
+        report["final"] = "mate"
+    return report
+
+
+def analyze_chunk(chunk, thresholds):
+    reports = []
+    for game_id, text in chunk:
+        try:
+            reports.append(analyze_game(game_id, text, thresholds))
+        except Exception as e:
+            # One broken game must not take down the whole chunk
+            reports.append({"id": game_id, "error": repr(e)})
+    return reports
+
+
+def chunks(games, size, skip):
+    chunk = []
+    for game_id, text in games:
+        if game_id in skip:
+            continue
+        chunk.append((game_id, text))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def finished_ids(path):
+    """Game ids already in a report file (the checkpoint)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                # A line cut off by an interrupted write
+                pass
+    return done
+
+
+def run(path, output, workers, chunk_size, depth, nodes, thresholds, resume, tt_size=1 << 16):
+    done = finished_ids(output) if resume else set()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    games = 0
+    plies = 0
+    if resume and os.path.exists(output) and os.path.getsize(output):
+        with open(output, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # Close a line cut off by the interruption so new reports start cleanly
+                f.write(b"\n")
+    with open(output, "a" if resume else "w") as out, Pool(
+        workers, initializer=_init_worker, initargs=(depth, nodes, tt_size)
+    ) as pool:
+        pending = deque()
+
+        def collect():
+            nonlocal games, plies
+            for report in pending.popleft().get():
+                out.write(json.dumps(report, separators=(",", ":")) + "\n")
+                games += 1
+                plies += report.get("plies", 0)
+            # Every finished chunk is on disk before the next one is waited for
+            out.flush()
+
+        for chunk in chunks(read_games(path), chunk_size, done):
+            pending.append(pool.apply_async(analyze_chunk, (chunk, thresholds)))
+            # Keep a couple of chunks per worker in flight; the input is never read ahead further
+            if len(pending) >= 2 * workers:
+                collect()
+        while pending:
+            collect()
+    seconds = time.perf_counter() - start
+    return games, plies, seconds, len(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze games with the engine and flag blunders")
+    parser.add_argument("input", help="PGN archive (.pgn, .pgn.gz) or move log")
+    parser.add_argument("-o", "--output", default="analysis.jsonl", help="report file (JSON lines)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPUs)")
+    parser.add_argument("--chunk", type=int, default=4, help="games per job")
+    parser.add_argument("--depth", type=int, default=3, help="search depth per position")
+    parser.add_argument("--nodes", type=int, default=None, help="node limit per position")
+    parser.add_argument("--blunder", type=int, default=BLUNDER, help="centipawns lost for a blunder")
+    parser.add_argument("--mistake", type=int, default=MISTAKE)
+    parser.add_argument("--inaccuracy", type=int, default=INACCURACY)
+    parser.add_argument("--resume", action="store_true", help="skip games already in the output")
+    args = parser.parse_args()
+
+    games, plies, seconds, skipped = run(
+        args.input,
+        args.output,
+        args.workers,
+        args.chunk,
+        args.depth,
+        args.nodes,
+        (args.blunder, args.mistake, args.inaccuracy),
+        args.resume,
+    )
+    if skipped:
+        print(f"Resumed: {skipped} games were already analyzed")
+    rate = plies / seconds if seconds > 0 else 0
+    print(f"{games} games, {plies} positions in {seconds:.1f}s ({rate:.1f} positions/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Engine seats for server tables.
+
+Searches run in a pool of worker processes, so the event loop only queues jobs and
+awaits futures. Each table has at most one job at a time; jobs wait in a bounded
+queue and every move has a deadline after which a fallback move is played. So does
+a search that fails; a crashed worker pool is replaced for the next job.
+"""
+
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import chess
+
+# The engine lives with the offline client; its modules import each other by name
+ENGINE_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chessserver", "gpt")
+)
+if ENGINE_DIR not in sys.path:
+    sys.path.append(ENGINE_DIR)
+
+BOT_NAME = "bot"
+MIN_MOVETIME = 0.05
+# Kept back from a job's deadline for getting the result out of the worker
+RESULT_MARGIN = 0.05
+# fifo: requests in arrival order (one job per table, so tables take turns);
+# deadline: earliest deadline first, so fast tables are not stuck behind slow ones
+FAIRNESS = ("fifo", "deadline")
+
+BotJob = namedtuple("BotJob", ["table", "ply", "fen", "moves", "movetime", "deadline"])
+
+_engine = None
+
+
+def _init_worker(tt_size, tablebase_paths):
+    global _engine
+    from engine import Engine
+
+    tablebase = None
+    if tablebase_paths:
+        from tablebase import Tablebase
+
+        tablebase = Tablebase(tablebase_paths)
+    _engine = Engine(tt_size, tablebase=tablebase)
+
+
+def _search(fen, moves, movetime):
+    """Runs in a worker: best move in UCI for the position after moves, or None."""
+    from chess_logic import ChessLogic, move_to_uci
+
+    logic = ChessLogic(fen)
+    # Replay the game so the engine sees repetitions
+    for uci in moves:
+        logic.make(logic.parse_uci(uci))
+    result = _engine.search(logic, movetime=movetime)
+    return move_to_uci(result.move) if result.move else None
+
+
+def fallback_move(board):
+    """Any legal move, for when the engine missed its deadline or failed."""
+    moves = list(board.legal_moves)
+    return random.choice(moves).uci() if moves else None
+
+
+def job_fallback(job):
+    board = chess.Board(job.fen)
+    for uci in job.moves:
+        board.push_uci(uci)
+    return fallback_move(board)
+
+
+class BotPool:
+    def __init__(
+        self,
+        workers=None,
+        queue_size=256,
+        movetime=1.0,
+        max_wait=2.0,
+        fairness="fifo",
+        tt_size=1 << 18,
+        book_path=None,
+        tablebase_paths=None,
+    ):
+        if fairness not in FAIRNESS:
+            raise ValueError(f"fairness must be one of {FAIRNESS}")
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.movetime = movetime
+        # How long a job may sit in the queue on top of its movetime
+        self.max_wait = max_wait
+        self.fairness = fairness
+        self.tt_size = tt_size
+        self.tablebase_paths = tablebase_paths
+        self.queue = None
+        self.executor = None
+        self.dispatchers = []
+        # Searches that missed their deadline but still occupy a worker
+        self.abandoned = set()
+        self.seq = itertools.count()
+        self.book = None
+        if book_path:
+            from book import OpeningBook
+
+            self.book = OpeningBook(book_path)
+
+    def start(self, post_move):
+        """Start the workers. post_move(job, uci) is awaited with every finished move."""
+        self.post_move = post_move
+        self.queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+        self.executor = self.make_executor()
+        # One dispatcher per worker keeps at most `workers` searches in flight
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+
+    def make_executor(self):
+        return ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(self.tt_size, self.tablebase_paths)
+        )
+
+    async def close(self):
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.dispatchers = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+
+    def clamp_movetime(self, movetime):
+        if movetime is None:
+            return self.movetime
+        return max(MIN_MOVETIME, min(float(movetime), self.movetime))
+
+    def book_move(self, board):
+        """A book move for a python-chess board in UCI, or None. Cheap enough for the loop."""
+        if self.book is None:
+            return None
+        return self.book.choose(board)
+
+    def submit(self, table, movetime):
+        """Queue a move for the side to move at table; False if the queue is full."""
+        board = table.board
+        now = time.monotonic()
+        job = BotJob(
+            table,
+            board.ply(),
+            board.root().fen(),
+            [mv.uci() for mv in board.move_stack],
+            movetime,
+            now + movetime + self.max_wait,
+        )
+        seq = next(self.seq)
+        priority = job.deadline if self.fairness == "deadline" else seq
+        try:
+            self.queue.put_nowait((priority, seq, job))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def dispatch(self):
+        while True:
+            _, _, job = await self.queue.get()
+            late = None
+            executor = self.executor
+            try:
+                try:
+                    uci, late = await self.run(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Left unanswered, the table would wait for this job forever
+                    print(f"Engine failed at table {job.table.id}, playing a fallback move: {e!r}")
+                    uci = job_fallback(job)
+                    if isinstance(e, BrokenProcessPool) and self.executor is executor:
+                        # A dead worker breaks the whole pool; every later job would fail too
+                        self.executor = self.make_executor()
+                        executor.shutdown(wait=False, cancel_futures=True)
+                if uci is not None:
+                    await self.post_move(job, uci)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Bot move for table {job.table.id} failed: {e!r}")
+            finally:
+                self.queue.task_done()
+            if late is not None:
+                # The worker is still busy with the late search; starting the next job
+                # now would queue more searches in the pool than there are workers
+                self.abandoned.add(late)
+                try:
+                    await asyncio.gather(late, return_exceptions=True)
+                finally:
+                    self.abandoned.discard(late)
+
+    async def run(self, job):
+        """(move in UCI, search future still running past the deadline or None)."""
+        remaining = job.deadline - time.monotonic()
+        movetime = min(job.movetime, remaining - RESULT_MARGIN)
+        if movetime < MIN_MOVETIME:
+            # Waited in the queue too long for any search to finish in time
+            return job_fallback(job), None
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, _search, job.fen, job.moves, movetime)
+        try:
+            # shield: a timeout must not drop the future while the worker still runs it
+            return await asyncio.wait_for(asyncio.shield(future), remaining), None
+        except asyncio.TimeoutError:
+            return job_fallback(job), future
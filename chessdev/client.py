@@ -1,6 +1,7 @@
 import socket
 import pickle
 import cmd
+import itertools
 import shlex
 import sys
 import time
@@ -8,11 +9,21 @@ import pygame
 import os
 import chess
 
+from profiler import SamplingProfiler, default_path
+
 SERVER = "127.0.0.1"
 PORT = 5555
 
+# Профилировщик клиента: F9 в окне партии или команда profile
+profiler = SamplingProfiler()
+
+
+# Идентификаторы запросов для трассировки на сервере: уникальны в пределах процесса клиента
+request_ids = itertools.count(1)
+
 
 def send_recv(sock, data):
+    data = dict(data, rid=f"{os.getpid()}-{next(request_ids)}")
     payload = pickle.dumps(data)
     sock.sendall(len(payload).to_bytes(4, "big") + payload)
     resp_len_bytes = sock.recv(4)
@@ -28,6 +39,17 @@ def send_recv(sock, data):
     return pickle.loads(resp_data)
 
 
+def toggle_profiler():
+    if profiler.running:
+        profiler.stop()
+        path = default_path("client")
+        profiler.dump(path)
+        print(f"Профилировщик остановлен: {profiler.summary()}, записано в {path}")
+    else:
+        profiler.start()
+        print("Профилировщик запущен (F9 или profile — остановить)")
+
+
 def get_table_info(sock, table_id):
     resp = send_recv(sock, {"action": "list_tables"})
     for t in resp["data"]:
@@ -216,6 +238,8 @@ def play_game_pygame(
     pending = None
     promo = None
     game_over = False
+    # Result decided by the server (tablebase adjudication), e.g. "1-0"
+    adjudicated = None
 
     my_is_white = my_color == "white"
     my_is_black = my_color == "black"
@@ -246,6 +270,10 @@ def play_game_pygame(
                     quit_callback()
                 break
 
+            if e.type == pygame.KEYDOWN and e.key == pygame.K_F9:
+                toggle_profiler()
+                continue
+
             if has_left_table:
                 if e.type in [pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN]:
                     running = False
@@ -514,7 +542,12 @@ def play_game_pygame(
             mask = pygame.Surface((SQ * 8, SQ * 8), pygame.SRCALPHA)
             mask.fill(MASK_MATE if board.is_checkmate() else MASK_PATT)
             screen.blit(mask, (0, TOP_MARGIN))
-            if board.is_checkmate():
+            if adjudicated and not board.is_checkmate() and not board.is_stalemate():
+                txt = {"1-0": "Белые победили", "0-1": "Чёрные победили"}.get(
+                    adjudicated, "Ничья"
+                )
+                txt += " (по таблицам)"
+            elif board.is_checkmate():
                 winner = "Чёрные" if board.turn else "Белые"
                 txt = f"Мат. {winner} победили"
             else:
@@ -523,6 +556,9 @@ def play_game_pygame(
             rect = img.get_rect(center=(SQ * 4, TOP_MARGIN + SQ * 4))
             screen.blit(img, rect)
         table_info = get_table_info(sock, table_id)
+        if table_info and table_info.get("result") and not game_over:
+            game_over = True
+            adjudicated = table_info["result"]
         draw_labels(table_info)
         pygame.display.flip()
 
@@ -589,16 +625,21 @@ class ChessCmd(cmd.Cmd):
 
     def do_createtable(self, arg):
         """Создать новый стол для игры. 
-        Использование: createtable [as white|black]
+        Использование: createtable [bot] [as white|black]
         Если цвет не указан, выбирается случайным образом.
+        С опцией bot соперником будет движок сервера.
         Можно создать только один стол одновременно (до leave).
         """
         if self.current_table is not None:
             print("Сначала покиньте текущий стол (leave), чтобы создать новый.")
             return
         args = shlex.split(arg)
+        request = {"action": "createtable"}
+        if args and args[0].lower() == "bot":
+            request["bot"] = True
+            args = args[1:]
         if not args:
-            resp = send_recv(self.sock, {"action": "createtable"})
+            resp = send_recv(self.sock, request)
             print(resp["msg"])
             if resp["status"] == "ok":
                 self.current_table = resp["data"]["table_id"]
@@ -610,7 +651,7 @@ class ChessCmd(cmd.Cmd):
             len(args) == 2 and args[0].lower() == "as" and args[1] in ("white", "black")
         ):
             color = args[1]
-            resp = send_recv(self.sock, {"action": "createtable", "color": color})
+            resp = send_recv(self.sock, dict(request, color=color))
             print(resp["msg"])
             if resp["status"] == "ok":
                 self.current_table = resp["data"]["table_id"]
@@ -619,12 +660,14 @@ class ChessCmd(cmd.Cmd):
                 print("Ждём соперника... Когда он появится, вы получите уведомление.")
                 self.start_table_watcher()
         else:
-            print("Используйте: createtable или createtable as white|black")
+            print("Используйте: createtable [bot] или createtable [bot] as white|black")
 
     def complete_createtable(self, text, line, begidx, endidx):
         parts = shlex.split(line)
+        if len(parts) > 1 and parts[1] == "bot":
+            parts = parts[1:]
         if len(parts) == 1:
-            return ["as"] if "as".startswith(text) else []
+            return [w for w in ["as", "bot"] if w.startswith(text)]
         if len(parts) == 2:
             return [c for c in ["white", "black"] if c.startswith(text)]
         return []
@@ -804,6 +847,46 @@ class ChessCmd(cmd.Cmd):
             table_id, self.sock, my_color=None, flip_board=False, username=self.username
         )
 
+    def do_profile(self, arg):
+        """Сэмплирующий профилировщик (стеки в формате flamegraph).
+        Использование: profile — включить/выключить профилировщик клиента
+                       profile server start|stop <token> — профилировщик сервера
+        """
+        args = shlex.split(arg)
+        if not args:
+            toggle_profiler()
+        elif len(args) == 3 and args[0] == "server" and args[1] in ("start", "stop"):
+            resp = send_recv(
+                self.sock, {"action": "profile", "op": args[1], "token": args[2]}
+            )
+            print(resp["msg"])
+        else:
+            print("Используйте: profile или profile server start|stop <token>")
+
+    def do_trace(self, arg):
+        """Трассировка запросов на сервере (id запросов совпадают с клиентскими).
+        Использование: trace start|stop|dump|clear <token>
+        """
+        args = shlex.split(arg)
+        if len(args) == 2 and args[0] in ("start", "stop", "dump", "clear"):
+            resp = send_recv(self.sock, {"action": "trace", "op": args[0], "token": args[1]})
+            print(resp["msg"])
+        else:
+            print("Используйте: trace start|stop|dump|clear <token>")
+
+    def complete_trace(self, text, line, begidx, endidx):
+        if len(shlex.split(line[:begidx])) == 1:
+            return [w for w in ["start", "stop", "dump", "clear"] if w.startswith(text)]
+        return []
+
+    def complete_profile(self, text, line, begidx, endidx):
+        # Слово, которое сейчас дописывается, ещё не считается готовым аргументом
+        parts = shlex.split(line[:begidx])
+        if len(parts) == 1:
+            return [w for w in ["server"] if w.startswith(text)]
+        if len(parts) == 2 and parts[1] == "server":
+            return [w for w in ["start", "stop"] if w.startswith(text)]
+        return []
 
     def do_quit(self, arg):
         """Завершить работу клиента.
@@ -0,0 +1,308 @@
+"""Server metrics in the Prometheus text exposition format.
+
+Metrics are plain objects bound once at startup. The request path only calls inc()
+or observe() on objects it already holds, with no per-request label formatting.
+Labeled families resolve a child once and the caller keeps it. render() builds the
+text on scrape, and serve_metrics() answers GET /metrics on a local port.
+
+    curl -s localhost:9555/metrics
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+
+# Seconds; covers a dict lookup under the lock up to a stalled loop
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+# Actions the server knows; anything else is counted as "unknown"
+ACTIONS = (
+    "register",
+    "ready_play",
+    "createtable",
+    "list_tables",
+    "join",
+    "move",
+    "get_board",
+    "view",
+    "leave",
+    "profile",
+    "trace",
+)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def get(self):
+        return self.value
+
+
+class Gauge:
+    """A value that is set, or read from func() at scrape time."""
+
+    __slots__ = ("value", "func")
+
+    def __init__(self, func=None):
+        self.value = 0
+        self.func = func
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def get(self):
+        return self.func() if self.func is not None else self.value
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value == value and abs(value) != float("inf") else str(value)
+    return str(value)
+
+
+class Family:
+    """All children of one metric name, one per combination of label values."""
+
+    def __init__(self, name, help_text, kind, labelnames, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = labelnames
+        self.factory = factory
+        self.children = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.factory()
+        return child
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in self.children.items():
+            if self.kind != "histogram":
+                labels = _format_labels(self.labelnames, values)
+                lines.append(f"{self.name}{labels} {_format_value(child.get())}")
+                continue
+            cumulative = 0
+            for bound, count in zip(child.bounds + (None,), child.counts):
+                cumulative += count
+                le = "+Inf" if bound is None else repr(float(bound))
+                labels = _format_labels(self.labelnames, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+
+
+class Registry:
+    def __init__(self):
+        self.families = []
+
+    def add(self, name, help_text, kind, labelnames, factory):
+        family = Family(name, help_text, kind, tuple(labelnames), factory)
+        self.families.append(family)
+        # Unlabeled metrics are used directly
+        return family if labelnames else family.labels()
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.add(name, help_text, "counter", labelnames, Counter)
+
+    def gauge(self, name, help_text, labelnames=(), func=None):
+        return self.add(name, help_text, "gauge", labelnames, lambda: Gauge(func))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.add(name, help_text, "histogram", labelnames, lambda: Histogram(buckets))
+
+    def render(self):
+        lines = []
+        for family in self.families:
+            family.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+class ActionMetrics:
+    """Pre-bound request, error and latency metrics for one action."""
+
+    __slots__ = ("requests", "errors", "latency")
+
+    def __init__(self, requests, errors, latency):
+        self.requests = requests
+        self.errors = errors
+        self.latency = latency
+
+    def record(self, seconds, ok):
+        self.requests.inc()
+        if not ok:
+            self.errors.inc()
+        self.latency.observe(seconds)
+
+
+class TimedLock:
+    """asyncio.Lock that records how long each acquire waited."""
+
+    def __init__(self, lock, histogram):
+        self.lock = lock
+        self.wait = histogram
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        await self.lock.acquire()
+        self.wait.observe(time.perf_counter() - start)
+
+    async def __aexit__(self, *exc):
+        self.lock.release()
+
+    def locked(self):
+        return self.lock.locked()
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a sleep that should wake every interval."""
+
+    def __init__(self, interval=0.25, gauge=None, histogram=None):
+        # Read on every sleep, so a watcher that needs finer samples can lower it
+        self.interval = interval
+        self.gauge = gauge
+        self.histogram = histogram
+        self.last = 0.0
+        # time.perf_counter() at the last wake-up, for watchers on other threads
+        self.woke = time.perf_counter()
+        # Called on the loop with the lag after every sample
+        self.listeners = []
+        self.task = None
+
+    def start(self):
+        self.woke = time.perf_counter()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            interval = self.interval
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.last = max(0.0, loop.time() - start - interval)
+            self.woke = time.perf_counter()
+            if self.gauge is not None:
+                self.gauge.set(self.last)
+            if self.histogram is not None:
+                self.histogram.observe(self.last)
+            for listener in self.listeners:
+                listener(self.last)
+
+
+class ServerMetrics:
+    """Everything ChessServer reports, bound once."""
+
+    def __init__(self, server):
+        registry = self.registry = Registry()
+        requests = registry.counter("chess_requests_total", "Requests handled", ("action",))
+        errors = registry.counter("chess_request_errors_total", "Requests answered with an error", ("action",))
+        latency = registry.histogram(
+            "chess_request_seconds", "Time from decoding a request to encoding its reply", ("action",)
+        )
+        self.actions = {
+            action: ActionMetrics(requests.labels(action), errors.labels(action), latency.labels(action))
+            for action in ACTIONS + ("unknown",)
+        }
+        self.unknown = self.actions["unknown"]
+        self.lock_wait = registry.histogram("chess_lock_wait_seconds", "Time spent waiting for the server lock")
+        self.connections = registry.gauge("chess_connections", "Open client connections")
+        self.bytes_in = registry.counter("chess_received_bytes_total", "Bytes received from clients")
+        self.bytes_out = registry.counter("chess_sent_bytes_total", "Bytes sent to clients")
+        registry.gauge("chess_tables", "Open tables", func=lambda: len(server.tables))
+        registry.gauge(
+            "chess_spectators",
+            "Spectators over all tables",
+            func=lambda: sum(len(t.spectators) for t in list(server.tables.values())),
+        )
+        registry.gauge(
+            "chess_frozen_tables",
+            "Open tables kept in their compact form",
+            func=lambda: sum(t.hot is None for t in list(server.tables.values())),
+        )
+        registry.gauge(
+            "chess_evicted_tables",
+            "Tables evicted to the on-disk store",
+            func=lambda: len(server.store) if server.store is not None else 0,
+        )
+        registry.gauge("chess_users", "Registered users", func=lambda: len(server.users))
+        self.loop_lag = LoopLagMonitor(
+            gauge=registry.gauge("chess_loop_lag_seconds", "Event loop lag at the last sample"),
+            histogram=registry.histogram("chess_loop_lag_hist_seconds", "Event loop lag", buckets=LAG_BUCKETS),
+        )
+
+    def action(self, name):
+        return self.actions.get(name, self.unknown)
+
+
+async def serve_metrics(registry, host, port):
+    """Answer GET /metrics with registry.render(); returns the asyncio server."""
+
+    async def handle(reader, writer):
+        try:
+            request = await reader.readline()
+            # Headers are not needed; read up to the blank line
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.split()
+            path = parts[1].split(b"?")[0] if len(parts) > 1 else b""
+            if path in (b"/metrics", b"/"):
+                status, body = b"200 OK", registry.render().encode("utf-8")
+            else:
+                status, body = b"404 Not Found", b"not found\n"
+            writer.write(
+                b"HTTP/1.0 " + status + b"\r\n"
+                b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
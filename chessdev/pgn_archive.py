@@ -0,0 +1,198 @@
+"""Game archive in PGN: a streaming writer for finished tables and a lazy reader.
+
+The writer appends one game at a time, so archives grow without being held in memory.
+The reader yields games one by one. A plain (not gzipped) archive can also be split
+into byte ranges on game boundaries, so several processes can each parse their own
+slice without the text passing through a parent process.
+
+    python pgn_archive.py stats games.pgn --workers 4
+"""
+
+import argparse
+import datetime
+import gzip
+import io
+import os
+import platform
+from collections import Counter
+from multiprocessing import Pool
+
+import chess
+import chess.pgn
+
+EVENT = "chessdev"
+# The server has no clocks yet; "-" is PGN for "no time control"
+TIME_CONTROL = "-"
+
+
+def open_archive(path, mode):
+    """Open a .pgn or .pgn.gz archive; mode is "rb", "ab" and so on."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def game_text(headers, board):
+    """PGN text for the moves played on a python-chess board."""
+    game = chess.pgn.Game.from_board(board)
+    for name, value in headers.items():
+        game.headers[name] = str(value)
+    exporter = chess.pgn.StringExporter(headers=True, variations=False, comments=False)
+    return game.accept(exporter) + "\n\n"
+
+
+class PGNWriter:
+    """Appends games to an archive file; safe to keep open for the server's lifetime."""
+
+    def __init__(self, path, site=None):
+        self.path = path
+        self.site = site or platform.node() or "?"
+        self.file = open_archive(path, "ab")
+        self.games = 0
+
+    def write_game(self, headers, board):
+        self.file.write(game_text(headers, board).encode("utf-8"))
+        # A crash should lose at most the game being written
+        self.file.flush()
+        self.games += 1
+
+    def write_table(self, table):
+        """Archive a table's game with player, result and time control headers."""
+        board = table.game()
+        if table.result:
+            result, termination = table.result, "adjudication"
+        elif board.is_game_over():
+            result, termination = board.result(), "normal"
+        else:
+            result, termination = "*", "abandoned"
+        started = datetime.datetime.fromtimestamp(table.created)
+        headers = {
+            "Event": EVENT,
+            "Site": self.site,
+            "Date": started.strftime("%Y.%m.%d"),
+            "Round": "-",
+            "White": table.players[chess.WHITE] or table.white or "?",
+            "Black": table.players[chess.BLACK] or table.black or "?",
+            "Result": result,
+            "TimeControl": TIME_CONTROL,
+            "Termination": termination,
+            "TableId": table.id,
+            "StartTime": started.strftime("%H:%M:%S"),
+        }
+        self.write_game(headers, board)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_game_texts(path, start=0, end=None):
+    """Yield the raw text of every game that starts in the byte range [start, end).
+    start must be a game boundary (0 or a value from split_ranges).
+    """
+    with open_archive(path, "rb") as f:
+        if start:
+            f.seek(start)
+        position = start
+        lines = []
+        in_moves = False
+        for line in f:
+            if line.startswith(b"[") and in_moves:
+                # Header after movetext: the previous game is complete
+                yield b"".join(lines).decode("utf-8", errors="replace")
+                lines = []
+                in_moves = False
+                if end is not None and position >= end:
+                    return
+            if line.strip() and not line.startswith(b"["):
+                in_moves = True
+            lines.append(line)
+            position += len(line)
+        if any(line.strip() for line in lines):
+            yield b"".join(lines).decode("utf-8", errors="replace")
+
+
+def iter_games(path, start=0, end=None):
+    """Yield chess.pgn.Game objects lazily."""
+    for text in iter_game_texts(path, start, end):
+        game = chess.pgn.read_game(io.StringIO(text))
+        if game is not None:
+            yield game
+
+
+def split_ranges(path, parts):
+    """Split a plain PGN file into up to parts byte ranges that begin on game boundaries."""
+    size = os.path.getsize(path)
+    if path.endswith(".gz") or parts <= 1 or size == 0:
+        return [(0, None)]
+    starts = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(size * i // parts)
+            # Finish the partial line, then look for a header line after a blank line
+            f.readline()
+            blank = False
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    offset = size
+                    break
+                if blank and line.startswith(b"["):
+                    break
+                blank = not line.strip()
+            if offset > starts[-1] and offset < size:
+                starts.append(offset)
+    return list(zip(starts, starts[1:] + [None]))
+
+
+def _map_range(job):
+    func, path, start, end = job
+    return [func(game) for game in iter_games(path, start, end)]
+
+
+def map_games(func, path, workers=None, parts_per_worker=8):
+    """Apply func (a picklable top-level function) to every game, across processes.
+    Yields lists of results, one per byte range, in completion order.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = split_ranges(path, workers * parts_per_worker)
+    if workers == 1 or len(ranges) == 1:
+        yield [func(game) for game in iter_games(path)]
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(_map_range, [(func, path, s, e) for s, e in ranges])
+
+
+def game_summary(game):
+    return game.headers.get("Result", "*"), game.end().ply()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Work with PGN game archives")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("stats", help="count games, results and plies")
+    stats.add_argument("archive")
+    stats.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        results = Counter()
+        plies = 0
+        for chunk in map_games(game_summary, args.archive, args.workers):
+            for result, game_plies in chunk:
+                results[result] += 1
+                plies += game_plies
+        games = sum(results.values())
+        print(f"{games} games, {plies} plies")
+        for result, count in results.most_common():
+            print(f"  {result:8} {count}")
+
+
+if __name__ == "__main__":
+    main()
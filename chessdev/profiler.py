@@ -0,0 +1,102 @@
+"""Sampling profiler that can be switched on and off in a running process.
+
+A helper thread wakes every interval and records the stack of every other thread
+(or only the given ones) with sys._current_frames(). Nothing is hooked into the
+code being profiled, so asyncio timing stays as it is, unlike under cProfile.
+Stacks are written in the collapsed format that flamegraph.pl, speedscope and
+inferno read: one line per distinct stack, "root;caller;callee count".
+
+    flamegraph.pl server-1234-20250101-120000.folded > server.svg
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+INTERVAL = 0.005
+
+
+def write_stacks(path, counts):
+    """Write collapsed stacks to path; returns the number of distinct stacks."""
+    with open(path, "w") as f:
+        for stack, count in sorted(counts.items()):
+            f.write(f"{stack} {count}\n")
+    return len(counts)
+
+
+def default_path(prefix, directory=".", suffix=".folded"):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"{prefix}-{os.getpid()}-{stamp}{suffix}")
+
+
+class SamplingProfiler:
+    def __init__(self, interval=INTERVAL, thread_ids=None):
+        self.interval = interval
+        # Only sample these threads; None samples all threads but the profiler's own
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.counts = Counter()
+        self.samples = 0
+        self.started = None
+        self.labels = {}
+        self.thread_names = {}
+        self.thread = None
+        self.stopped = threading.Event()
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.counts.clear()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop sampling; the collected stacks stay until the next start()."""
+        if not self.running:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+    def label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            filename = os.path.basename(code.co_filename)
+            label = self.labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def thread_name(self, ident):
+        name = self.thread_names.get(ident)
+        if name is None:
+            self.thread_names = {t.ident: t.name for t in threading.enumerate()}
+            name = self.thread_names.get(ident, f"thread-{ident}")
+        return name
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self.label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(self.thread_name(ident))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def dump(self, path):
+        return write_stacks(path, self.counts)
+
+    def summary(self):
+        seconds = time.perf_counter() - self.started if self.started else 0.0
+        return f"{self.samples} samples over {seconds:.1f}s, {len(self.counts)} distinct stacks"
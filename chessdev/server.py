@@ -1,209 +1,665 @@
+import argparse
 import asyncio
 import pickle
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 import chess
 
+from bots import BOT_NAME, FAIRNESS, BotPool
+from metrics import ServerMetrics, TimedLock, serve_metrics
+from watchdog import LoopWatchdog
+from pgn_archive import PGNWriter
+from profiler import SamplingProfiler, default_path, write_stacks
+from table_store import COLD_AFTER, EVICT_AFTER, INTERVAL, TableLifecycle, TableStore
+from tracing import Tracer
+
 HOST = "0.0.0.0"
 PORT = 5555
+# Actions that need ChessServer.admin_token
+ADMIN_ACTIONS = ("profile", "trace")
+# Metrics are for the operator only, so the endpoint listens on loopback by default
+METRICS_HOST = "127.0.0.1"
+# Shared by every table with no spectators or ready players; replaced on first add
+NO_ONE = frozenset()
+
+
+def parse_uci(uci):
+    """chess.Move for a UCI string, or None if it is malformed."""
+    if not isinstance(uci, str) or not 4 <= len(uci) <= 5:
+        return None
+    try:
+        return chess.Move.from_uci(uci)
+    except ValueError:
+        return None
+
+
+def pack_move(mv):
+    return mv.from_square | mv.to_square << 6 | (mv.promotion or 0) << 12
+
+
+def unpack_move(code):
+    return chess.Move(code & 63, code >> 6 & 63, code >> 12 or None)
 
 
 class Player:
+    __slots__ = ("name",)
+
     def __init__(self, name):
         self.name = name
 
 
 class Table:
+    """One game. The position is kept as every move played, packed two bytes each, plus
+    a board whose move stack only goes back to the last irreversible move (all that
+    repetition checks need). freeze() drops the board, leaving the FEN of its root;
+    it is rebuilt the next time board is read.
+
+    Measured at 40 plies: about 1.8 KB per table while hot and 620 bytes frozen (2 more
+    per move), where a board with the whole game on its stack took 20 KB.
+    """
+
+    __slots__ = (
+        "id",
+        "white",
+        "black",
+        "created",
+        "touched",
+        "players",
+        "spectators",
+        "active_players",
+        "bot",
+        "bot_movetime",
+        "bot_ply",
+        "result",
+        "legal",
+        "legal_ply",
+        "moves",
+        "root",
+        "hot",
+        "cold",
+    )
+
     def __init__(self, tid, white=None, black=None):
         self.id = tid
         self.white = white
         self.black = black
-        self.board = chess.Board()
-        self.spectators = []
-        self.active_players = set()
+        self.created = time.time()
+        # time.monotonic() of the last request that looked the table up
+        self.touched = time.monotonic()
+        # Who actually moved for each side, indexed by chess.WHITE / chess.BLACK; seats
+        # are emptied on leave, the archive needs names
+        self.players = [None, None]
+        self.spectators = NO_ONE
+        self.active_players = NO_ONE
+        # Engine seat: the color it plays, its time per move and the ply it was asked to move at
+        self.bot = None
+        self.bot_movetime = None
+        self.bot_ply = None
+        # Set when the server decides the game, e.g. by tablebase adjudication
+        self.result = None
+        # Legal moves at ply legal_ply. Built only after an illegal attempt: a normal
+        # move is checked once with board.is_legal, but a client that sends one bad
+        # move tends to send more, and those are answered from the set.
+        self.legal = None
+        self.legal_ply = None
+        # Every move played, pack_move()d; the board's move stack is moves[root:]
+        self.moves = array("H")
+        self.root = 0
+        # The board, or None while frozen; then cold is the FEN at moves[root]
+        self.hot = chess.Board()
+        self.cold = None
+
+    @property
+    def board(self):
+        board = self.hot
+        if board is None:
+            board = self.hot = chess.Board(self.cold)
+            for code in self.moves[self.root :]:
+                board.push(unpack_move(code))
+            self.cold = None
+        return board
+
+    def freeze(self):
+        if self.hot is not None:
+            self.cold = self.hot.root().fen()
+            self.hot = None
+            self.legal = None
+            self.legal_ply = None
+
+    def add_active(self, name):
+        self.active_players = self.active_players | {name}
+
+    def state(self):
+        """The table as plain data, for TableStore. No class from this module is in it,
+        so a store written by one entry point loads from any other."""
+        return {
+            "id": self.id,
+            "white": self.white,
+            "black": self.black,
+            "created": self.created,
+            "players": list(self.players),
+            "active_players": sorted(self.active_players),
+            "bot": self.bot,
+            "bot_movetime": self.bot_movetime,
+            "result": self.result,
+            "moves": self.moves.tobytes(),
+            "root": self.root,
+            "fen": self.cold if self.hot is None else self.hot.root().fen(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """A frozen table from state(). Spectators and engine jobs are not carried over."""
+        t = cls(state["id"], state["white"], state["black"])
+        t.created = state["created"]
+        t.players = list(state["players"])
+        if state["active_players"]:
+            t.active_players = frozenset(state["active_players"])
+        t.bot = state["bot"]
+        t.bot_movetime = state["bot_movetime"]
+        t.result = state["result"]
+        t.moves.frombytes(state["moves"])
+        t.root = state["root"]
+        t.hot = None
+        t.cold = state["fen"]
+        return t
+
+    def game(self):
+        """A board with the whole game on its move stack, for export."""
+        board = chess.Board()
+        for code in self.moves:
+            board.push(unpack_move(code))
+        return board
+
+    def is_legal(self, mv):
+        ply = self.board.ply()
+        if self.legal_ply == ply:
+            return mv in self.legal
+        if self.board.is_legal(mv):
+            return True
+        self.legal = set(self.board.legal_moves)
+        self.legal_ply = ply
+        return False
+
+    def push(self, mv):
+        board = self.board
+        if board.is_irreversible(mv):
+            # No earlier position can come back
+            board.clear_stack()
+            self.root = len(self.moves)
+        board.push(mv)
+        self.moves.append(pack_move(mv))
+        self.legal = None
+        self.legal_ply = None
 
 
 class ChessServer:
-    def __init__(self):
+    def __init__(self, bots=None, tablebase=None, archive=None):
         self.users = {}
         self.tables = {}
         self.table_id_seq = 1
-        self.lock = asyncio.Lock()
+        self.metrics = ServerMetrics(self)
+        self.lock = TimedLock(asyncio.Lock(), self.metrics.lock_wait)
+        # LoopWatchdog that reports actions holding the loop too long; None to skip the check
+        self.watchdog = None
+        # Admin actions (profile) need this token; None disables them
+        self.admin_token = None
+        self.profile_dir = "."
+        self.profiler = SamplingProfiler()
+        self.tracer = Tracer()
+        # (write, path, snapshot) left by an admin action; handle() runs it after the lock
+        self.pending_write = None
+        # TableStore holding evicted tables; restore() brings them back
+        self.store = None
+        self.bots = bots
+        # Tables in memory with an engine seat, against max_engine_tables. A separate limit
+        # from the bot queue: a seat holds at most one job, but idle seats hold none.
+        self.engine_tables = 0
+        self.max_engine_tables = 256
+        self.tablebase = tablebase
+        # PGNWriter that receives every closed table's game. Writing (SAN export and the
+        # file write) happens on one background thread, in closing order.
+        self.archive = archive
+        self.archive_thread = ThreadPoolExecutor(1) if archive is not None else None
 
-    async def handle(self, reader, writer):
-        user = None
+    def play_move(self, t, mv, traced=False):
+        """Push chess.Move mv at table t; returns an error message or None. The caller holds the lock.
+        traced: mark the parts in the trace of the request being run (the move action only).
+        """
+        tracer = self.tracer if traced else None
+        if not t.is_legal(mv):
+            return "Illegal move"
+        if tracer is not None:
+            tracer.mark("validate")
+        player = t.white if t.board.turn == chess.WHITE else t.black
+        if player:
+            t.players[t.board.turn] = player
+        t.push(mv)
+        if tracer is not None:
+            tracer.mark("push")
+        self.adjudicate(t)
+        self.request_bot_move(t)
+        if tracer is not None:
+            tracer.mark("adjudicate_bot")
+        return None
+
+    def table(self, tid):
+        """The table with id tid or None, marked as in use. The caller holds the lock."""
+        t = self.tables.get(tid)
+        if t is not None:
+            t.touched = time.monotonic()
+        return t
+
+    async def restore(self, tid):
+        """Bring evicted table tid back before a request that names it runs.
+        The file is read and removed off the loop; only the swap-in takes the lock."""
+        store = self.store
+        loop = asyncio.get_running_loop()
         try:
-            while True:
-                data_len_bytes = await reader.readexactly(4)
-                data_len = int.from_bytes(data_len_bytes, "big")
-                data = await reader.readexactly(data_len)
-                cmd = pickle.loads(data)
-                resp = {"status": "ok", "msg": None, "data": None}
+            state = await loop.run_in_executor(None, store.read, tid)
+            # Its engine job went with the old object; get_board asks again
+            t = Table.from_state(state)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError, TypeError) as e:
+            print(f"Could not restore table {tid}: {e}")
+            async with self.lock:
+                # Don't try again on every request for it
+                store.ids.discard(tid)
+            return
+        async with self.lock:
+            # Another request for it may have got here first
+            if tid in self.tables or tid not in store:
+                return
+            store.ids.discard(tid)
+            self.tables[tid] = t
+            # Over max_engine_tables if need be: the game was already there
+            if t.bot is not None:
+                self.engine_tables += 1
+        await loop.run_in_executor(None, store.remove, tid)
 
-                if cmd["action"] == "register":
-                    name = cmd["name"]
-                    async with self.lock:
-                        if name in self.users:
-                            resp["status"] = "err"
-                            resp["msg"] = "Name taken"
-                        else:
-                            self.users[name] = Player(name)
-                            resp["msg"] = f"Welcome, {name}"
-                            user = name
+    def close_table(self, t):
+        """Remove table t, archiving its game if any moves were played. The caller holds the lock."""
+        del self.tables[t.id]
+        if t.bot is not None:
+            self.engine_tables -= 1
+        if self.archive is not None and t.moves:
+            # Nothing touches t once it is out of self.tables
+            self.archive_thread.submit(self.archive_table, t)
 
-                elif cmd["action"] == "ready_play":
-                    tid = cmd["table_id"]
-                    user = cmd["user"]
-                    async with self.lock:
-                        if tid not in self.tables:
-                            resp["status"] = "err"
-                            resp["msg"] = "No such table"
-                        else:
-                            t = self.tables[tid]
-                            t.active_players.add(user)
-                            resp["msg"] = f"{user} is ready"
+    def archive_table(self, t):
+        try:
+            self.archive.write_table(t)
+        except OSError as e:
+            print(f"Could not archive table {t.id}: {e}")
 
-                elif cmd["action"] == "createtable":
-                    color = cmd.get("color", None)
-                    async with self.lock:
-                        existing_ids = set(self.tables.keys())
-                        tid = 1
-                        while tid in existing_ids:
-                            tid += 1
-                        table = Table(tid)
-                        import random
-
-                        if color is None:
-                            color = random.choice(["white", "black"])
-                        if color == "white":
-                            table.white = user
-                        elif color == "black":
-                            table.black = user
-                        self.tables[tid] = table
-                        resp["data"] = {"table_id": tid, "color": color}
+    def adjudicate(self, t):
+        """End the game at t if the tablebase knows the result. The caller holds the lock."""
+        if self.tablebase is None or t.result is not None or t.board.halfmove_clock:
+            # Only captures and pawn moves can bring a position into the tables
+            return
+        t.result = self.tablebase.adjudicate(t.board)
+
+    def request_bot_move(self, t):
+        """Queue an engine move if the bot is to move at t. The caller holds the lock.
+        Also called on get_board, so a move that did not fit in the queue is retried.
+        """
+        if self.bots is None or t.bot is None or t.board.turn != t.bot or t.result:
+            return
+        if t.bot_ply == t.board.ply() or t.board.is_game_over():
+            return
+        mv = parse_uci(self.bots.book_move(t.board))
+        if mv is not None and self.play_move(t, mv) is None:
+            return
+        if self.bots.submit(t, t.bot_movetime):
+            t.bot_ply = t.board.ply()
+
+    async def post_bot_move(self, job, uci):
+        """Play an engine result through the same path as a client's move action."""
+        async with self.lock:
+            t = job.table
+            # The table may be gone or the position changed while the engine was thinking
+            if self.tables.get(t.id) is not t or t.board.ply() != job.ply:
+                return
+            t.bot_ply = None
+            mv = parse_uci(uci)
+            error = self.play_move(t, mv) if mv is not None else "Malformed move"
+            if error:
+                print(f"Engine move {uci} rejected at table {t.id}: {error}")
+
+    async def write_dump(self, write, resp):
+        """Run a dump an admin action prepared under the lock, in the default executor."""
+        func, path, snapshot = write
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, func, path, snapshot)
+        except OSError as e:
+            resp["status"] = "err"
+            resp["msg"] = f"Could not write {path}: {e}"
+            resp["data"] = None
+
+    def check_request(self, cmd):
+        """Reject what can be rejected without the lock; returns an error response or None.
+        A move action's UCI is parsed here into cmd["move"].
+        """
+        if cmd.get("action") == "move":
+            mv = parse_uci(cmd.get("uci"))
+            if mv is None:
+                return {"status": "err", "msg": "Malformed move", "data": None}
+            cmd["move"] = mv
+        return None
+
+    def run_action(self, cmd, user):
+        """Execute one request; returns (response, user). The caller holds the lock."""
+        resp = {"status": "ok", "msg": None, "data": None}
+        if cmd["action"] == "register":
+            name = cmd["name"]
+            if name in self.users:
+                resp["status"] = "err"
+                resp["msg"] = "Name taken"
+            else:
+                self.users[name] = Player(name)
+                resp["msg"] = f"Welcome, {name}"
+                user = name
+
+        elif cmd["action"] == "ready_play":
+            tid = cmd["table_id"]
+            user = cmd["user"]
+            t = self.table(tid)
+            if t is None:
+                resp["status"] = "err"
+                resp["msg"] = "No such table"
+            else:
+                t.add_active(user)
+                resp["msg"] = f"{user} is ready"
+
+        elif cmd["action"] == "createtable":
+            color = cmd.get("color", None)
+            bot = cmd.get("bot", False)
+            if bot and self.bots is None:
+                resp["status"] = "err"
+                resp["msg"] = "No engine on this server"
+            elif bot and self.engine_tables >= self.max_engine_tables:
+                resp["status"] = "err"
+                resp["msg"] = "All engine seats are taken"
+            else:
+                store = self.store
+                tid = 1
+                while tid in self.tables or (store is not None and tid in store):
+                    tid += 1
+                table = Table(tid)
+                import random
+
+                if color is None:
+                    color = random.choice(["white", "black"])
+                if color == "white":
+                    table.white = user
+                elif color == "black":
+                    table.black = user
+                self.tables[tid] = table
+                resp["data"] = {"table_id": tid, "color": color}
+                resp["msg"] = (
+                    f"Table {tid} created, you play as {color}, waiting for second player"
+                )
+                if bot:
+                    table.bot = chess.BLACK if color == "white" else chess.WHITE
+                    table.bot_movetime = self.bots.clamp_movetime(cmd.get("movetime"))
+                    if table.bot == chess.WHITE:
+                        table.white = BOT_NAME
+                    else:
+                        table.black = BOT_NAME
+                    table.add_active(BOT_NAME)
+                    self.engine_tables += 1
+                    self.request_bot_move(table)
+                    resp["msg"] = f"Table {tid} created, you play as {color} against the engine"
+
+        elif cmd["action"] == "list_tables":
+            # Evicted tables are left out, as is the fast join below: only their ids are in
+            # memory. A request naming one restores it and it is listed again from then on.
+            tables = [
+                {
+                    "id": t.id,
+                    "white": t.white,
+                    "black": t.black,
+                    "in_game": (
+                        t.white is not None and t.black is not None
+                    ),
+                    "bot": t.bot is not None,
+                    "result": t.result,
+                    "active_players": (
+                        list(t.active_players)
+                        if hasattr(t, "active_players")
+                        else []
+                    ),
+                }
+                for t in self.tables.values()
+            ]
+            resp["data"] = tables
+
+        elif cmd["action"] == "join":
+            tid = cmd.get("table_id", None)
+            if tid is None:
+                found = False
+                for t in self.tables.values():
+                    if not (t.white and t.black):
+                        found = True
+                        if not t.white:
+                            t.white = user
+                            color = "white"
+                        else:
+                            t.black = user
+                            color = "black"
+                        resp["data"] = {"table_id": t.id, "color": color}
                         resp["msg"] = (
-                            f"Table {tid} created, you play as {color}, waiting for second player"
+                            f"Fastjoined to table {t.id} as {color}"
                         )
+                        break
+                if not found:
+                    resp["status"] = "err"
+                    resp["msg"] = "No available tables. Create one!"
+            else:
+                t = self.table(tid)
+                if t is None:
+                    resp["status"] = "err"
+                    resp["msg"] = "No such table"
+                else:
+                    color = None
+                    if not t.white:
+                        t.white = user
+                        color = "white"
+                    elif not t.black:
+                        t.black = user
+                        color = "black"
+                    else:
+                        resp["status"] = "err"
+                        resp["msg"] = "Both seats are taken"
+                        color = None
+                    if color:
+                        resp["msg"] = f"You joined table {tid} as {color}"
+                        resp["data"] = {"color": color}
 
-                elif cmd["action"] == "list_tables":
-                    async with self.lock:
-                        tables = [
-                            {
-                                "id": t.id,
-                                "white": t.white,
-                                "black": t.black,
-                                "in_game": (
-                                    t.white is not None and t.black is not None
-                                ),
-                                "active_players": (
-                                    list(t.active_players)
-                                    if hasattr(t, "active_players")
-                                    else []
-                                ),
-                            }
-                            for t in self.tables.values()
-                        ]
-                        resp["data"] = tables
-
-                elif cmd["action"] == "join":
-                    tid = cmd.get("table_id", None)
-                    async with self.lock:
-                        if tid is None:
-                            found = False
-                            for t in self.tables.values():
-                                if not (t.white and t.black):
-                                    found = True
-                                    if not t.white:
-                                        t.white = user
-                                        color = "white"
-                                    else:
-                                        t.black = user
-                                        color = "black"
-                                    resp["data"] = {"table_id": t.id, "color": color}
-                                    resp["msg"] = (
-                                        f"Fastjoined to table {t.id} as {color}"
-                                    )
-                                    break
-                            if not found:
-                                resp["status"] = "err"
-                                resp["msg"] = "No available tables. Create one!"
-                        else:
-                            if tid not in self.tables:
-                                resp["status"] = "err"
-                                resp["msg"] = "No such table"
-                            else:
-                                t = self.tables[tid]
-                                color = None
-                                if not t.white:
-                                    t.white = user
-                                    color = "white"
-                                elif not t.black:
-                                    t.black = user
-                                    color = "black"
-                                else:
-                                    resp["status"] = "err"
-                                    resp["msg"] = "Both seats are taken"
-                                    color = None
-                                if color:
-                                    resp["msg"] = f"You joined table {tid} as {color}"
-                                    resp["data"] = {"color": color}
-
-                elif cmd["action"] == "move":
-                    tid, uci = cmd["table_id"], cmd["uci"]
-                    async with self.lock:
-                        if tid not in self.tables:
-                            resp["status"] = "err"
-                            resp["msg"] = "No such table"
-                        else:
-                            t = self.tables[tid]
-                            mv = chess.Move.from_uci(uci)
-                            if mv in t.board.legal_moves:
-                                t.board.push(mv)
-                                resp["msg"] = "Move accepted"
-                            else:
-                                resp["status"] = "err"
-                                resp["msg"] = "Illegal move"
-
-                elif cmd["action"] == "get_board":
-                    tid = cmd["table_id"]
-                    async with self.lock:
-                        if tid not in self.tables:
-                            resp["status"] = "err"
-                            resp["msg"] = "No such table"
-                        else:
-                            t = self.tables[tid]
-                            resp["data"] = t.board.fen()
+        elif cmd["action"] == "move":
+            # check_request has already parsed the move
+            tid, mv = cmd["table_id"], cmd["move"]
+            t = self.table(tid)
+            if t is None:
+                resp["status"] = "err"
+                resp["msg"] = "No such table"
+            else:
+                if t.result is not None:
+                    resp["status"] = "err"
+                    resp["msg"] = f"Game over: {t.result}"
+                elif t.bot is not None and t.board.turn == t.bot:
+                    resp["status"] = "err"
+                    resp["msg"] = "Not your turn"
+                else:
+                    error = self.play_move(t, mv, traced=True)
+                    if error:
+                        resp["status"] = "err"
+                        resp["msg"] = error
+                    else:
+                        resp["msg"] = "Move accepted"
 
-                elif cmd["action"] == "view":
-                    tid = cmd["table_id"]
-                    async with self.lock:
-                        if tid not in self.tables:
-                            resp["status"] = "err"
-                            resp["msg"] = "No such table"
-                        else:
-                            t = self.tables[tid]
-                            resp["data"] = t.board.fen()
-                elif cmd["action"] == "leave":
-                    tid, color, user = cmd["table_id"], cmd["color"], cmd["user"]
+        elif cmd["action"] == "get_board":
+            tid = cmd["table_id"]
+            t = self.table(tid)
+            if t is None:
+                resp["status"] = "err"
+                resp["msg"] = "No such table"
+            else:
+                self.request_bot_move(t)
+                resp["data"] = t.board.fen()
+
+        elif cmd["action"] == "view":
+            tid = cmd["table_id"]
+            t = self.table(tid)
+            if t is None:
+                resp["status"] = "err"
+                resp["msg"] = "No such table"
+            else:
+                resp["data"] = t.board.fen()
+        elif cmd["action"] == "leave":
+            tid, color, user = cmd["table_id"], cmd["color"], cmd["user"]
+            t = self.table(tid)
+            if t is not None:
+                if color == "white" and t.white == user:
+                    t.white = None
+                elif color == "black" and t.black == user:
+                    t.black = None
+                # A table is closed once no human is seated
+                if all(
+                    p is None or side == t.bot
+                    for p, side in ((t.white, chess.WHITE), (t.black, chess.BLACK))
+                ):
+                    self.close_table(t)
+                resp["msg"] = f"{user} left table {tid} ({color})"
+            else:
+                resp["status"] = "err"
+                resp["msg"] = "No such table"
+        elif cmd["action"] in ADMIN_ACTIONS and (
+            self.admin_token is None or cmd.get("token") != self.admin_token
+        ):
+            resp["status"] = "err"
+            resp["msg"] = "Not allowed"
+        elif cmd["action"] == "profile":
+            op = cmd.get("op")
+            if op == "start":
+                if self.profiler.running:
+                    resp["status"] = "err"
+                    resp["msg"] = "Profiler is already running"
+                else:
+                    self.profiler.start()
+                    resp["msg"] = "Profiler started"
+            elif op == "stop":
+                if not self.profiler.running:
+                    resp["status"] = "err"
+                    resp["msg"] = "Profiler is not running"
+                else:
+                    self.profiler.stop()
+                    path = default_path("server", self.profile_dir)
+                    # A copy: the next start() clears the counts, maybe mid-write
+                    self.pending_write = (write_stacks, path, dict(self.profiler.counts))
+                    resp["msg"] = f"{self.profiler.summary()}, written to {path}"
+                    resp["data"] = {"path": path}
+            else:
+                resp["status"] = "err"
+                resp["msg"] = "Use op start or stop"
+        elif cmd["action"] == "trace":
+            op = cmd.get("op")
+            if op == "start":
+                self.tracer.enabled = True
+                resp["msg"] = "Tracing on"
+            elif op == "stop":
+                self.tracer.enabled = False
+                resp["msg"] = "Tracing off"
+            elif op == "dump":
+                path = default_path("trace", self.profile_dir, ".jsonl")
+                records = self.tracer.snapshot()
+                self.pending_write = (self.tracer.dump, path, records)
+                resp["msg"] = f"{len(records)} requests written to {path}"
+                resp["data"] = {"path": path}
+            elif op == "clear":
+                self.tracer.clear()
+                resp["msg"] = "Trace buffer cleared"
+            else:
+                resp["status"] = "err"
+                resp["msg"] = "Use op start, stop, dump or clear"
+        return resp, user
+
+    async def handle(self, reader, writer):
+        user = None
+        metrics = self.metrics
+        watchdog = self.watchdog
+        tracer = self.tracer
+        metrics.connections.inc()
+        try:
+            while True:
+                data_len_bytes = await reader.readexactly(4)
+                data_len = int.from_bytes(data_len_bytes, "big")
+                data = await reader.readexactly(data_len)
+                started = time.perf_counter()
+                cmd = pickle.loads(data)
+                decoded = time.perf_counter()
+                tracing = tracer.enabled
+                marks = None
+                resp = self.check_request(cmd)
+                tid = cmd.get("table_id")
+                if (
+                    resp is None
+                    and self.store is not None
+                    and isinstance(tid, int)
+                    and tid in self.store
+                    and tid not in self.tables
+                ):
+                    await self.restore(tid)
+                if resp is not None:
+                    acquired = acted = time.perf_counter()
+                else:
                     async with self.lock:
-                        if tid in self.tables:
-                            t = self.tables[tid]
-                            if color == "white" and t.white == user:
-                                t.white = None
-                            elif color == "black" and t.black == user:
-                                t.black = None
-                            if t.white is None and t.black is None:
-                                del self.tables[tid]
-                            resp["msg"] = f"{user} left table {tid} ({color})"
-                        else:
-                            resp["status"] = "err"
-                            resp["msg"] = "No such table"
+                        acquired = time.perf_counter()
+                        if tracing:
+                            tracer.begin()
+                        resp, user = self.run_action(cmd, user)
+                        acted = time.perf_counter()
+                        # Taken before the lock is released: the next request's begin() starts over
+                        if tracing:
+                            marks = tracer.end()
+                        write, self.pending_write = self.pending_write, None
+                    if write is not None:
+                        await self.write_dump(write, resp)
+                written = time.perf_counter()
 
                 out_data = pickle.dumps(resp)
+                done = time.perf_counter()
+                metrics.action(cmd.get("action")).record(done - started, resp["status"] == "ok")
+                # Time this request kept the loop to itself: everything but the lock wait
+                # and a dump's file write
+                busy = (decoded - started) + (acted - acquired) + (done - written)
+                if watchdog is not None and busy > watchdog.threshold:
+                    watchdog.slow_request(
+                        cmd.get("action"),
+                        cmd.get("table_id"),
+                        4 + data_len,
+                        4 + len(out_data),
+                        busy,
+                        started,
+                    )
+                metrics.bytes_in.inc(4 + data_len)
+                metrics.bytes_out.inc(4 + len(out_data))
                 writer.write(len(out_data).to_bytes(4, "big"))
                 writer.write(out_data)
                 await writer.drain()
+                if tracing:
+                    tracer.record(
+                        cmd.get("rid"),
+                        cmd.get("action"),
+                        cmd.get("table_id"),
+                        4 + data_len,
+                        (started, decoded, acquired, acted, done, time.perf_counter()),
+                        marks,
+                    )
         except (asyncio.IncompleteReadError, ConnectionResetError):
             pass
         finally:
+            metrics.connections.dec()
             if user is not None:
                 async with self.lock:
                     if user in self.users:
@@ -213,15 +669,107 @@ class ChessServer:
 
 
 async def main():
-    server = ChessServer()
+    parser = argparse.ArgumentParser(description="Chess table server")
+    parser.add_argument("--bot-workers", type=int, default=None, help="engine processes (default: CPUs)")
+    parser.add_argument("--bot-queue", type=int, default=256, help="engine jobs waiting at most")
+    parser.add_argument("--bot-tables", type=int, default=256, help="tables with an engine seat at most")
+    parser.add_argument("--bot-movetime", type=float, default=1.0, help="maximum engine seconds per move")
+    parser.add_argument("--bot-max-wait", type=float, default=2.0, help="seconds a job may wait in the queue")
+    parser.add_argument("--bot-fairness", choices=FAIRNESS, default="fifo")
+    parser.add_argument("--bot-book", help="opening book file for engine seats")
+    parser.add_argument("--no-bots", action="store_true", help="disable engine seats")
+    parser.add_argument("--archive", help="append finished games to this PGN file (.gz to compress)")
+    parser.add_argument(
+        "--syzygy", action="append", help="Syzygy directory for adjudication and engine seats"
+    )
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument(
+        "--slow-ms",
+        type=float,
+        default=100.0,
+        help="log actions and loop stalls longer than this, with a stack sample (0 disables)",
+    )
+    parser.add_argument("--metrics-host", default=METRICS_HOST)
+    parser.add_argument("--admin-token", help="enables admin actions (profile) for clients with this token")
+    parser.add_argument("--profile-dir", default=".", help="where profile and trace dumps are written")
+    parser.add_argument("--trace", action="store_true", help="trace requests from the start")
+    parser.add_argument("--trace-size", type=int, default=4096, help="requests kept in the trace buffer")
+    parser.add_argument(
+        "--cold-after",
+        type=float,
+        default=COLD_AFTER,
+        help="freeze tables idle for this many seconds to save memory (0 disables)",
+    )
+    parser.add_argument("--store", help="evict idle tables to this directory; they come back on use")
+    parser.add_argument(
+        "--evict-after", type=float, default=EVICT_AFTER, help="seconds idle before a table is evicted"
+    )
+    args = parser.parse_args()
+
+    bots = None
+    if not args.no_bots:
+        bots = BotPool(
+            workers=args.bot_workers,
+            queue_size=args.bot_queue,
+            movetime=args.bot_movetime,
+            max_wait=args.bot_max_wait,
+            fairness=args.bot_fairness,
+            book_path=args.bot_book,
+            tablebase_paths=args.syzygy,
+        )
+    tablebase = None
+    if args.syzygy:
+        # bots put the engine directory on sys.path
+        from tablebase import Tablebase
+
+        tablebase = Tablebase(args.syzygy)
+    archive = PGNWriter(args.archive) if args.archive else None
+    server = ChessServer(bots, tablebase, archive)
+    server.max_engine_tables = args.bot_tables
+    server.admin_token = args.admin_token
+    server.profile_dir = args.profile_dir
+    server.tracer = Tracer(args.trace_size)
+    server.tracer.enabled = args.trace
+    if args.store:
+        server.store = TableStore(args.store)
+    if bots is not None:
+        bots.start(server.post_bot_move)
 
     async def handle_conn(reader, writer):
         await server.handle(reader, writer)
 
     srv = await asyncio.start_server(handle_conn, HOST, PORT)
     print(f"Async server listening on {HOST}:{PORT}")
-    async with srv:
-        await srv.serve_forever()
+    server.metrics.loop_lag.start()
+    if args.slow_ms > 0:
+        server.watchdog = LoopWatchdog(server.metrics.loop_lag, args.slow_ms / 1000)
+        server.watchdog.start()
+    metrics_srv = None
+    if args.metrics_port:
+        metrics_srv = await serve_metrics(server.metrics.registry, args.metrics_host, args.metrics_port)
+        print(f"Metrics on http://{args.metrics_host}:{args.metrics_port}/metrics")
+    lifecycle = None
+    if args.cold_after > 0 or server.store is not None:
+        interval = min(INTERVAL, args.cold_after or INTERVAL, args.evict_after)
+        lifecycle = TableLifecycle(server, server.store, args.cold_after, args.evict_after, interval)
+        lifecycle.start()
+    try:
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        if server.watchdog is not None:
+            server.watchdog.stop()
+        await server.metrics.loop_lag.stop()
+        if lifecycle is not None:
+            await lifecycle.stop()
+        server.profiler.stop()
+        if metrics_srv is not None:
+            metrics_srv.close()
+        if bots is not None:
+            await bots.close()
+        if archive is not None:
+            server.archive_thread.shutdown(wait=True)
+            archive.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""Table lifecycle: freezing idle tables and evicting abandoned ones to disk.
+
+Tables are closed only when every human has left, so a long-running server keeps
+collecting tables nobody comes back to. TableLifecycle walks the tables in slices
+of bounded size. It takes the server lock for one slice at a time and yields to the
+loop between slices, so requests never wait behind a whole sweep. A table idle for
+cold_after seconds (or finished for one sweep) is frozen. One idle for evict_after
+seconds is written to a TableStore and dropped from memory; the writes run in the
+default executor with the lock released. ChessServer.restore() brings a table back
+before the next request that names it runs. Until then it is not in list_tables
+and fast join does not seat anyone at it.
+"""
+
+import asyncio
+import os
+import pickle
+import time
+
+# Tables looked at per lock hold
+SLICE = 128
+INTERVAL = 30.0
+COLD_AFTER = 300.0
+EVICT_AFTER = 3600.0
+SUFFIX = ".table"
+
+
+class TableStore:
+    """Evicted tables, one pickled Table.state() per table in directory. Survives restarts.
+
+    ids is what the server may restore. It is only changed on the loop under the server
+    lock; the file methods touch nothing else and run in an executor.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.ids = set()
+        for name in os.listdir(directory):
+            stem = name[: -len(SUFFIX)]
+            if name.endswith(SUFFIX) and stem.isdigit():
+                self.ids.add(int(stem))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, tid):
+        return tid in self.ids
+
+    def path(self, tid):
+        return os.path.join(self.directory, f"{tid}{SUFFIX}")
+
+    def write(self, state):
+        path = self.path(state["id"])
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        # A crash mid-write leaves the old file, never half a table
+        os.replace(tmp, path)
+
+    def read(self, tid):
+        with open(self.path(tid), "rb") as f:
+            return pickle.load(f)
+
+    def remove(self, tid):
+        try:
+            os.remove(self.path(tid))
+        except FileNotFoundError:
+            pass
+
+
+class TableLifecycle:
+    def __init__(
+        self,
+        server,
+        store=None,
+        cold_after=COLD_AFTER,
+        evict_after=EVICT_AFTER,
+        interval=INTERVAL,
+        slice_size=SLICE,
+    ):
+        self.server = server
+        # Eviction needs a store; without one tables are only frozen
+        self.store = store
+        # 0 turns freezing off
+        self.cold_after = cold_after
+        self.evict_after = evict_after
+        self.interval = interval
+        self.slice_size = slice_size
+        self.frozen = 0
+        self.evicted = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # Tables created during the sweep wait for the next one; they are not idle
+            ids = list(self.server.tables)
+            for start in range(0, len(ids), self.slice_size):
+                async with self.server.lock:
+                    due = self.sweep(ids[start : start + self.slice_size])
+                if due:
+                    await self.evict(due)
+                await asyncio.sleep(0)
+
+    def sweep(self, ids):
+        """Freeze the given tables where due; returns [(table, touched, state), ...] for
+        the ones due for eviction. The caller holds the lock."""
+        now = time.monotonic()
+        tables = self.server.tables
+        due = []
+        for tid in ids:
+            t = tables.get(tid)
+            if t is None:
+                continue
+            unused = now - t.touched
+            # Not while the engine is thinking: its answer is matched to this object
+            if self.store is not None and unused > self.evict_after and t.bot_ply is None:
+                t.freeze()
+                due.append((t, t.touched, t.state()))
+            elif t.hot is not None and self.cold_after > 0:
+                if unused > self.cold_after or (t.result is not None and unused > self.interval):
+                    t.freeze()
+                    self.frozen += 1
+        return due
+
+    async def evict(self, due):
+        """Write the snapshots from sweep() with the lock released, then drop each table
+        that nobody used meanwhile. A table that was used stays and its file goes."""
+        loop = asyncio.get_running_loop()
+        store = self.store
+        written = []
+        for t, touched, state in due:
+            try:
+                await loop.run_in_executor(None, store.write, state)
+            except OSError as e:
+                print(f"Could not evict table {t.id}: {e}")
+                continue
+            written.append((t, touched, state))
+        stale = []
+        async with self.server.lock:
+            tables = self.server.tables
+            for t, touched, state in written:
+                if (
+                    tables.get(t.id) is t
+                    and t.touched == touched
+                    and t.bot_ply is None
+                    and t.state() == state
+                ):
+                    del tables[t.id]
+                    if t.bot is not None:
+                        self.server.engine_tables -= 1
+                    store.ids.add(t.id)
+                    self.evicted += 1
+                else:
+                    stale.append(t.id)
+        for tid in stale:
+            await loop.run_in_executor(None, store.remove, tid)
@@ -0,0 +1,70 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bots
+from bots import BotPool
+from server import ChessServer
+
+
+def broken_search(fen, moves, movetime):
+    raise RuntimeError("engine crashed")
+
+
+async def bot_table(make_executor):
+    """A server whose engine runs make_executor()'s executor; returns (server, pool, table)."""
+    pool = BotPool(workers=1, movetime=0.2, max_wait=1.0)
+    pool.make_executor = make_executor
+    server = ChessServer(bots=pool)
+    pool.start(server.post_bot_move)
+    # The engine plays white, so it is asked for a move right away
+    resp, _ = server.run_action({"action": "createtable", "color": "black", "bot": True}, "human")
+    assert resp["status"] == "ok"
+    return server, pool, server.tables[resp["data"]["table_id"]]
+
+
+async def wait_for_move(table):
+    for _ in range(100):
+        if table.moves:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_failed_search_plays_fallback(monkeypatch):
+    monkeypatch.setattr(bots, "_search", broken_search)
+
+    async def main():
+        server, pool, table = await bot_table(lambda: ThreadPoolExecutor(1))
+        try:
+            await wait_for_move(table)
+        finally:
+            await pool.close()
+        return table
+
+    table = asyncio.run(main())
+    assert len(table.moves) == 1
+    assert table.bot_ply is None
+
+
+def test_broken_pool_is_replaced():
+    made = []
+
+    class BrokenExecutor(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("a worker died")
+
+    def make_executor():
+        made.append(BrokenExecutor(1))
+        return made[-1]
+
+    async def main():
+        server, pool, table = await bot_table(make_executor)
+        try:
+            await wait_for_move(table)
+        finally:
+            await pool.close()
+        return table
+
+    table = asyncio.run(main())
+    assert len(table.moves) == 1
+    assert len(made) == 2
@@ -0,0 +1,95 @@
+"""Per-request tracing into a ring buffer, dumped on demand as JSON lines.
+
+Every traced request stores one tuple of perf_counter timestamps, taken at the
+boundaries the server already has:
+- decode: unpickling the request;
+- lock: waiting for the server lock;
+- action: run_action, split further by marks the action sets, e.g. move
+  validation and board.push;
+- encode: pickling the reply;
+- drain: waiting for the socket to take it.
+
+The request id comes from the client's send_recv, so a slow request seen in the
+client can be found in the server's dump. Formatting happens only in dump().
+"""
+
+import json
+import time
+from collections import deque
+
+SPANS = ("decode", "lock", "action", "encode", "drain")
+
+
+class Tracer:
+    def __init__(self, size=4096):
+        self.enabled = False
+        self.buffer = deque(maxlen=size)
+        # Marks set inside the running action, [(name, perf_counter), ...]; None outside
+        # begin()/end(), so code running outside a traced request marks nothing
+        self.marks = None
+        # perf_counter() + offset is wall clock time, for the dump
+        self.offset = time.time() - time.perf_counter()
+
+    def begin(self):
+        """Called right before an action runs; actions run one at a time under the lock."""
+        self.marks = []
+
+    def end(self):
+        """Called right after the action, still under the lock; returns its marks for record()."""
+        marks = self.marks
+        self.marks = None
+        return marks
+
+    def mark(self, name):
+        """End a named part of the running action."""
+        if self.marks is not None:
+            self.marks.append((name, time.perf_counter()))
+
+    def record(self, rid, action, table_id, size, times, marks=None):
+        """times: perf_counter at start, decoded, acquired, acted, encoded, drained.
+        marks: what end() returned for this request, if its action ran."""
+        self.buffer.append((rid, action, table_id, size, times, marks or ()))
+
+    def clear(self):
+        self.buffer.clear()
+
+    def snapshot(self):
+        """The recorded requests as they are now, for dump() on another thread."""
+        return list(self.buffer)
+
+    def entries(self, records=None):
+        if records is None:
+            records = self.snapshot()
+        for rid, action, table_id, size, times, marks in records:
+            spans = {
+                name: round((end - start) * 1e6)
+                for name, start, end in zip(SPANS, times, times[1:])
+            }
+            # Parts of the action, each from the previous mark (or the lock acquire)
+            parts = {}
+            previous = times[2]
+            for name, at in marks:
+                parts[name] = round((at - previous) * 1e6)
+                previous = at
+            entry = {
+                "rid": rid,
+                "action": action,
+                "table": table_id,
+                "bytes": size,
+                "start": round(times[0] + self.offset, 6),
+                "total_us": round((times[-1] - times[0]) * 1e6),
+                "spans_us": spans,
+            }
+            if parts:
+                entry["action_us"] = parts
+            yield entry
+
+    def dump(self, path, records=None):
+        """Write the buffer (or a snapshot() of it) as JSON lines, oldest first; returns the
+        number of requests."""
+        count = 0
+        with open(path, "w") as f:
+            for entry in self.entries(records):
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                count += 1
+        return count
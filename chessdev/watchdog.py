@@ -0,0 +1,104 @@
+"""Event loop watchdog: finds what keeps the loop from running other connections.
+
+The server's LoopLagMonitor (metrics.py) already wakes up at short intervals and
+measures how late it is; the watchdog listens to it instead of running its own
+timer. A helper thread watches the monitor's wake-ups. When the loop has been stuck
+for longer than the threshold, it samples the loop thread's stack while the culprit
+is still on it.
+The server reports every action that ran longer than the threshold without
+yielding (slow_request). The report includes the action, table, payload sizes and
+the stack sampled during that stall. Stalls that no request claims are reported
+by the heartbeat.
+"""
+
+import sys
+import threading
+import time
+import traceback
+
+# Innermost frames kept from a stack sample
+STACK_DEPTH = 12
+
+
+class LoopWatchdog:
+    def __init__(self, monitor, threshold=0.1, interval=None, log=print):
+        # A running LoopLagMonitor
+        self.monitor = monitor
+        self.threshold = threshold
+        # Sample well within the threshold so long stalls are caught while they last
+        self.interval = interval or threshold / 4
+        self.log = log
+        self.loop_thread = None
+        # (taken at, stack text) from the current or last stall, until a report uses it
+        self.sample = None
+        # End of the last slow request reported; stalls before it are already explained
+        self.reported_until = 0.0
+        self.stalls = 0
+        self.slow_requests = 0
+        self.max_lag = 0.0
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        """Start from inside the running loop."""
+        self.loop_thread = threading.get_ident()
+        monitor = self.monitor
+        monitor.interval = min(monitor.interval, self.interval)
+        monitor.listeners.append(self.on_lag)
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.on_lag in self.monitor.listeners:
+            self.monitor.listeners.remove(self.on_lag)
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def on_lag(self, lag):
+        """Called by the monitor on the loop after every sample."""
+        self.max_lag = max(self.max_lag, lag)
+        if lag > self.threshold:
+            self.stalls += 1
+            stalled_from = self.monitor.woke - lag
+            if self.reported_until < stalled_from:
+                # Not a request: bot results, archive hand-off, timers...
+                stack = self.take_sample(stalled_from)
+                message = f"Event loop stalled for {lag * 1000:.0f} ms"
+                self.log(message + (f"\n{stack}" if stack else ""))
+
+    def watch(self):
+        """Helper thread: sample the loop thread's stack once per stall."""
+        monitor = self.monitor
+        sampled_beat = None
+        while not self.stopped.wait(self.interval):
+            beat = monitor.woke
+            if beat == sampled_beat:
+                continue
+            if time.perf_counter() - beat - monitor.interval > self.threshold:
+                frame = sys._current_frames().get(self.loop_thread)
+                if frame is not None:
+                    self.sample = (time.perf_counter(), "".join(traceback.format_stack(frame, STACK_DEPTH)))
+                    sampled_beat = beat
+
+    def take_sample(self, since):
+        """The stack sampled after since, once; None if there is none."""
+        sample = self.sample
+        if sample is None or sample[0] < since:
+            return None
+        self.sample = None
+        return sample[1]
+
+    def slow_request(self, action, table_id, size_in, size_out, busy, started):
+        """Report an action that held the loop for busy seconds, starting at started."""
+        self.slow_requests += 1
+        self.reported_until = time.perf_counter()
+        table = f"table {table_id}" if table_id is not None else "no table"
+        stack = self.take_sample(started)
+        message = (
+            f"Slow action {action!r} ({table}, {size_in} bytes in, {size_out} bytes out): "
+            f"{busy * 1000:.0f} ms"
+        )
+        self.log(message + (f"\n{stack}" if stack else ""))
@@ -66,6 +66,10 @@ class ChessLogic:
     def __init__(self, myside: str = 'w', brd: list = None) -> None:
         self.myside = myside
         self.curr_move = 'w'
+        # Ходы фигур для позиции cache_key: при наведении мыши одни и те же клетки
+        # спрашивают много раз, а после любого хода ключ меняется и кэш сбрасывается
+        self.moves_cache = {}
+        self.cache_key = None
         self.board = []
         if brd:
             self.board = brd
@@ -76,9 +80,22 @@ class ChessLogic:
         self.board[6] = ["P"] * 8
         self.board[7] = ["R", "N", "B", "Q", "K", "B", "N", "R"]
 
+    def position_key(self) -> str:
+        return "".join(piece or "." for line in self.board for piece in line)
+
     def get_legal_moves(self, row: int, col: int) -> dict:
         if not (0 <= row < 8 and 0 <= col < 8):
             return {}
+        key = self.position_key()
+        if key != self.cache_key:
+            self.moves_cache.clear()
+            self.cache_key = key
+        moves = self.moves_cache.get((row, col))
+        if moves is None:
+            moves = self.moves_cache[(row, col)] = self.generate_moves(row, col)
+        return moves
+
+    def generate_moves(self, row: int, col: int) -> dict:
         piece = self.board[row][col]
         if not piece:
             return {}
@@ -210,6 +227,8 @@ class ChessGUI(tk.Tk):
         self.load_images()
 
         self.highlighted_cells = []
+        # Клетка под курсором: подсветку пересчитываем, только когда она меняется
+        self.hover_cell = None
 
         self.board_gui = []
         self.draw_board(True)
@@ -241,6 +260,7 @@ class ChessGUI(tk.Tk):
             self.ismoving = True
             self.moving_params["dragging_piece"] = piece
             self.moving_params["start_pos"] = (row, col)
+            self.hover_cell = None
             self.moving_params["legal_moves"] = self.logic.get_legal_moves(row, col)
 
             # ВАЖНО: подсветку ставим ДО удаления фигуры
@@ -251,9 +271,14 @@ class ChessGUI(tk.Tk):
             self.logic.board[row][col] = ''
             self.draw_board()
 
-            self.moving_params["drag_img_id"] = self.canvas.create_image(
-                event.x, event.y, image=self.images[piece], tags="piece"
-            )
+            # Одна картинка для перетаскивания на всю игру: создаём при первом ходе, дальше переиспользуем
+            drag_id = self.moving_params["drag_img_id"]
+            if drag_id is None:
+                drag_id = self.canvas.create_image(event.x, event.y, tags="piece")
+                self.moving_params["drag_img_id"] = drag_id
+            self.canvas.itemconfig(drag_id, image=self.images[piece], state="normal")
+            self.canvas.coords(drag_id, event.x, event.y)
+            self.canvas.tag_raise(drag_id)
             self.moving_params["current_x"] = event.x
             self.moving_params["current_y"] = event.y
 
@@ -300,7 +325,9 @@ class ChessGUI(tk.Tk):
             self.moving_params["start_pos"] = None
             self.ismoving = False
             self.clear_highlight()  # УБИРАЕМ подсветку после хода
+            self.canvas.itemconfig(self.moving_params["drag_img_id"], state="hidden")
             self.draw_board()
+            self.hover_cell = None  # позиция изменилась — подсветка под курсором пересчитается
             return
         else:
             step_x = dx * 0.2
@@ -317,15 +344,17 @@ class ChessGUI(tk.Tk):
 
         col = event.x // CELL_SIZE
         row = event.y // CELL_SIZE
-        if 0 <= col < BOARD_SIZE and 0 <= row < BOARD_SIZE:
-            if self.logic.board[row][col]:
-                legalmoves = self.logic.get_legal_moves(row, col)
-                self.highlight_cells(legalmoves)
-                return
+        cell = (row, col) if 0 <= col < BOARD_SIZE and 0 <= row < BOARD_SIZE else None
+        if cell == self.hover_cell:
+            return  # мышь двигается в пределах той же клетки
+        self.hover_cell = cell
+        if cell and self.logic.board[row][col]:
+            legalmoves = self.logic.get_legal_moves(row, col)
+            self.highlight_cells(legalmoves)
+            return
 
-        # Если мышка не на фигуре — убираем подсветку
+        # Если мышка не на фигуре — убираем подсветку (фигуры перерисовывать не нужно)
         self.clear_highlight()
-        self.draw_board()
 
     def highlight_cells(self, legalmoves: dict[str, list[tuple[int, int]]]) -> None:
         self.clear_highlight()
@@ -352,6 +381,9 @@ class ChessGUI(tk.Tk):
         if first_draw:
             self.canvas.delete("all")
             self.board_gui = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+            # Элемент-картинка фигуры на каждой клетке и фигура, которую он сейчас показывает
+            self.piece_gui = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+            self.piece_shown = [['' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
             for y in range(8):
                 for x in range(8):
                     color = DARK_COLOR if (x + y) % 2 else LIGHT_COLOR
@@ -362,16 +394,24 @@ class ChessGUI(tk.Tk):
                     )
                     self.board_gui[y][x] = rect_id
 
-        # Фигуры отрисовываем всегда заново
-        self.canvas.delete("piece")
+        # Фигуры не пересоздаём: сравниваем доску с тем, что уже нарисовано,
+        # и меняем картинку или прячем элемент только на изменившихся клетках
         for y in range(8):
             for x in range(8):
                 piece = self.logic.board[y][x]
-                if piece:
-                    self.canvas.create_image(
+                if piece == self.piece_shown[y][x]:
+                    continue
+                item = self.piece_gui[y][x]
+                if not piece:
+                    self.canvas.itemconfig(item, state="hidden")
+                elif item is None:
+                    self.piece_gui[y][x] = self.canvas.create_image(
                         (x + 0.5) * CELL_SIZE, (y + 0.5) * CELL_SIZE,
                         image=self.images[piece], tags="piece"
                     )
+                else:
+                    self.canvas.itemconfig(item, image=self.images[piece], state="normal")
+                self.piece_shown[y][x] = piece
 
         # Перерисовываем подсветку по верхнему уровню
         for row, col in self.highlighted_cells:
@@ -0,0 +1,253 @@
+"""Vectorized evaluation of many positions at once with NumPy.
+
+Positions are held as an N x 64 array of ChessLogic piece codes (square 0 is a8) plus
+the side to move. From that the batch can produce N x 12 x 64 piece planes or
+N x 12 bitboards. Material and piece-square terms match engine.evaluate exactly;
+mobility is computed from the bitboards with shift-and-fill attack generation, so
+no Python code runs per position.
+
+    python batch_eval.py --count 200000
+    python batch_eval.py --fens positions.txt --output scores.txt
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from chess_logic import BLACK, KING, PIECE_CODES, START_FEN, ChessLogic
+from engine import KING_EG, KING_MG, PHASE_WEIGHTS, PST
+
+# Plane order: P N B R Q K p n b r q k
+PLANE_CODES = np.array([PIECE_CODES[ch] for ch in "PNBRQKpnbrqk"], dtype=np.uint8)
+# Centipawns per square reached, for knights, bishops, rooks and queens
+MOBILITY_WEIGHTS = (4, 5, 2, 1)
+
+# Material + piece-square value for every (code, square) from white's view; kings are 0 here
+PST_TABLE = np.zeros((16, 64), dtype=np.int32)
+for _code, _values in enumerate(PST):
+    if _values is not None:
+        PST_TABLE[_code] = _values
+PHASE_TABLE = np.array([PHASE_WEIGHTS[code & 7] for code in range(16)], dtype=np.int32)
+KING_MG_TABLE = np.array(KING_MG, dtype=np.int32)
+KING_EG_TABLE = np.array(KING_EG, dtype=np.int32)
+
+# FEN character -> piece code, everything else 0
+FEN_CODES = np.zeros(256, dtype=np.uint8)
+for _ch, _code in PIECE_CODES.items():
+    FEN_CODES[ord(_ch)] = _code
+FEN_EMPTY = {str(n): "." * n for n in range(1, 9)}
+
+# Bit i of a bitboard is square i (a8 = 0, h1 = 63); files are wrap masks for shifts
+FILE_A = np.uint64(sum(1 << (row * 8) for row in range(8)))
+FILE_H = np.uint64(int(FILE_A) << 7)
+FILE_AB = np.uint64(int(FILE_A) | int(FILE_A) << 1)
+FILE_GH = np.uint64(int(FILE_H) | int(FILE_H) >> 1)
+ALL = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _popcount(bitboards):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitboards).astype(np.int32)
+    # NumPy < 2.0: count bits byte by byte
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.int32)
+    return table[bitboards.view(np.uint8)].reshape(bitboards.shape + (8,)).sum(-1)
+
+
+def _shift(bitboards, amount):
+    """Positive amounts move towards h1, negative towards a8."""
+    if amount > 0:
+        return bitboards << np.uint64(amount)
+    return bitboards >> np.uint64(-amount)
+
+
+# (shift, mask applied after the shift so pieces don't wrap around the board)
+DIRECTIONS_ROOK = ((1, ~FILE_A), (-1, ~FILE_H), (8, ALL), (-8, ALL))
+DIRECTIONS_BISHOP = ((9, ~FILE_A), (7, ~FILE_H), (-7, ~FILE_A), (-9, ~FILE_H))
+KNIGHT_STEPS = (
+    (17, ~FILE_A),
+    (15, ~FILE_H),
+    (10, ~FILE_AB),
+    (6, ~FILE_GH),
+    (-6, ~FILE_AB),
+    (-10, ~FILE_GH),
+    (-15, ~FILE_A),
+    (-17, ~FILE_H),
+)
+
+
+def _slide(pieces, empty, directions):
+    """Squares attacked by sliders along directions (Kogge-Stone fill); occupied squares block."""
+    attacks = np.zeros_like(pieces)
+    for step, mask in directions:
+        gen = pieces
+        pro = empty & mask
+        gen = gen | (pro & (_shift(gen, step)))
+        pro = pro & _shift(pro, step)
+        gen = gen | (pro & _shift(gen, 2 * step))
+        pro = pro & _shift(pro, 2 * step)
+        gen = gen | (pro & _shift(gen, 4 * step))
+        attacks |= _shift(gen, step) & mask
+    return attacks
+
+
+def _knight_attacks(knights):
+    attacks = np.zeros_like(knights)
+    for step, mask in KNIGHT_STEPS:
+        attacks |= _shift(knights, step) & mask
+    return attacks
+
+
+class PositionBatch:
+    """N positions as an N x 64 uint8 array of piece codes and an N int8 array of sides."""
+
+    def __init__(self, codes, side):
+        self.codes = np.ascontiguousarray(codes, dtype=np.uint8).reshape(-1, 64)
+        self.side = np.asarray(side, dtype=np.int8).reshape(-1)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_fens(cls, fens):
+        boards = []
+        side = []
+        for fen in fens:
+            placement, color = fen.split(None, 2)[:2]
+            for digit, dots in FEN_EMPTY.items():
+                placement = placement.replace(digit, dots)
+            boards.append(placement.replace("/", ""))
+            side.append(color == "b")
+        raw = np.frombuffer("".join(boards).encode("ascii"), dtype=np.uint8)
+        return cls(FEN_CODES[raw].reshape(-1, 64), side)
+
+    @classmethod
+    def from_logic(cls, logics):
+        logics = list(logics)
+        raw = np.frombuffer(b"".join(bytes(logic.squares) for logic in logics), dtype=np.uint8)
+        return cls(raw.reshape(-1, 64), [logic.side for logic in logics])
+
+    @classmethod
+    def from_planes(cls, planes, side):
+        """From an N x 12 x 64 array of 0/1 planes in PLANE_CODES order."""
+        planes = np.asarray(planes, dtype=np.uint8)
+        return cls(np.einsum("npq,p->nq", planes, PLANE_CODES), side)
+
+    def planes(self):
+        """N x 12 x 64 uint8 piece planes in PLANE_CODES order."""
+        return (self.codes[:, None, :] == PLANE_CODES[None, :, None]).astype(np.uint8)
+
+    def bitboards(self):
+        """N x 12 uint64 bitboards in PLANE_CODES order."""
+        packed = np.packbits(self.planes(), axis=-1, bitorder="little")
+        return packed.view("<u8").reshape(len(self), 12)
+
+
+def features(batch):
+    """Per-position feature arrays, all from white's point of view.
+
+    material_pst: material plus piece-square values (kings tapered by phase)
+    phase:        0 (bare kings) .. 24 (all pieces)
+    mobility:     N x 2 x 4 squares reached by knights, bishops, rooks and queens,
+                  counted once per piece type and excluding own pieces
+    """
+    codes = batch.codes
+    n = len(batch)
+    squares = np.arange(64)
+    score = PST_TABLE[codes, squares].sum(axis=1)
+    phase = np.minimum(PHASE_TABLE[codes].sum(axis=1), 24)
+    for color, table in ((0, 0), (BLACK, 1)):
+        is_king = codes == (KING | color)
+        has_king = is_king.any(axis=1)
+        king = is_king.argmax(axis=1)
+        # Same integer rounding as engine.evaluate
+        king_score = (
+            KING_MG_TABLE[table][king] * phase + KING_EG_TABLE[table][king] * (24 - phase)
+        ) // 24
+        score += np.where(has_king, king_score, 0)
+
+    boards = batch.bitboards()
+    occupied = np.bitwise_or.reduce(boards, axis=1)
+    empty = ~occupied
+    mobility = np.zeros((n, 2, 4), dtype=np.int32)
+    for color in (0, 1):
+        pieces = boards[:, 6 * color : 6 * color + 6]
+        own = np.bitwise_or.reduce(pieces, axis=1)
+        knights, bishops, rooks, queens = pieces[:, 1], pieces[:, 2], pieces[:, 3], pieces[:, 4]
+        reached = (
+            _knight_attacks(knights),
+            _slide(bishops, empty, DIRECTIONS_BISHOP),
+            _slide(rooks, empty, DIRECTIONS_ROOK),
+            _slide(queens, empty, DIRECTIONS_ROOK) | _slide(queens, empty, DIRECTIONS_BISHOP),
+        )
+        for index, attacks in enumerate(reached):
+            mobility[:, color, index] = _popcount(attacks & ~own)
+    return {"material_pst": score, "phase": phase, "mobility": mobility}
+
+
+def evaluate_batch(batch, mobility=True):
+    """Scores in centipawns from each side to move's point of view (int32 array).
+    With mobility=False the result equals engine.evaluate for every position.
+    """
+    feats = features(batch)
+    score = feats["material_pst"]
+    if mobility:
+        weights = np.array(MOBILITY_WEIGHTS, dtype=np.int32)
+        score = score + (feats["mobility"][:, 0] - feats["mobility"][:, 1]) @ weights
+    return np.where(batch.side == 1, -score, score).astype(np.int32)
+
+
+def random_fens(count, seed=0, max_plies=80):
+    """FENs from random games, for benchmarks."""
+    rng = random.Random(seed)
+    logic = ChessLogic()
+    fens = []
+    while len(fens) < count:
+        logic.set_fen(START_FEN)
+        for _ in range(rng.randrange(max_plies)):
+            moves = logic.legal_moves()
+            if not moves:
+                break
+            logic.make(rng.choice(moves))
+        fens.append(logic.fen())
+    return fens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate many positions at once with NumPy")
+    parser.add_argument("--fens", help="file with one FEN per line (default: random positions)")
+    parser.add_argument("--count", type=int, default=100000, help="random positions to generate")
+    parser.add_argument("--chunk", type=int, default=65536, help="positions per batch")
+    parser.add_argument("--no-mobility", action="store_true")
+    parser.add_argument("--output", help="write one score per line to this file")
+    args = parser.parse_args()
+
+    if args.fens:
+        with open(args.fens) as f:
+            fens = [line.strip() for line in f if line.strip()]
+    else:
+        # A few thousand distinct positions repeated up to the requested count
+        base = random_fens(min(args.count, 2000))
+        fens = (base * (args.count // len(base) + 1))[: args.count]
+
+    start = time.perf_counter()
+    batch = PositionBatch.from_fens(fens)
+    parsed = time.perf_counter()
+    scores = []
+    # Chunks keep the temporaries (planes, bitboards) in cache-sized pieces
+    for i in range(0, len(batch), args.chunk):
+        chunk = PositionBatch(batch.codes[i : i + args.chunk], batch.side[i : i + args.chunk])
+        scores.append(evaluate_batch(chunk, mobility=not args.no_mobility))
+    scores = np.concatenate(scores)
+    done = time.perf_counter()
+    print(
+        f"{len(fens)} positions: parse {len(fens) / (parsed - start):,.0f}/s, "
+        f"evaluate {len(fens) / (done - parsed):,.0f}/s"
+    )
+    if args.output:
+        np.savetxt(args.output, scores, fmt="%d")
+
+
+if __name__ == "__main__":
+    main()
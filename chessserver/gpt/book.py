@@ -0,0 +1,244 @@
+"""Opening book: position key -> weighted moves, in a sorted file read through mmap.
+
+File layout (little-endian):
+    header   8 bytes magic, 8 bytes entry count
+    entries  16 bytes each, sorted by key:
+             key (8) | move (2) | weight (2) | reserved (4)
+
+Keys are ChessLogic Zobrist keys; python-chess boards are hashed with the same tables.
+A move is from | to << 6 | promotion << 12 (squares as in ChessLogic, promotion is the
+piece type or 0), so it does not depend on either move generator. Lookups binary search
+the mapped file, so only the pages touched are read.
+
+    python book.py build games.pgn more.pgn -o book.bin --plies 20
+    python book.py probe book.bin --fen "<fen>"
+"""
+
+import argparse
+import mmap
+import random
+import struct
+from collections import defaultdict
+
+from chess_logic import (
+    BLACK,
+    CASTLE_BK,
+    CASTLE_BQ,
+    CASTLE_WK,
+    CASTLE_WQ,
+    START_FEN,
+    ZOBRIST_BLACK_TO_MOVE,
+    ZOBRIST_CASTLING,
+    ZOBRIST_EP_FILE,
+    ZOBRIST_PIECES,
+    ChessLogic,
+    square_name,
+)
+
+try:
+    import chess
+    import chess.pgn
+except ImportError:
+    chess = None
+
+MAGIC = b"CDBOOK1\0"
+HEADER = struct.Struct("<8sQ")
+ENTRY = struct.Struct("<QHHI")
+PROMOTION_CHARS = " pnbrq"
+
+
+def position_key(position):
+    """Zobrist key of a ChessLogic or a python-chess board."""
+    if isinstance(position, ChessLogic):
+        return position.zobrist_key
+    key = 0
+    for square, piece in position.piece_map().items():
+        # python-chess counts squares from a1, ChessLogic from a8
+        code = piece.piece_type | (0 if piece.color else BLACK)
+        key ^= ZOBRIST_PIECES[code][square ^ 56]
+    rights = 0
+    for color, kingside, bit in (
+        (True, True, CASTLE_WK),
+        (True, False, CASTLE_WQ),
+        (False, True, CASTLE_BK),
+        (False, False, CASTLE_BQ),
+    ):
+        if kingside:
+            has_rights = position.has_kingside_castling_rights(color)
+        else:
+            has_rights = position.has_queenside_castling_rights(color)
+        if has_rights:
+            rights |= bit
+    key ^= ZOBRIST_CASTLING[rights]
+    # Like ChessLogic, the file is hashed after every double push, capturable or not
+    if position.ep_square is not None:
+        key ^= ZOBRIST_EP_FILE[position.ep_square & 7]
+    if not position.turn:
+        key ^= ZOBRIST_BLACK_TO_MOVE
+    return key
+
+
+def encode_book_move(uci):
+    from_sq = (8 - int(uci[1])) * 8 + ord(uci[0]) - ord("a")
+    to_sq = (8 - int(uci[3])) * 8 + ord(uci[2]) - ord("a")
+    promotion = PROMOTION_CHARS.index(uci[4]) if len(uci) > 4 else 0
+    return from_sq | to_sq << 6 | promotion << 12
+
+
+def decode_book_move(move):
+    uci = square_name(move & 63) + square_name(move >> 6 & 63)
+    promotion = move >> 12
+    return uci + PROMOTION_CHARS[promotion] if promotion else uci
+
+
+class OpeningBook:
+    """Read-only view of a book file. Use as a context manager or call close()."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self.file.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or len(self.map) != HEADER.size + self.count * ENTRY.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def first_index(self, key):
+        """Index of the first entry with this key (or where it would be)."""
+        unpack = struct.Struct("<Q").unpack_from
+        data = self.map
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if unpack(data, HEADER.size + mid * ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def entries(self, key):
+        """[(uci, weight), ...] for a position key, heaviest first."""
+        result = []
+        index = self.first_index(key)
+        while index < self.count:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.map, HEADER.size + index * ENTRY.size)
+            if entry_key != key:
+                break
+            result.append((decode_book_move(move), weight))
+            index += 1
+        return result
+
+    def moves(self, position):
+        """Book moves for a ChessLogic or python-chess board, heaviest first."""
+        return self.entries(position_key(position))
+
+    def choose(self, position, best=False, rng=random):
+        """A book move in UCI picked at random by weight (or the heaviest), or None."""
+        moves = [(uci, weight) for uci, weight in self.moves(position) if weight > 0]
+        if not moves:
+            return None
+        if best:
+            return moves[0][0]
+        return rng.choices([uci for uci, _ in moves], weights=[w for _, w in moves])[0]
+
+
+def result_points(result, white_to_move):
+    """Weight a move by how the game went for the side that played it (win 2, draw 1)."""
+    if result == "1/2-1/2":
+        return 1
+    if result == "1-0":
+        return 2 if white_to_move else 0
+    if result == "0-1":
+        return 0 if white_to_move else 2
+    return 1
+
+
+def build(pgn_paths, output, plies=20, min_count=1, by_result=True):
+    """Collect the first plies of every game in the PGN files into a book file."""
+    if chess is None:
+        raise RuntimeError("building a book needs python-chess")
+    # key -> move -> [points, times seen]
+    counts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    games = 0
+    for path in pgn_paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                games += 1
+                result = game.headers.get("Result", "*")
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= plies:
+                        break
+                    stats = counts[position_key(board)][encode_book_move(move.uci())]
+                    stats[0] += result_points(result, board.turn) if by_result else 1
+                    stats[1] += 1
+                    board.push(move)
+
+    entries = []
+    for key, moves in counts.items():
+        for move, (points, seen) in moves.items():
+            if seen >= min_count:
+                entries.append((key, move, points))
+    # Scale weights into 16 bits; moves that only ever lost stay at 0 and are never chosen
+    top = max((points for _, _, points in entries), default=1) or 1
+    entries = [(key, move, max(1, points * 0xFFFF // top) if points else 0) for key, move, points in entries]
+    entries.sort(key=lambda e: (e[0], -e[2], e[1]))
+
+    with open(output, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries)))
+        for key, move, weight in entries:
+            f.write(ENTRY.pack(key, move, weight, 0))
+    return games, len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="build a book from PGN files")
+    build_cmd.add_argument("pgn", nargs="+")
+    build_cmd.add_argument("-o", "--output", default="book.bin")
+    build_cmd.add_argument("--plies", type=int, default=20, help="plies per game to include")
+    build_cmd.add_argument("--min-count", type=int, default=1, help="drop moves seen fewer times")
+    build_cmd.add_argument("--no-results", action="store_true", help="weight by frequency only")
+    probe_cmd = commands.add_parser("probe", help="list book moves for a position")
+    probe_cmd.add_argument("book")
+    probe_cmd.add_argument("--fen", default=START_FEN)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        games, entries = build(
+            args.pgn, args.output, args.plies, args.min_count, by_result=not args.no_results
+        )
+        print(f"{games} games -> {entries} entries in {args.output}")
+    else:
+        with OpeningBook(args.book) as book:
+            moves = book.moves(ChessLogic(args.fen))
+            total = sum(weight for _, weight in moves) or 1
+            for uci, weight in moves:
+                print(f"{uci:6} {weight:6} {100 * weight / total:5.1f}%")
+            if not moves:
+                print("(no book moves)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,64 @@
+import time
 import tkinter as tk
+from collections import deque
 from tkinter import Toplevel, messagebox
 from PIL import Image, ImageTk
 
+# Animation timing: one frame every FRAME_MS, a move slides for MOVE_SECONDS
+FRAME_MS = 16
+MOVE_SECONDS = 0.2
+
+
+class AnimationScheduler:
+    """Slides canvas items between points on after() callbacks, any number at once.
+
+    Positions come from the time elapsed since an animation started, so a late frame
+    jumps ahead instead of stretching the animation. on_done() is called when the last
+    running animation finishes.
+    """
+
+    def __init__(self, canvas, on_done=None, frame_ms=FRAME_MS):
+        self.canvas = canvas
+        self.on_done = on_done
+        self.frame_ms = frame_ms
+        self.active = []  # [item, x0, y0, x1, y1, start, duration]
+        self.after_id = None
+
+    @property
+    def busy(self):
+        return bool(self.active)
+
+    def add(self, item, start, end, duration=MOVE_SECONDS):
+        self.canvas.coords(item, *start)
+        self.active.append([item, *start, *end, time.monotonic(), duration])
+        if self.after_id is None:
+            self.after_id = self.canvas.after(self.frame_ms, self.tick)
+
+    def tick(self):
+        self.after_id = None
+        now = time.monotonic()
+        running = []
+        for animation in self.active:
+            item, x0, y0, x1, y1, start, duration = animation
+            t = min(1.0, (now - start) / duration) if duration > 0 else 1.0
+            self.canvas.coords(item, x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+            if t < 1.0:
+                running.append(animation)
+        self.active = running
+        if running:
+            self.after_id = self.canvas.after(self.frame_ms, self.tick)
+        elif self.on_done:
+            self.on_done()
+
+    def cancel(self):
+        """Stop everything, leaving each item at its end point."""
+        if self.after_id is not None:
+            self.canvas.after_cancel(self.after_id)
+            self.after_id = None
+        for item, _, _, x1, y1, _, _ in self.active:
+            self.canvas.coords(item, x1, y1)
+        self.active = []
+
 
 class ChessGUI(tk.Frame):
     def __init__(self, parent, logic, user_color="white", server_move_callback=None):
@@ -41,9 +98,23 @@ class ChessGUI(tk.Frame):
             "k": ImageTk.PhotoImage(file="figures/bk.png"),
         }
 
+        # Canvas items are created once and then moved, reconfigured or hidden:
+        # creating and deleting items is what makes a Tk canvas slow
+        self.square_ids = {}  # (screen_row, screen_col) -> rectangle
+        self.move_marks = {}  # (logic_row, logic_col) -> (dot, ring) move markers
+        self.check_ids = {}  # 'white'/'black' -> king-in-check outline
+        self.pos_to_id = {}
+        self.id_to_pos = {}
+        self.item_piece = {}  # piece item -> piece character it shows
+        self.spare_items = []  # hidden piece items, reused before creating new ones
+        self.highlight_moves = []
+        # Opponent moves that arrived while another move was still animating
+        self.pending_moves = deque()
+        self.animations = AnimationScheduler(self.canvas, on_done=self.on_animations_done)
+
         # Draw board and initial pieces
         self.draw_board()
-        self.draw_pieces()
+        self.sync_pieces()
 
         # Bind mouse events for dragging pieces
         self.canvas.bind("<Button-1>", self.on_piece_press)
@@ -51,8 +122,7 @@ class ChessGUI(tk.Frame):
         self.canvas.bind("<ButtonRelease-1>", self.on_piece_release)
 
     def draw_board(self):
-        """Draw the chess board squares."""
-        self.canvas.delete("square")
+        """Draw the chess board squares, markers and check outlines (recolors them on later calls)."""
         for i in range(8):
             for j in range(8):
                 # Determine logic coordinates for this square depending on orientation
@@ -65,31 +135,111 @@ class ChessGUI(tk.Frame):
                     if (logic_r + logic_c) % 2 == 0
                     else self.dark_color
                 )
+                item = self.square_ids.get((i, j))
+                if item is not None:
+                    self.canvas.itemconfig(item, fill=color, outline=color)
+                    continue
                 x0 = j * self.square_size
                 y0 = i * self.square_size
                 x1 = x0 + self.square_size
                 y1 = y0 + self.square_size
-                self.canvas.create_rectangle(
+                self.square_ids[(i, j)] = self.canvas.create_rectangle(
                     x0, y0, x1, y1, fill=color, outline=color, tags="square"
                 )
+        if self.move_marks:
+            return
+        # Move markers for every square, hidden until a piece is picked up
+        for r in range(8):
+            for c in range(8):
+                tx, ty = self.logic_to_canvas(r, c)
+                # Empty square move: a small dot
+                radius = 10
+                dot = self.canvas.create_oval(
+                    tx - radius,
+                    ty - radius,
+                    tx + radius,
+                    ty + radius,
+                    fill="orange",
+                    outline="",
+                    state="hidden",
+                    tags="highlight",
+                )
+                # Capture move (or en passant target): a red ring
+                radius = self.square_size // 2 - 4
+                ring = self.canvas.create_oval(
+                    tx - radius,
+                    ty - radius,
+                    tx + radius,
+                    ty + radius,
+                    outline="red",
+                    width=3,
+                    state="hidden",
+                    tags="highlight",
+                )
+                self.move_marks[(r, c)] = (dot, ring)
+        for color in ("white", "black"):
+            self.check_ids[color] = self.canvas.create_rectangle(
+                0, 0, 0, 0, outline="red", width=3, state="hidden", tags="check_highlight"
+            )
 
-    def draw_pieces(self):
-        """Draw all pieces on the board according to the logic's board state."""
-        # Initialize mappings from board positions to canvas items
-        self.pos_to_id = {}
-        self.id_to_pos = {}
-        # Draw each piece from logic.board
+    def sync_pieces(self):
+        """Bring the piece items in line with the logic's board state.
+
+        Items whose square still holds the same piece are left alone; the rest are
+        moved to squares that need the same piece, reconfigured for another piece or
+        hidden. Returns [(item, from_pos, to_pos)] for items that changed squares.
+        """
+        board = self.logic.board
+        placed = {}  # square -> item that already shows the right piece
+        free = {}  # piece -> items that have to move or change
+        for pos, item in self.pos_to_id.items():
+            if board[pos[0]][pos[1]] == self.item_piece[item]:
+                placed[pos] = item
+            else:
+                free.setdefault(self.item_piece[item], []).append(item)
+        moved = []
+        missing = []
         for r in range(8):
             for c in range(8):
-                piece = self.logic.board[r][c]
-                if piece:
-                    x, y = self.logic_to_canvas(r, c)
-                    image = self.images.get(piece)
-                    item_id = self.canvas.create_image(x, y, image=image)
-                    self.canvas.tag_raise(item_id)  # raise pieces above squares
-                    self.canvas.addtag_withtag("piece", item_id)
-                    self.pos_to_id[(r, c)] = item_id
-                    self.id_to_pos[item_id] = (r, c)
+                piece = board[r][c]
+                if not piece or (r, c) in placed:
+                    continue
+                items = free.get(piece)
+                if items:
+                    # Same piece somewhere else: that's the one that moved
+                    item = items.pop()
+                    moved.append((item, self.id_to_pos[item], (r, c)))
+                    placed[(r, c)] = item
+                else:
+                    missing.append(((r, c), piece))
+        unused = [item for items in free.values() for item in items]
+        for pos, piece in missing:
+            # Promotions and setups: reuse an item before creating one
+            if unused:
+                # Prefer the promoted pawn's own item (same colour) over a captured piece
+                same = [i for i in unused if self.item_piece[i].isupper() == piece.isupper()]
+                item = same[0] if same else unused[0]
+                unused.remove(item)
+                moved.append((item, self.id_to_pos[item], pos))
+            elif self.spare_items:
+                item = self.spare_items.pop()
+                self.canvas.itemconfig(item, state="normal")
+            else:
+                item = self.canvas.create_image(0, 0, tags="piece")
+            self.canvas.itemconfig(item, image=self.images[piece])
+            self.canvas.coords(item, *self.logic_to_canvas(*pos))
+            self.item_piece[item] = piece
+            placed[pos] = item
+        for item in unused:
+            # Captured pieces
+            self.canvas.itemconfig(item, state="hidden")
+            self.spare_items.append(item)
+            del self.item_piece[item]
+        for item, _, pos in moved:
+            self.canvas.coords(item, *self.logic_to_canvas(*pos))
+        self.pos_to_id = placed
+        self.id_to_pos = {item: pos for pos, item in placed.items()}
+        return moved
 
     def logic_to_canvas(self, row, col):
         """Convert logic board coordinates (row,col) to canvas pixel coordinates (center of square)."""
@@ -149,40 +299,22 @@ class ChessGUI(tk.Frame):
         curr_x, curr_y = self.canvas.coords(item_id)
         self.drag_offset_x = curr_x - event.x
         self.drag_offset_y = curr_y - event.y
-        # Raise the piece above others while dragging
-        self.canvas.tag_raise(item_id)
         # Show possible moves for this piece
         moves = self.logic.generate_moves(self.logic.turn)
         self.highlight_moves = []
         for move in moves:
             if move["from"] == (logic_r, logic_c):
                 tr, tc = move["to"]
-                # Determine display coordinates for target
-                tx, ty = self.logic_to_canvas(tr, tc)
+                dot, ring = self.move_marks[(tr, tc)]
                 if self.logic.board[tr][tc] is None and not move.get("en_passant"):
-                    # Empty square move: draw a small circle
-                    radius = 10
-                    highlight = self.canvas.create_oval(
-                        tx - radius,
-                        ty - radius,
-                        tx + radius,
-                        ty + radius,
-                        fill="orange",
-                        outline="",
-                    )
+                    highlight = dot
                 else:
-                    # Capture move (or en passant target): draw a red outline circle
-                    radius = self.square_size // 2 - 4
-                    highlight = self.canvas.create_oval(
-                        tx - radius,
-                        ty - radius,
-                        tx + radius,
-                        ty + radius,
-                        outline="red",
-                        width=3,
-                    )
-                self.canvas.addtag_withtag("highlight", highlight)
+                    highlight = ring
+                self.canvas.itemconfig(highlight, state="normal")
                 self.highlight_moves.append(highlight)
+        # Markers above the pieces, and the dragged piece above everything
+        self.canvas.tag_raise("highlight")
+        self.canvas.tag_raise(item_id)
 
     def on_piece_drag(self, event):
         """Mouse drag (motion) event - move the currently selected piece with the cursor."""
@@ -197,8 +329,8 @@ class ChessGUI(tk.Frame):
         """Mouse release event - drop the piece and finalize move if legal, or snap back if not."""
         if not self.dragging_piece:
             return
-        # Remove highlight markers
-        self.canvas.delete("highlight")
+        # Hide highlight markers
+        self.hide_highlights()
         # Determine target square nearest to drop point
         logic_target_r, logic_target_c = self.canvas_to_logic(event.x, event.y)
         from_r, from_c = self.drag_start_pos
@@ -263,56 +395,20 @@ class ChessGUI(tk.Frame):
             # If user closed without selecting, default to Queen
             if not chosen_promo:
                 chosen_promo = "Q"
-        # Remove any captured piece's image (for normal captures or en passant)
-        captured_piece_id = None
-        # Normal capture
-        if self.logic.board[logic_target_r][logic_target_c] is not None:
-            captured_piece_id = self.pos_to_id.get((logic_target_r, logic_target_c))
-        # En passant capture (target square is empty but pawn behind is captured)
-        moving_piece = self.logic.board[from_r][from_c]
-        if moving_piece and moving_piece.upper() == "P":
-            if (logic_target_r, logic_target_c) == self.logic.en_passant_target:
-                # Determine captured pawn's position
-                if moving_piece.isupper():
-                    # white pawn capturing downwards
-                    capture_pos = (logic_target_r + 1, logic_target_c)
-                else:
-                    # black pawn capturing upwards
-                    capture_pos = (logic_target_r - 1, logic_target_c)
-                captured_piece_id = self.pos_to_id.get(capture_pos)
-        if captured_piece_id:
-            # Remove the captured piece from canvas and mappings
-            self.canvas.delete(captured_piece_id)
-            if captured_piece_id in self.id_to_pos:
-                cap_pos = self.id_to_pos[captured_piece_id]
-                if cap_pos in self.pos_to_id:
-                    del self.pos_to_id[cap_pos]
-                del self.id_to_pos[captured_piece_id]
-        # Snap the moving piece to the center of target square
+        # Leave the dropped piece where it belongs; sync_pieces handles captures and promotion
         new_x, new_y = self.logic_to_canvas(logic_target_r, logic_target_c)
         self.canvas.coords(item_id, new_x, new_y)
         # Update logic state with the move
         result = self.logic.make_move(
             from_r, from_c, logic_target_r, logic_target_c, promotion=chosen_promo
         )
-        # Update mapping of moved piece
-        if (from_r, from_c) in self.pos_to_id:
-            del self.pos_to_id[(from_r, from_c)]
-        self.pos_to_id[(logic_target_r, logic_target_c)] = item_id
-        self.id_to_pos[item_id] = (logic_target_r, logic_target_c)
-        # If promotion happened, update the piece image on canvas
-        if result and result["promotion"]:
-            new_piece = self.logic.board[logic_target_r][
-                logic_target_c
-            ]  # e.g. 'Q' or 'q'
-            new_image = self.images.get(new_piece)
-            if new_image:
-                self.canvas.itemconfig(item_id, image=new_image)
+        self.sync_pieces()
         # Check for game end conditions (checkmate, stalemate, 50-move rule)
         self.check_game_status()
         if self.game_over:
             return
-        # Opponent's turn: get move from "server"
+        # Opponent's turn: get move from "server". A callback that answers later returns
+        # None here and calls perform_opponent_move itself when the move is ready.
         if self.server_move_callback:
             opp_move = self.server_move_callback(
                 result
@@ -320,149 +416,64 @@ class ChessGUI(tk.Frame):
             if opp_move:
                 self.perform_opponent_move(opp_move)
 
+    def hide_highlights(self):
+        for highlight in self.highlight_moves:
+            self.canvas.itemconfig(highlight, state="hidden")
+        self.highlight_moves = []
+
     def perform_opponent_move(self, move):
-        """Animate and apply the opponent's move (move is a dict with 'from' and 'to', and possibly 'promotion')."""
+        """Animate and apply the opponent's move (move is a dict with 'from' and 'to', and possibly 'promotion').
+
+        Returns at once; moves that arrive during an animation are queued and played in order.
+        """
+        self.pending_moves.append(move)
+        if not self.animating:
+            self.play_next_move()
+
+    def play_next_move(self):
+        if not self.pending_moves or self.game_over:
+            self.pending_moves.clear()
+            self.animating = False
+            return
         self.animating = True
+        move = self.pending_moves.popleft()
         from_r, from_c = move["from"]
         to_r, to_c = move["to"]
-        promo = move.get("promotion")
-        # Determine if there's a capture
-        captured_id = None
-        if move.get("en_passant"):
-            # En passant capture: target square is empty, pawn behind is captured
-            if self.logic.board[from_r][from_c].islower():
-                # black pawn capturing white pawn upward
-                capture_pos = (to_r - 1, to_c)
-            else:
-                # white pawn capturing black pawn downward
-                capture_pos = (to_r + 1, to_c)
-            captured_id = self.pos_to_id.get(capture_pos)
-        else:
-            # Normal capture
-            captured_id = self.pos_to_id.get((to_r, to_c))
-        # Remove captured piece from canvas immediately
-        if captured_id:
-            self.canvas.delete(captured_id)
-            if captured_id in self.id_to_pos:
-                cap_pos = self.id_to_pos[captured_id]
-                if cap_pos in self.pos_to_id:
-                    del self.pos_to_id[cap_pos]
-                del self.id_to_pos[captured_id]
-        # Identify the moving piece's canvas item
-        moving_id = self.pos_to_id.get((from_r, from_c))
-        if not moving_id:
-            # This might happen if moving piece was just created by promotion last move (and mapping updated accordingly).
-            # To handle that scenario properly, ensure mapping is correct. Otherwise, try to find item by logic if needed.
-            for item, pos in self.id_to_pos.items():
-                if pos == (from_r, from_c):
-                    moving_id = item
-                    break
         # Update logic state for opponent's move
-        result = self.logic.make_move(from_r, from_c, to_r, to_c, promotion=promo)
-        # Animate the moving piece from start to end
-        if moving_id:
-            start_x, start_y = self.logic_to_canvas(from_r, from_c)
-            end_x, end_y = self.logic_to_canvas(to_r, to_c)
-            steps = 10
-            dx = (end_x - start_x) / steps
-            dy = (end_y - start_y) / steps
-            # Animation loop using after
-            for i in range(steps):
-                self.canvas.move(moving_id, dx, dy)
-                self.canvas.update()
-                self.canvas.after(20)
-            # Ensure final position exact
-            self.canvas.coords(moving_id, end_x, end_y)
-        # If castling, also move the rook
-        if result and result.get("castle"):
-            king_from = (from_r, from_c)
-            king_to = (to_r, to_c)
-            # Determine rook move from king move
-            if king_to[1] == 6:  # king-side
-                rook_from = (from_r, 7)
-                rook_to = (from_r, 5)
-            else:  # queen-side
-                rook_from = (from_r, 0)
-                rook_to = (from_r, 3)
-            rook_id = self.pos_to_id.get(rook_from)
-            if rook_id:
-                # Animate rook (we can do it quickly without many steps)
-                rx0, ry0 = self.logic_to_canvas(*rook_from)
-                rx1, ry1 = self.logic_to_canvas(*rook_to)
-                self.canvas.coords(rook_id, rx1, ry1)
-                # Update mapping for rook
-                del self.pos_to_id[rook_from]
-                self.pos_to_id[rook_to] = rook_id
-                self.id_to_pos[rook_id] = rook_to
-        # If promotion, update piece image
-        if result and result["promotion"]:
-            new_piece = self.logic.board[to_r][to_c]
-            new_image = self.images.get(new_piece)
-            if new_image and moving_id:
-                self.canvas.itemconfig(moving_id, image=new_image)
-        # Update position mapping for moving piece
-        if moving_id:
-            if (from_r, from_c) in self.pos_to_id:
-                del self.pos_to_id[(from_r, from_c)]
-            self.pos_to_id[(to_r, to_c)] = moving_id
-            self.id_to_pos[moving_id] = (to_r, to_c)
-        # Opponent move done
-        self.animating = False
-        # Check for game over conditions after opponent move
+        self.logic.make_move(from_r, from_c, to_r, to_c, promotion=move.get("promotion"))
+        # Captured pieces disappear and promotions change image right away;
+        # everything that changed squares (king and rook when castling) slides together
+        moved = self.sync_pieces()
+        if not moved:
+            self.on_animations_done()
+            return
+        # Catch up when moves arrive in bursts
+        duration = MOVE_SECONDS / (1 + len(self.pending_moves))
+        for item, start, end in moved:
+            self.canvas.tag_raise(item)
+            self.animations.add(
+                item, self.logic_to_canvas(*start), self.logic_to_canvas(*end), duration
+            )
+
+    def on_animations_done(self):
+        # Check for game over conditions after opponent move, then play the next queued one
         self.check_game_status()
+        self.play_next_move()
 
     def check_game_status(self):
         """Check for check, checkmate, stalemate, or 50-move draw and handle game over."""
-        # Highlight king in check if any
-        self.canvas.delete("check_highlight")
-        if self.logic.is_in_check("white"):
-            # Highlight white king square in red
-            king_pos = None
-            for pos, item in self.pos_to_id.items():
-                if self.logic.board[pos[0]][pos[1]] == "K":
-                    king_pos = pos
-                    break
-            if king_pos:
-                x0 = (
-                    0 if self.user_color == "white" else 7
-                ) * self.square_size  # not directly, better compute as in draw_board
-            # Actually, easier: find white king position and draw rectangle at that logic coordinate
-            if king_pos:
-                # Compute top-left of that square on canvas
-                if self.user_color == "white":
-                    screen_row = king_pos[0]
-                    screen_col = king_pos[1]
-                else:
-                    screen_row = 7 - king_pos[0]
-                    screen_col = 7 - king_pos[1]
-                x0 = screen_col * self.square_size
-                y0 = screen_row * self.square_size
-                x1 = x0 + self.square_size
-                y1 = y0 + self.square_size
-                self.canvas.create_rectangle(
-                    x0, y0, x1, y1, outline="red", width=3, tags="check_highlight"
-                )
-        if self.logic.is_in_check("black"):
-            # Highlight black king square in red
-            king_pos = None
-            for pos, item in self.pos_to_id.items():
-                if self.logic.board[pos[0]][pos[1]] == "k":
-                    king_pos = pos
-                    break
-            if king_pos:
-                if self.user_color == "white":
-                    screen_row = king_pos[0]
-                    screen_col = king_pos[1]
-                else:
-                    screen_row = 7 - king_pos[0]
-                    screen_col = 7 - king_pos[1]
-                x0 = screen_col * self.square_size
-                y0 = screen_row * self.square_size
-                x1 = x0 + self.square_size
-                y1 = y0 + self.square_size
-                self.canvas.create_rectangle(
-                    x0, y0, x1, y1, outline="red", width=3, tags="check_highlight"
-                )
+        # Outline a king in check; the outlines are kept and only moved or hidden
+        kings = self.logic.king_pos
+        for color, item in self.check_ids.items():
+            king_pos = kings[color]
+            if king_pos is None or not self.logic.is_in_check(color):
+                self.canvas.itemconfig(item, state="hidden")
+                continue
+            x, y = self.logic_to_canvas(*king_pos)
+            half = self.square_size // 2
+            self.canvas.coords(item, x - half, y - half, x + half, y + half)
+            self.canvas.itemconfig(item, state="normal")
+            self.canvas.tag_raise(item)
         # Check for no legal moves (mate or stalemate)
         current_color = self.logic.turn
         moves = self.logic.generate_moves(current_color)
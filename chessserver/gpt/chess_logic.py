@@ -1,609 +1,770 @@
-class ChessLogic:
-    def __init__(self):
-        # Initialize board with starting positions.
-        # Board is 8x8 list of lists; row0=rank8, row7=rank1.
-        self.board = [[None] * 8 for _ in range(8)]
-        # Black pieces setup
-        self.board[0] = list("rnbqkbnr")  # a8 through h8
-        self.board[1] = ["p"] * 8  # a7 through h7 (black pawns)
-        # Empty middle
-        for r in range(2, 6):
-            self.board[r] = [None] * 8
-        # White pieces setup
-        self.board[6] = ["P"] * 8  # a2 through h2 (white pawns)
-        self.board[7] = list("RNBQKBNR")  # a1 through h1
-        # Castling rights: use dict with keys 'K','Q','k','q'
-        self.castling_rights = {"K": True, "Q": True, "k": True, "q": True}
-        # En passant target square (row, col) after a pawn moves two steps
-        self.en_passant_target = None
-        # Halfmove counter for 50-move rule
-        self.halfmove_clock = 0
-        # Side to move: 'white' or 'black'
-        self.turn = "white"
+import random
+from collections import namedtuple
 
-    def is_square_attacked(self, row, col, by_color):
-        """Return True if square (row,col) is attacked by any piece of side by_color ('white' or 'black')."""
-        # Pawn attacks: check from perspective of attacking side.
-        if by_color == "white":
-            # White pawns move up (decreasing row) and attack diagonally up-left/up-right.
-            # So a white pawn at (r,c) attacks (r-1,c-1) and (r-1,c+1).
-            # To see if (row,col) is attacked by a white pawn, check if a white pawn exists at (row+1,col-1) or (row+1,col+1).
-            pawn_positions = [(row + 1, col - 1), (row + 1, col + 1)]
-            pawn_piece = "P"
-        else:
-            # Black pawns move down (increasing row) and attack down-left/down-right.
-            # So check if a black pawn is at (row-1,col-1) or (row-1,col+1).
-            pawn_positions = [(row - 1, col - 1), (row - 1, col + 1)]
-            pawn_piece = "p"
-        for pr, pc in pawn_positions:
-            if 0 <= pr < 8 and 0 <= pc < 8:
-                if self.board[pr][pc] == pawn_piece:
-                    return True
-        # Knight attacks: all 8 L-shaped moves.
-        knight_offsets = [
-            (2, 1),
-            (2, -1),
-            (-2, 1),
-            (-2, -1),
-            (1, 2),
-            (1, -2),
-            (-1, 2),
-            (-1, -2),
-        ]
-        knight_piece = "N" if by_color == "white" else "n"
-        for dr, dc in knight_offsets:
-            nr, nc = row + dr, col + dc
-            if 0 <= nr < 8 and 0 <= nc < 8:
-                if self.board[nr][nc] == knight_piece:
-                    return True
-        # King attacks: adjacent one square in any direction.
-        king_offsets = [
-            (-1, -1),
-            (-1, 0),
-            (-1, 1),
-            (0, -1),
-            (0, 1),
-            (1, -1),
-            (1, 0),
-            (1, 1),
-        ]
-        king_piece = "K" if by_color == "white" else "k"
-        for dr, dc in king_offsets:
-            nr, nc = row + dr, col + dc
-            if 0 <= nr < 8 and 0 <= nc < 8:
-                if self.board[nr][nc] == king_piece:
-                    return True
-        # Rook/Queen attacks: horizontal and vertical lines.
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        rook_piece = "R" if by_color == "white" else "r"
-        queen_piece = "Q" if by_color == "white" else "q"
+# Board: a bytearray of 64 piece codes. Square index = row * 8 + col, row 0 = rank 8
+# (the same (row, col) convention the GUI uses). Code 0 is an empty square, 1..6 are
+# the white pieces and setting bit 3 (| BLACK) makes the piece black.
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+BLACK = 8
+PIECE_CHARS = ".PNBRQK..pnbrqk"
+PIECE_CODES = {ch: code for code, ch in enumerate(PIECE_CHARS) if ch != "."}
+
+# Sides are 0 (white) and 1 (black) internally; the dict-based API uses the names
+WHITE_SIDE, BLACK_SIDE = 0, 1
+SIDE_NAMES = ("white", "black")
+SIDES = {"white": WHITE_SIDE, "black": BLACK_SIDE}
+
+# Castling rights bitmask
+CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ = 1, 2, 4, 8
+CASTLING_CHARS = "KQkq"
+# Rights lost when a piece moves from or is captured on a square (king and rook homes)
+CASTLING_LOSS = [0] * 64
+CASTLING_LOSS[60] = CASTLE_WK | CASTLE_WQ  # e1
+CASTLING_LOSS[63] = CASTLE_WK  # h1
+CASTLING_LOSS[56] = CASTLE_WQ  # a1
+CASTLING_LOSS[4] = CASTLE_BK | CASTLE_BQ  # e8
+CASTLING_LOSS[7] = CASTLE_BK  # h8
+CASTLING_LOSS[0] = CASTLE_BQ  # a8
+
+# Packed move: a 16-bit int, bits 0-5 from square, bits 6-11 to square, bits 12-14 flag.
+# For the promotion flags the new piece type is flag - 2 (KNIGHT .. QUEEN).
+FLAG_NORMAL, FLAG_DOUBLE_PUSH, FLAG_CASTLE, FLAG_EN_PASSANT = 0, 1, 2, 3
+FLAG_PROMO_KNIGHT, FLAG_PROMO_BISHOP, FLAG_PROMO_ROOK, FLAG_PROMO_QUEEN = 4, 5, 6, 7
+PROMOTION_FLAGS = {
+    "N": FLAG_PROMO_KNIGHT,
+    "B": FLAG_PROMO_BISHOP,
+    "R": FLAG_PROMO_ROOK,
+    "Q": FLAG_PROMO_QUEEN,
+}
+
+
+def encode_move(from_sq, to_sq, flag=FLAG_NORMAL):
+    return from_sq | to_sq << 6 | flag << 12
+
+
+def square_name(sq):
+    """Square index -> 'e4' style name."""
+    return "abcdefgh"[sq & 7] + str(8 - (sq >> 3))
+
+
+def move_to_uci(move):
+    uci = square_name(move & 63) + square_name(move >> 6 & 63)
+    flag = move >> 12
+    if flag >= FLAG_PROMO_KNIGHT:
+        uci += "nbrq"[flag - FLAG_PROMO_KNIGHT]
+    return uci
+
+
+def move_to_dict(move):
+    """Packed move -> the dict format used by chess_gui.py and main_client.py."""
+    flag = move >> 12
+    result = {
+        "from": divmod(move & 63, 8),
+        "to": divmod(move >> 6 & 63, 8),
+        "promotion": "NBRQ"[flag - FLAG_PROMO_KNIGHT] if flag >= FLAG_PROMO_KNIGHT else None,
+    }
+    if flag == FLAG_CASTLE:
+        result["castle"] = True
+    elif flag == FLAG_EN_PASSANT:
+        result["en_passant"] = True
+    return result
+
+
+# What make_move did, for the dict-based callers; unmake_move takes it back.
+# The search code uses make/unmake with packed moves and the bare undo int instead.
+MoveRecord = namedtuple(
+    "MoveRecord",
+    ["from_sq", "to_sq", "piece", "captured", "promotion", "castle", "en_passant", "move", "undo"],
+)
+
+
+def _step_targets(offsets):
+    """For every square, the squares one (dr, dc) step away that are on the board."""
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        table.append(
+            [(r + dr) * 8 + c + dc for dr, dc in offsets if 0 <= r + dr < 8 and 0 <= c + dc < 8]
+        )
+    return table
+
+
+def _rays(directions, keep_empty=False):
+    """For every square, the list of squares along each direction, nearest first.
+    With keep_empty, directions that leave the board right away get an empty list, so
+    rays[sq][i] is always directions[i]."""
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        rays = []
         for dr, dc in directions:
-            nr, nc = row + dr, col + dc
+            ray = []
+            nr, nc = r + dr, c + dc
             while 0 <= nr < 8 and 0 <= nc < 8:
-                piece = self.board[nr][nc]
-                if piece:
-                    # If we find a piece in this direction
-                    if piece == rook_piece or piece == queen_piece:
-                        return True
-                    # any piece blocks further scanning
-                    break
+                ray.append(nr * 8 + nc)
                 nr += dr
                 nc += dc
-        # Bishop/Queen attacks: diagonal lines.
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        bishop_piece = "B" if by_color == "white" else "b"
-        queen_piece = "Q" if by_color == "white" else "q"
-        for dr, dc in directions:
-            nr, nc = row + dr, col + dc
-            while 0 <= nr < 8 and 0 <= nc < 8:
-                piece = self.board[nr][nc]
-                if piece:
-                    if piece == bishop_piece or piece == queen_piece:
-                        return True
+            if ray or keep_empty:
+                rays.append(ray)
+        table.append(rays)
+    return table
+
+
+def _mask(squares):
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+
+KNIGHT_OFFSETS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+KING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+KNIGHT_TARGETS = _step_targets(KNIGHT_OFFSETS)
+KING_TARGETS = _step_targets(KING_OFFSETS)
+# PAWN_ATTACKS[side][sq]: squares a pawn of that side on sq attacks
+PAWN_ATTACKS = [_step_targets([(-1, -1), (-1, 1)]), _step_targets([(1, -1), (1, 1)])]
+ROOK_RAYS = _rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = _rays(BISHOP_DIRECTIONS)
+QUEEN_RAYS = [ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(64)]
+# All eight directions in opposite pairs (d, d ^ 1), the rook directions first
+LINE_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]
+DIRECTION_RAYS = _rays(LINE_DIRECTIONS, keep_empty=True)
+SLIDER_RAYS = {BISHOP: BISHOP_RAYS, ROOK: ROOK_RAYS, QUEEN: QUEEN_RAYS}
+KNIGHT_MASKS = [_mask(targets) for targets in KNIGHT_TARGETS]
+KING_MASKS = [_mask(targets) for targets in KING_TARGETS]
+PAWN_ATTACK_MASKS = [[_mask(targets) for targets in table] for table in PAWN_ATTACKS]
+
+# Zobrist hashing: one random 64-bit number per (piece, square), castling right,
+# en passant file and side to move. A position key is the XOR of the numbers for
+# everything present, so a move only has to XOR in/out what it changed.
+_zobrist_rng = random.Random(0x0C4E55DE5)
+ZOBRIST_PIECES = [None] * 16
+for _piece in "PNBRQKpnbrqk":
+    ZOBRIST_PIECES[PIECE_CODES[_piece]] = [_zobrist_rng.getrandbits(64) for _ in range(64)]
+_castling_keys = [_zobrist_rng.getrandbits(64) for _ in CASTLING_CHARS]
+# Combined key for every castling rights bitmask
+ZOBRIST_CASTLING = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            ZOBRIST_CASTLING[_rights] ^= _castling_keys[_bit]
+ZOBRIST_EP_FILE = [_zobrist_rng.getrandbits(64) for _ in range(8)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class BoardView:
+    """Read-only 8x8 view of ChessLogic.squares: board[row][col] is 'P'..'k' or None,
+    like the list-of-lists board the GUI was written against."""
+
+    __slots__ = ("squares",)
+
+    def __init__(self, squares):
+        self.squares = squares
+
+    def __getitem__(self, row):
+        return [PIECE_CHARS[code] if code else None for code in self.squares[row * 8 : row * 8 + 8]]
+
+    def __len__(self):
+        return 8
+
+    def __iter__(self):
+        for row in range(8):
+            yield self[row]
+
+
+class ChessLogic:
+    def __init__(self, fen=None):
+        # Piece codes, see PIECE_CHARS; row0=rank8, row7=rank1
+        self.squares = bytearray(64)
+        # Side to move: WHITE_SIDE or BLACK_SIDE
+        self.side = WHITE_SIDE
+        # Castling rights bitmask (CASTLE_WK | CASTLE_WQ | ...)
+        self.castling = 0
+        # En passant target square after a pawn moves two steps, -1 if none
+        self.ep_square = -1
+        # Halfmove counter for 50-move rule
+        self.halfmove_clock = 0
+        # King square per side, -1 if that side has no king
+        self.kings = [-1, -1]
+        # Zobrist key of the current position and of every position before it
+        # since the last set_fen (used for repetition detection)
+        self.zobrist_key = 0
+        self.key_history = []
+        # Per side, how many of its pieces attack each square. make() updates a copy
+        # for the pieces the move affects and unmake() puts the previous pair back
+        # from attack_history, so a check test is one lookup
+        self.attacks = [bytearray(64), bytearray(64)]
+        self.attack_history = []
+        self.set_fen(fen or START_FEN)
+
+    # --- compatibility views for the dict-based API ---
+
+    @property
+    def board(self):
+        return BoardView(self.squares)
+
+    @property
+    def turn(self):
+        return SIDE_NAMES[self.side]
+
+    @property
+    def castling_rights(self):
+        return {ch: bool(self.castling >> bit & 1) for bit, ch in enumerate(CASTLING_CHARS)}
+
+    @property
+    def en_passant_target(self):
+        return divmod(self.ep_square, 8) if self.ep_square >= 0 else None
+
+    @property
+    def king_pos(self):
+        return {
+            name: divmod(self.kings[side], 8) if self.kings[side] >= 0 else None
+            for side, name in enumerate(SIDE_NAMES)
+        }
+
+    def set_fen(self, fen):
+        """Load a position from a FEN string (the fullmove number is ignored)."""
+        fields = fen.split()
+        placement, side = fields[0], fields[1]
+        castling = fields[2] if len(fields) > 2 else "-"
+        ep = fields[3] if len(fields) > 3 else "-"
+        self.squares = bytearray(64)
+        self.kings = [-1, -1]
+        for r, rank in enumerate(placement.split("/")):
+            c = 0
+            for ch in rank:
+                if ch.isdigit():
+                    c += int(ch)
+                else:
+                    code = PIECE_CODES[ch]
+                    self.squares[r * 8 + c] = code
+                    if code & 7 == KING:
+                        self.kings[code >> 3] = r * 8 + c
+                    c += 1
+        self.side = WHITE_SIDE if side == "w" else BLACK_SIDE
+        self.castling = 0
+        for bit, ch in enumerate(CASTLING_CHARS):
+            if ch in castling:
+                self.castling |= 1 << bit
+        if ep == "-":
+            self.ep_square = -1
+        else:
+            self.ep_square = (8 - int(ep[1])) * 8 + ord(ep[0]) - ord("a")
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        self.zobrist_key = self.compute_zobrist()
+        self.key_history = []
+        self.attacks = [bytearray(64), bytearray(64)]
+        for sq, code in enumerate(self.squares):
+            if code:
+                self.add_attacks(sq, code, 1)
+        self.attack_history = []
+
+    def fen(self):
+        """Return the position as a FEN string (the fullmove number is always 1)."""
+        ranks = []
+        for r in range(8):
+            rank, empty = "", 0
+            for code in self.squares[r * 8 : r * 8 + 8]:
+                if not code:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += PIECE_CHARS[code]
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        castling = (
+            "".join(ch for bit, ch in enumerate(CASTLING_CHARS) if self.castling >> bit & 1)
+            or "-"
+        )
+        ep = square_name(self.ep_square) if self.ep_square >= 0 else "-"
+        return (
+            f"{'/'.join(ranks)} {'wb'[self.side]} {castling} {ep} {self.halfmove_clock} 1"
+        )
+
+    def compute_zobrist(self):
+        """Compute the Zobrist key of the position from scratch (make() keeps it up to date)."""
+        key = 0
+        for sq, code in enumerate(self.squares):
+            if code:
+                key ^= ZOBRIST_PIECES[code][sq]
+        key ^= ZOBRIST_CASTLING[self.castling]
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+        if self.side == BLACK_SIDE:
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        return key
+
+    def repetition_count(self):
+        """How many times the current position has occurred, including now.
+        Only positions since the last capture or pawn move can repeat, so the scan stops there.
+        """
+        count = 1
+        key = self.zobrist_key
+        history = self.key_history
+        # Same side to move: look two plies back at a time
+        stop = max(len(history) - self.halfmove_clock, 0) - 1
+        for i in range(len(history) - 2, stop, -2):
+            if history[i] == key:
+                count += 1
+        return count
+
+    def is_repetition(self, count=3):
+        """True if the current position has occurred at least count times."""
+        return self.repetition_count() >= count
+
+    def add_attacks(self, sq, code, delta):
+        """Add delta to the attack counts of every square piece code on sq attacks.
+        Squares holding pieces of either color count as attacked, so a defended piece shows up too.
+        """
+        side = code >> 3
+        counts = self.attacks[side]
+        pt = code & 7
+        if pt == PAWN:
+            targets = PAWN_ATTACKS[side][sq]
+        elif pt == KNIGHT:
+            targets = KNIGHT_TARGETS[sq]
+        elif pt == KING:
+            targets = KING_TARGETS[sq]
+        else:
+            board = self.squares
+            for ray in SLIDER_RAYS[pt][sq]:
+                for target in ray:
+                    counts[target] += delta
+                    if board[target]:
+                        break
+            return
+        for target in targets:
+            counts[target] += delta
+
+    def through_rays(self, sq, delta):
+        """Lengthen (delta 1, sq being emptied) or cut (delta -1, sq being filled) the
+        rays of the sliders that reach sq, beyond it."""
+        board = self.squares
+        rays = DIRECTION_RAYS[sq]
+        for direction in range(8):
+            for source in rays[direction]:
+                code = board[source]
+                if code:
+                    pt = code & 7
+                    if pt == QUEEN or pt == (ROOK if direction < 4 else BISHOP):
+                        counts = self.attacks[code >> 3]
+                        # The slider looks the other way through sq
+                        for target in rays[direction ^ 1]:
+                            counts[target] += delta
+                            if board[target]:
+                                break
                     break
-                nr += dr
-                nc += dc
-        return False
+
+    def remove_piece(self, sq):
+        """Empty sq, keeping the attack counts up to date."""
+        self.add_attacks(sq, self.squares[sq], -1)
+        self.squares[sq] = EMPTY
+        self.through_rays(sq, 1)
+
+    def put_piece(self, sq, code):
+        """Put code on the empty square sq, keeping the attack counts up to date."""
+        self.through_rays(sq, -1)
+        self.squares[sq] = code
+        self.add_attacks(sq, code, 1)
+
+    def square_attacked(self, sq, by_side):
+        """True if square sq is attacked by any piece of by_side."""
+        return self.attacks[by_side][sq] > 0
+
+    def in_check(self, side=None):
+        """True if side's king (default: the side to move) is attacked."""
+        if side is None:
+            side = self.side
+        king = self.kings[side]
+        return king >= 0 and self.attacks[side ^ 1][king] > 0
+
+    def is_square_attacked(self, row, col, by_color):
+        """Return True if square (row,col) is attacked by any piece of side by_color ('white' or 'black')."""
+        return self.square_attacked(row * 8 + col, SIDES[by_color])
 
     def is_in_check(self, color):
         """Return True if the king of the given color is in check."""
-        king_piece = "K" if color == "white" else "k"
-        king_pos = None
-        # Find the king on the board
-        for r in range(8):
-            for c in range(8):
-                if self.board[r][c] == king_piece:
-                    king_pos = (r, c)
-                    break
-            if king_pos:
-                break
-        if not king_pos:
-            return False
-        # Check if enemy attacks the king's position
-        enemy_color = "white" if color == "black" else "black"
-        return self.is_square_attacked(king_pos[0], king_pos[1], enemy_color)
+        return self.in_check(SIDES[color])
 
-    def generate_moves(self, color=None):
-        """Generate all legal moves for the given color (or current turn if color not specified).
-        Returns a list of moves, where each move is a dict with keys: 'from',(row,col); 'to',(row,col); 'promotion' (if pawn promotion).
+    def pseudo_legal_moves(self, side):
+        """Packed moves for side that follow the piece rules but may leave the king in check.
+        Castling is only generated when the king does not pass through an attacked square.
         """
-        if color is None:
-            color = self.turn
+        board = self.squares
         moves = []
-        enemy_color = "white" if color == "black" else "black"
-        is_white = color == "white"
-        # Iterate over all pieces of the given color
-        for r in range(8):
-            for c in range(8):
-                piece = self.board[r][c]
-                if not piece:
-                    continue
-                if is_white and not piece.isupper():
-                    continue
-                if not is_white and not piece.islower():
-                    continue
-                # Determine moves based on piece type
-                pt = piece.upper()
-                if pt == "P":
-                    if is_white:
-                        # White pawn moves
-                        # One step forward
-                        if r - 1 >= 0 and self.board[r - 1][c] is None:
-                            if r - 1 == 0:
-                                # promotion moves for reaching rank 8
-                                for promo in ["Q", "R", "B", "N"]:
-                                    moves.append(
-                                        {
-                                            "from": (r, c),
-                                            "to": (r - 1, c),
-                                            "promotion": promo,
-                                        }
-                                    )
-                            else:
-                                moves.append(
-                                    {
-                                        "from": (r, c),
-                                        "to": (r - 1, c),
-                                        "promotion": None,
-                                    }
-                                )
-                            # Two steps forward from starting rank
-                            if r == 6 and self.board[r - 2][c] is None:
-                                moves.append(
-                                    {
-                                        "from": (r, c),
-                                        "to": (r - 2, c),
-                                        "promotion": None,
-                                    }
-                                )
-                        # Diagonal captures
-                        for dc in (-1, 1):
-                            nr, nc = r - 1, c + dc
-                            if 0 <= nr < 8 and 0 <= nc < 8:
-                                # capture opponent piece
-                                if self.board[nr][nc] and self.board[nr][nc].islower():
-                                    if nr == 0:
-                                        # promotion capture
-                                        for promo in ["Q", "R", "B", "N"]:
-                                            moves.append(
-                                                {
-                                                    "from": (r, c),
-                                                    "to": (nr, nc),
-                                                    "promotion": promo,
-                                                }
-                                            )
-                                    else:
-                                        moves.append(
-                                            {
-                                                "from": (r, c),
-                                                "to": (nr, nc),
-                                                "promotion": None,
-                                            }
-                                        )
-                                # en passant capture
-                                if self.en_passant_target == (nr, nc):
-                                    moves.append(
-                                        {
-                                            "from": (r, c),
-                                            "to": (nr, nc),
-                                            "promotion": None,
-                                            "en_passant": True,
-                                        }
-                                    )
+        append = moves.append
+        ep_square = self.ep_square
+        for sq, code in enumerate(board):
+            if not code or code >> 3 != side:
+                continue
+            pt = code & 7
+            if pt == PAWN:
+                step = -8 if side == WHITE_SIDE else 8
+                to = sq + step
+                promotes = to < 8 or to >= 56
+                if not board[to]:
+                    if promotes:
+                        for flag in (FLAG_PROMO_QUEEN, FLAG_PROMO_ROOK, FLAG_PROMO_BISHOP, FLAG_PROMO_KNIGHT):
+                            append(sq | to << 6 | flag << 12)
                     else:
-                        # Black pawn moves
-                        if r + 1 < 8 and self.board[r + 1][c] is None:
-                            if r + 1 == 7:
-                                # promotion
-                                for promo in ["Q", "R", "B", "N"]:
-                                    moves.append(
-                                        {
-                                            "from": (r, c),
-                                            "to": (r + 1, c),
-                                            "promotion": promo,
-                                        }
-                                    )
-                            else:
-                                moves.append(
-                                    {
-                                        "from": (r, c),
-                                        "to": (r + 1, c),
-                                        "promotion": None,
-                                    }
-                                )
-                            if r == 1 and self.board[r + 2][c] is None:
-                                moves.append(
-                                    {
-                                        "from": (r, c),
-                                        "to": (r + 2, c),
-                                        "promotion": None,
-                                    }
-                                )
-                        for dc in (-1, 1):
-                            nr, nc = r + 1, c + dc
-                            if 0 <= nr < 8 and 0 <= nc < 8:
-                                if self.board[nr][nc] and self.board[nr][nc].isupper():
-                                    if nr == 7:
-                                        for promo in ["Q", "R", "B", "N"]:
-                                            moves.append(
-                                                {
-                                                    "from": (r, c),
-                                                    "to": (nr, nc),
-                                                    "promotion": promo,
-                                                }
-                                            )
-                                    else:
-                                        moves.append(
-                                            {
-                                                "from": (r, c),
-                                                "to": (nr, nc),
-                                                "promotion": None,
-                                            }
-                                        )
-                                if self.en_passant_target == (nr, nc):
-                                    moves.append(
-                                        {
-                                            "from": (r, c),
-                                            "to": (nr, nc),
-                                            "promotion": None,
-                                            "en_passant": True,
-                                        }
-                                    )
-                elif pt == "N":
-                    # Knight moves
-                    for dr, dc in [
-                        (2, 1),
-                        (2, -1),
-                        (-2, 1),
-                        (-2, -1),
-                        (1, 2),
-                        (1, -2),
-                        (-1, 2),
-                        (-1, -2),
-                    ]:
-                        nr, nc = r + dr, c + dc
-                        if 0 <= nr < 8 and 0 <= nc < 8:
-                            if (
-                                self.board[nr][nc] is None
-                                or (is_white and self.board[nr][nc].islower())
-                                or (not is_white and self.board[nr][nc].isupper())
-                            ):
-                                moves.append(
-                                    {"from": (r, c), "to": (nr, nc), "promotion": None}
-                                )
-                elif pt in ("B", "R", "Q"):
-                    # Sliding pieces: bishop, rook, queen
-                    if pt == "B":
-                        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-                    elif pt == "R":
-                        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-                    else:  # Queen
-                        directions = [
-                            (-1, -1),
-                            (-1, 1),
-                            (1, -1),
-                            (1, 1),
-                            (-1, 0),
-                            (1, 0),
-                            (0, -1),
-                            (0, 1),
-                        ]
-                    for dr, dc in directions:
-                        nr, nc = r + dr, c + dc
-                        while 0 <= nr < 8 and 0 <= nc < 8:
-                            if self.board[nr][nc] is None:
-                                moves.append(
-                                    {"from": (r, c), "to": (nr, nc), "promotion": None}
-                                )
-                            else:
-                                if is_white and self.board[nr][nc].islower():
-                                    moves.append(
-                                        {
-                                            "from": (r, c),
-                                            "to": (nr, nc),
-                                            "promotion": None,
-                                        }
-                                    )
-                                if not is_white and self.board[nr][nc].isupper():
-                                    moves.append(
-                                        {
-                                            "from": (r, c),
-                                            "to": (nr, nc),
-                                            "promotion": None,
-                                        }
-                                    )
-                                break  # hit a piece, stop in this direction
-                            nr += dr
-                            nc += dc
-                elif pt == "K":
-                    # King moves (one square any direction)
-                    for dr, dc in [
-                        (-1, -1),
-                        (-1, 0),
-                        (-1, 1),
-                        (0, -1),
-                        (0, 1),
-                        (1, -1),
-                        (1, 0),
-                        (1, 1),
-                    ]:
-                        nr, nc = r + dr, c + dc
-                        if 0 <= nr < 8 and 0 <= nc < 8:
-                            if (
-                                self.board[nr][nc] is None
-                                or (is_white and self.board[nr][nc].islower())
-                                or (not is_white and self.board[nr][nc].isupper())
-                            ):
-                                moves.append(
-                                    {"from": (r, c), "to": (nr, nc), "promotion": None}
-                                )
-                    # Castling moves
-                    if is_white and r == 7 and c == 4:
-                        # White king on e1
-                        if (
-                            self.castling_rights.get("K")
-                            and self.board[7][5] is None
-                            and self.board[7][6] is None
-                            and self.board[7][7] == "R"
-                        ):
-                            # King-side: squares f1,g1 empty; rook at h1
-                            if (
-                                not self.is_in_check("white")
-                                and not self.is_square_attacked(7, 5, "black")
-                                and not self.is_square_attacked(7, 6, "black")
-                            ):
-                                moves.append(
-                                    {
-                                        "from": (7, 4),
-                                        "to": (7, 6),
-                                        "promotion": None,
-                                        "castle": True,
-                                    }
-                                )
-                        if (
-                            self.castling_rights.get("Q")
-                            and self.board[7][3] is None
-                            and self.board[7][2] is None
-                            and self.board[7][1] is None
-                            and self.board[7][0] == "R"
-                        ):
-                            # Queen-side: squares d1,c1,b1 empty; rook at a1
-                            if (
-                                not self.is_in_check("white")
-                                and not self.is_square_attacked(7, 3, "black")
-                                and not self.is_square_attacked(7, 2, "black")
-                            ):
-                                moves.append(
-                                    {
-                                        "from": (7, 4),
-                                        "to": (7, 2),
-                                        "promotion": None,
-                                        "castle": True,
-                                    }
-                                )
-                    if not is_white and r == 0 and c == 4:
-                        # Black king on e8
-                        if (
-                            self.castling_rights.get("k")
-                            and self.board[0][5] is None
-                            and self.board[0][6] is None
-                            and self.board[0][7] == "r"
-                        ):
-                            if (
-                                not self.is_in_check("black")
-                                and not self.is_square_attacked(0, 5, "white")
-                                and not self.is_square_attacked(0, 6, "white")
-                            ):
-                                moves.append(
-                                    {
-                                        "from": (0, 4),
-                                        "to": (0, 6),
-                                        "promotion": None,
-                                        "castle": True,
-                                    }
-                                )
-                        if (
-                            self.castling_rights.get("q")
-                            and self.board[0][3] is None
-                            and self.board[0][2] is None
-                            and self.board[0][1] is None
-                            and self.board[0][0] == "r"
-                        ):
-                            if (
-                                not self.is_in_check("black")
-                                and not self.is_square_attacked(0, 3, "white")
-                                and not self.is_square_attacked(0, 2, "white")
-                            ):
-                                moves.append(
-                                    {
-                                        "from": (0, 4),
-                                        "to": (0, 2),
-                                        "promotion": None,
-                                        "castle": True,
-                                    }
-                                )
-        # Filter out moves that leave own king in check (make them legal moves)
-        legal_moves = []
-        for move in moves:
-            from_r, from_c = move["from"]
-            to_r, to_c = move["to"]
-            promo = move.get("promotion")
-            # Save current state to restore later
-            board_backup = [row[:] for row in self.board]
-            rights_backup = self.castling_rights.copy()
-            ep_backup = self.en_passant_target
-            halfmove_backup = self.halfmove_clock
-            turn_backup = self.turn
-            # Apply move on the board (simulate)
-            piece = self.board[from_r][from_c]
-            captured = None
-            is_castle = move.get("castle", False)
-            is_ep = move.get("en_passant", False)
-            if is_castle:
-                # Move rook as well during simulation
-                if to_c == 6:  # king-side castle
-                    self.board[from_r][5] = self.board[from_r][7]
-                    self.board[from_r][7] = None
-                else:  # queen-side castle
-                    self.board[from_r][3] = self.board[from_r][0]
-                    self.board[from_r][0] = None
-            if is_ep:
-                # Remove the pawn that is captured en passant
-                if is_white:
-                    captured = self.board[to_r + 1][to_c]
-                    self.board[to_r + 1][to_c] = None
-                else:
-                    captured = self.board[to_r - 1][to_c]
-                    self.board[to_r - 1][to_c] = None
+                        append(sq | to << 6)
+                        # Two steps forward from starting rank
+                        if (sq >> 3) == (6 if side == WHITE_SIDE else 1) and not board[to + step]:
+                            append(sq | (to + step) << 6 | FLAG_DOUBLE_PUSH << 12)
+                for to in PAWN_ATTACKS[side][sq]:
+                    target = board[to]
+                    if target and target >> 3 != side:
+                        if promotes:
+                            for flag in (FLAG_PROMO_QUEEN, FLAG_PROMO_ROOK, FLAG_PROMO_BISHOP, FLAG_PROMO_KNIGHT):
+                                append(sq | to << 6 | flag << 12)
+                        else:
+                            append(sq | to << 6)
+                    elif to == ep_square:
+                        append(sq | to << 6 | FLAG_EN_PASSANT << 12)
+            elif pt == KNIGHT or pt == KING:
+                for to in KNIGHT_TARGETS[sq] if pt == KNIGHT else KING_TARGETS[sq]:
+                    target = board[to]
+                    if not target or target >> 3 != side:
+                        append(sq | to << 6)
+                if pt == KING and self.castling:
+                    self._castling_moves(side, sq, moves)
             else:
-                captured = self.board[to_r][to_c]
-            # Move the piece (handle promotion)
-            if promo and piece and piece.upper() == "P":
-                # Promote pawn to the chosen piece
-                self.board[to_r][to_c] = promo if is_white else promo.lower()
+                for ray in SLIDER_RAYS[pt][sq]:
+                    for to in ray:
+                        target = board[to]
+                        if not target:
+                            append(sq | to << 6)
+                        else:
+                            if target >> 3 != side:
+                                append(sq | to << 6)
+                            break  # hit a piece, stop in this direction
+        return moves
+
+    def capture_moves(self, side):
+        """Pseudo-legal captures (en passant and capture-promotions included) plus pushes
+        that promote to a queen: the tactical moves a quiescence search looks at."""
+        board = self.squares
+        moves = []
+        append = moves.append
+        ep_square = self.ep_square
+        for sq, code in enumerate(board):
+            if not code or code >> 3 != side:
+                continue
+            pt = code & 7
+            if pt == PAWN:
+                to = sq - 8 if side == WHITE_SIDE else sq + 8
+                promotes = to < 8 or to >= 56
+                if promotes and not board[to]:
+                    append(sq | to << 6 | FLAG_PROMO_QUEEN << 12)
+                for to in PAWN_ATTACKS[side][sq]:
+                    target = board[to]
+                    if target and target >> 3 != side:
+                        if promotes:
+                            for flag in (FLAG_PROMO_QUEEN, FLAG_PROMO_ROOK, FLAG_PROMO_BISHOP, FLAG_PROMO_KNIGHT):
+                                append(sq | to << 6 | flag << 12)
+                        else:
+                            append(sq | to << 6)
+                    elif to == ep_square:
+                        append(sq | to << 6 | FLAG_EN_PASSANT << 12)
+            elif pt == KNIGHT or pt == KING:
+                for to in KNIGHT_TARGETS[sq] if pt == KNIGHT else KING_TARGETS[sq]:
+                    target = board[to]
+                    if target and target >> 3 != side:
+                        append(sq | to << 6)
             else:
-                self.board[to_r][to_c] = piece
-            self.board[from_r][from_c] = None
-            # Update castling rights for simulation
-            if piece:
-                if piece == "K":  # white king moved
-                    self.castling_rights["K"] = False
-                    self.castling_rights["Q"] = False
-                if piece == "k":  # black king moved
-                    self.castling_rights["k"] = False
-                    self.castling_rights["q"] = False
-                if from_r == 7 and from_c == 7:  # white rook from h1 moved or captured
-                    self.castling_rights["K"] = False
-                if from_r == 7 and from_c == 0:  # white rook from a1
-                    self.castling_rights["Q"] = False
-                if from_r == 0 and from_c == 7:  # black rook from h8
-                    self.castling_rights["k"] = False
-                if from_r == 0 and from_c == 0:  # black rook from a8
-                    self.castling_rights["q"] = False
-            # If pawn moved two, set en passant target for simulation
-            new_ep = None
-            if piece and piece.upper() == "P" and abs(to_r - from_r) == 2:
-                new_ep = ((from_r + to_r) // 2, from_c)
-            self.en_passant_target = new_ep
-            # halfmove_clock and turn not needed for check simulation
-            # Check if own king is in check after this move
-            if not self.is_in_check(color):
-                legal_moves.append(move)
-            # Restore state
-            self.board = [row[:] for row in board_backup]
-            self.castling_rights = rights_backup
-            self.en_passant_target = ep_backup
-            self.halfmove_clock = halfmove_backup
-            self.turn = turn_backup
-        return legal_moves
+                for ray in SLIDER_RAYS[pt][sq]:
+                    for to in ray:
+                        target = board[to]
+                        if target:
+                            if target >> 3 != side:
+                                append(sq | to << 6)
+                            break
+        return moves
 
-    def make_move(self, from_row, from_col, to_row, to_col, promotion=None):
-        """Make the move on the board (assumes it is legal). Returns a dict describing the move."""
-        piece = self.board[from_row][from_col]
-        if not piece:
-            return None
-        color = "white" if piece.isupper() else "black"
-        # Determine special move types
-        is_castle = piece.upper() == "K" and abs(to_col - from_col) == 2
-        is_en_passant = False
+    def _castling_moves(self, side, king_sq, moves):
+        board = self.squares
+        if side == WHITE_SIDE:
+            if king_sq != 60:
+                return
+            kingside, queenside, rook = CASTLE_WK, CASTLE_WQ, ROOK
+        else:
+            if king_sq != 4:
+                return
+            kingside, queenside, rook = CASTLE_BK, CASTLE_BQ, ROOK | BLACK
+        # The king may not castle out of, through or into check
+        enemy_attacks = self.attacks[side ^ 1]
         if (
-            piece.upper() == "P"
-            and self.en_passant_target == (to_row, to_col)
-            and self.board[to_row][to_col] is None
+            self.castling & kingside
+            and not board[king_sq + 1]
+            and not board[king_sq + 2]
+            and board[king_sq + 3] == rook
+            and not (enemy_attacks[king_sq] or enemy_attacks[king_sq + 1] or enemy_attacks[king_sq + 2])
         ):
-            is_en_passant = True
-        # Handle capture removal
-        captured_piece = None
-        if is_en_passant:
-            if color == "white":
-                captured_piece = self.board[to_row + 1][to_col]
-                self.board[to_row + 1][to_col] = None
-            else:
-                captured_piece = self.board[to_row - 1][to_col]
-                self.board[to_row - 1][to_col] = None
-        else:
-            captured_piece = self.board[to_row][to_col]
-        # Handle castling rook move
-        if is_castle:
-            if to_col == 6:  # king-side
-                self.board[from_row][5] = self.board[from_row][7]
-                self.board[from_row][7] = None
-            else:  # queen-side
-                self.board[from_row][3] = self.board[from_row][0]
-                self.board[from_row][0] = None
+            moves.append(encode_move(king_sq, king_sq + 2, FLAG_CASTLE))
+        if (
+            self.castling & queenside
+            and not board[king_sq - 1]
+            and not board[king_sq - 2]
+            and not board[king_sq - 3]
+            and board[king_sq - 4] == rook
+            and not (enemy_attacks[king_sq] or enemy_attacks[king_sq - 1] or enemy_attacks[king_sq - 2])
+        ):
+            moves.append(encode_move(king_sq, king_sq - 2, FLAG_CASTLE))
+
+    def pins(self, side, king):
+        """{square: bitmask of the squares it may move to} for side's pieces pinned to its king."""
+        board = self.squares
+        pins = {}
+        rays = DIRECTION_RAYS[king]
+        for direction in range(8):
+            pinned = -1
+            line = 0
+            for sq in rays[direction]:
+                line |= 1 << sq
+                code = board[sq]
+                if not code:
+                    continue
+                if code >> 3 == side:
+                    if pinned >= 0:
+                        break
+                    pinned = sq
+                else:
+                    pt = code & 7
+                    if pinned >= 0 and (pt == QUEEN or pt == (ROOK if direction < 4 else BISHOP)):
+                        # Along the line up to and including the pinning piece
+                        pins[pinned] = line
+                    break
+        return pins
+
+    def legal_moves(self, side=None):
+        """All legal moves for side (default: the side to move) as packed ints."""
+        if side is None:
+            side = self.side
+        moves = self.pseudo_legal_moves(side)
+        king = self.kings[side]
+        if king < 0:
+            return moves
+        enemy = side ^ 1
+        # make() swaps in a new pair, so this stays the map of the current position
+        enemy_attacks = self.attacks[enemy]
+        in_check = enemy_attacks[king]
+        pins = self.pins(side, king) if not in_check else None
+        legal = []
+        for move in moves:
+            from_sq = move & 63
+            if not in_check and move >> 12 != FLAG_EN_PASSANT:
+                # Out of check, the king may go anywhere the enemy does not attack
+                # (castling squares were already checked during generation)
+                if from_sq == king:
+                    if not enemy_attacks[move >> 6 & 63]:
+                        legal.append(move)
+                    continue
+                # Anything else is legal unless a pin holds it to its line
+                allowed = pins.get(from_sq)
+                if allowed is None or allowed >> (move >> 6 & 63) & 1:
+                    legal.append(move)
+                continue
+            # Play the move in place, test the king, then take it back
+            undo = self.make(move)
+            if not self.attacks[enemy][self.kings[side]]:
+                legal.append(move)
+            self.unmake(move, undo)
+        return legal
+
+    def parse_uci(self, uci):
+        """The legal packed move matching a UCI string such as 'e2e4' or 'e7e8q', or None."""
+        for move in self.legal_moves():
+            if move_to_uci(move) == uci:
+                return move
+        return None
+
+    def make(self, move):
+        """Play a packed move in place (assumes it is pseudo-legal).
+        Returns an int packing the captured piece, castling rights, en passant square and
+        halfmove clock; pass it to unmake together with the move.
+        """
+        board = self.squares
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flag = move >> 12
+        piece = board[from_sq]
+        side = piece >> 3
+        captured = board[to_sq]
+        undo = captured | self.castling << 4 | (self.ep_square + 1) << 8 | self.halfmove_clock << 15
+        key = self.zobrist_key
+        self.key_history.append(key)
+        self.attack_history.append(self.attacks)
+        self.attacks = [bytearray(self.attacks[0]), bytearray(self.attacks[1])]
+        zobrist = ZOBRIST_PIECES
+        key ^= zobrist[piece][from_sq]
+        self.remove_piece(from_sq)
         # Move the piece (with promotion if applicable)
-        if promotion and piece.upper() == "P" and (to_row == 0 or to_row == 7):
-            # Use the promotion choice (e.g. 'Q','R','B','N')
-            new_piece = promotion if color == "white" else promotion.lower()
-            self.board[to_row][to_col] = new_piece
+        placed = (flag - 2) | (piece & BLACK) if flag >= FLAG_PROMO_KNIGHT else piece
+        if captured:
+            key ^= zobrist[captured][to_sq]
+            # The square stays occupied, so no slider's ray changes
+            self.add_attacks(to_sq, captured, -1)
+            board[to_sq] = placed
+            self.add_attacks(to_sq, placed, 1)
         else:
-            self.board[to_row][to_col] = piece
-        self.board[from_row][from_col] = None
+            if flag == FLAG_EN_PASSANT:
+                # Remove the pawn that is captured en passant
+                cap_sq = to_sq + 8 if side == WHITE_SIDE else to_sq - 8
+                key ^= zobrist[board[cap_sq]][cap_sq]
+                self.remove_piece(cap_sq)
+            elif flag == FLAG_CASTLE:
+                # Move the rook as well
+                if to_sq > from_sq:  # king-side
+                    rook_from, rook_to = from_sq + 3, from_sq + 1
+                else:  # queen-side
+                    rook_from, rook_to = from_sq - 4, from_sq - 1
+                rook = board[rook_from]
+                self.remove_piece(rook_from)
+                self.put_piece(rook_to, rook)
+                key ^= zobrist[rook][rook_from] ^ zobrist[rook][rook_to]
+            self.put_piece(to_sq, placed)
+        key ^= zobrist[placed][to_sq]
+        if piece & 7 == KING:
+            self.kings[side] = to_sq
         # Update castling rights after move
-        if piece == "K":
-            self.castling_rights["K"] = False
-            self.castling_rights["Q"] = False
-        if piece == "k":
-            self.castling_rights["k"] = False
-            self.castling_rights["q"] = False
-        if from_row == 7 and from_col == 7:  # white rook from h1 moved
-            self.castling_rights["K"] = False
-        if from_row == 7 and from_col == 0:  # white rook from a1 moved
-            self.castling_rights["Q"] = False
-        if from_row == 0 and from_col == 7:  # black rook from h8 moved
-            self.castling_rights["k"] = False
-        if from_row == 0 and from_col == 0:  # black rook from a8 moved
-            self.castling_rights["q"] = False
-        # If a rook was captured, update castling rights for that rook
-        if captured_piece == "R":  # a white rook was captured
-            if to_row == 7 and to_col == 0:  # white queen-side rook captured
-                self.castling_rights["Q"] = False
-            if to_row == 7 and to_col == 7:  # white king-side rook captured
-                self.castling_rights["K"] = False
-        if captured_piece == "r":  # a black rook was captured
-            if to_row == 0 and to_col == 0:
-                self.castling_rights["q"] = False
-            if to_row == 0 and to_col == 7:
-                self.castling_rights["k"] = False
+        rights = self.castling & ~(CASTLING_LOSS[from_sq] | CASTLING_LOSS[to_sq])
+        if rights != self.castling:
+            key ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_CASTLING[rights]
+            self.castling = rights
         # Update en passant target after move
-        if piece.upper() == "P" and abs(to_row - from_row) == 2:
-            self.en_passant_target = ((from_row + to_row) // 2, from_col)
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+        if flag == FLAG_DOUBLE_PUSH:
+            self.ep_square = (from_sq + to_sq) >> 1
+            key ^= ZOBRIST_EP_FILE[from_sq & 7]
         else:
-            self.en_passant_target = None
+            self.ep_square = -1
         # Update halfmove clock
-        if piece.upper() == "P" or captured_piece:
+        if piece & 7 == PAWN or captured:
             self.halfmove_clock = 0
         else:
             self.halfmove_clock += 1
         # Flip the turn to the other side
-        self.turn = "black" if color == "white" else "white"
-        # Return details of the move
-        return {
-            "from": (from_row, from_col),
-            "to": (to_row, to_col),
-            "piece": piece,
-            "captured": captured_piece,
-            "promotion": promotion,
-            "castle": is_castle,
-            "en_passant": is_en_passant,
-        }
+        self.side ^= 1
+        self.zobrist_key = key ^ ZOBRIST_BLACK_TO_MOVE
+        return undo
+
+    def unmake(self, move, undo):
+        """Take back a packed move played with make, restoring the exact prior state."""
+        board = self.squares
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flag = move >> 12
+        placed = board[to_sq]
+        # A promoted piece turns back into the pawn
+        piece = PAWN | (placed & BLACK) if flag >= FLAG_PROMO_KNIGHT else placed
+        side = piece >> 3
+        board[from_sq] = piece
+        board[to_sq] = undo & 15
+        if flag == FLAG_EN_PASSANT:
+            if side == WHITE_SIDE:
+                board[to_sq + 8] = PAWN | BLACK
+            else:
+                board[to_sq - 8] = PAWN
+        elif flag == FLAG_CASTLE:
+            # Put the castling rook back into its corner
+            if to_sq > from_sq:
+                board[from_sq + 3] = board[from_sq + 1]
+                board[from_sq + 1] = EMPTY
+            else:
+                board[from_sq - 4] = board[from_sq - 1]
+                board[from_sq - 1] = EMPTY
+        if piece & 7 == KING:
+            self.kings[side] = from_sq
+        self.castling = undo >> 4 & 15
+        self.ep_square = (undo >> 8 & 127) - 1
+        self.halfmove_clock = undo >> 15
+        self.side ^= 1
+        self.zobrist_key = self.key_history.pop()
+        self.attacks = self.attack_history.pop()
+
+    def make_null(self):
+        """Pass the move to the opponent (for null-move pruning). Returns the undo int for unmake_null."""
+        undo = (self.ep_square + 1) << 8 | self.halfmove_clock << 15
+        key = self.zobrist_key
+        self.key_history.append(key)
+        # Nothing moves; make() copies before changing, so the pair can be shared
+        self.attack_history.append(self.attacks)
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+            self.ep_square = -1
+        # Positions on either side of a null move are never repetitions of each other
+        self.halfmove_clock = 0
+        self.side ^= 1
+        self.zobrist_key = key ^ ZOBRIST_BLACK_TO_MOVE
+        return undo
+
+    def unmake_null(self, undo):
+        self.ep_square = (undo >> 8 & 127) - 1
+        self.halfmove_clock = undo >> 15
+        self.side ^= 1
+        self.zobrist_key = self.key_history.pop()
+        self.attacks = self.attack_history.pop()
+
+    # --- dict-based API used by chess_gui.py and main_client.py ---
+
+    def generate_moves(self, color=None):
+        """Generate all legal moves for the given color (or current turn if color not specified).
+        Returns a list of moves, where each move is a dict with keys: 'from',(row,col); 'to',(row,col); 'promotion' (if pawn promotion).
+        """
+        side = self.side if color is None else SIDES[color]
+        return [move_to_dict(move) for move in self.legal_moves(side)]
+
+    def make_move(self, from_row, from_col, to_row, to_col, promotion=None):
+        """Make the move on the board (assumes it is legal).
+        Returns a MoveRecord describing the move; pass it to unmake_move to take the move back.
+        """
+        from_sq = from_row * 8 + from_col
+        to_sq = to_row * 8 + to_col
+        piece = self.squares[from_sq]
+        if not piece:
+            return None
+        captured = self.squares[to_sq]
+        # Determine special move types
+        flag = FLAG_NORMAL
+        if piece & 7 == KING and abs(to_col - from_col) == 2:
+            flag = FLAG_CASTLE
+        elif piece & 7 == PAWN:
+            if to_sq == self.ep_square and not captured:
+                flag = FLAG_EN_PASSANT
+                captured = PAWN | (~piece & BLACK)
+            elif abs(to_row - from_row) == 2:
+                flag = FLAG_DOUBLE_PUSH
+            elif to_row == 0 or to_row == 7:
+                # A pawn reaching the last rank always promotes, to a queen unless told otherwise
+                promotion = (promotion or "Q").upper()
+                flag = PROMOTION_FLAGS[promotion]
+        if flag < FLAG_PROMO_KNIGHT:
+            promotion = None
+        move = encode_move(from_sq, to_sq, flag)
+        undo = self.make(move)
+        return MoveRecord(
+            (from_row, from_col),
+            (to_row, to_col),
+            PIECE_CHARS[piece],
+            PIECE_CHARS[captured] if captured else None,
+            promotion,
+            flag == FLAG_CASTLE,
+            flag == FLAG_EN_PASSANT,
+            move,
+            undo,
+        )
+
+    def unmake_move(self, record):
+        """Take back a move previously made with make_move, restoring the exact prior state."""
+        self.unmake(record.move, record.undo)
@@ -0,0 +1,550 @@
+"""Alpha-beta search engine over ChessLogic.
+
+Iterative deepening negamax with principal variation search, a transposition
+table, null-move pruning, late move reductions and quiescence search. Moves are
+ordered TT move first, then captures by MVV-LVA, then killer moves and the
+history heuristic. Searches stop on a depth, time or node limit.
+
+    python engine.py --movetime 5
+    python engine.py --fen "<fen>" --depth 6
+"""
+
+import argparse
+import time
+from collections import namedtuple
+
+from chess_logic import (
+    BISHOP,
+    BLACK,
+    FLAG_EN_PASSANT,
+    FLAG_PROMO_KNIGHT,
+    KING,
+    KNIGHT,
+    PAWN,
+    QUEEN,
+    ROOK,
+    START_FEN,
+    ChessLogic,
+    move_to_uci,
+)
+
+MATE_SCORE = 100000
+# Scores beyond this are "mate in N"
+MATE_BOUND = MATE_SCORE - 1000
+INFINITY = 1000000
+MAX_PLY = 128
+# Tablebase wins rank below every mate the search finds itself
+TB_WIN = MATE_BOUND - MAX_PLY - 1
+
+# Transposition table bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+PIECE_VALUES = [0, 100, 320, 330, 500, 900, 0, 0]
+# Game phase weights; 24 is the full starting material
+PHASE_WEIGHTS = [0, 0, 1, 1, 2, 4, 0, 0]
+
+# Piece-square tables from white's point of view, index 0 = a8 (the ChessLogic
+# square order). A black piece on sq uses the entry for sq ^ 56.
+PAWN_TABLE = [
+    0,  0,  0,  0,  0,  0,  0,  0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5,  5, 10, 25, 25, 10,  5,  5,
+    0,  0,  0, 20, 20,  0,  0,  0,
+    5, -5,-10,  0,  0,-10, -5,  5,
+    5, 10, 10,-20,-20, 10, 10,  5,
+    0,  0,  0,  0,  0,  0,  0,  0,
+]  # fmt: skip
+KNIGHT_TABLE = [
+    -50,-40,-30,-30,-30,-30,-40,-50,
+    -40,-20,  0,  0,  0,  0,-20,-40,
+    -30,  0, 10, 15, 15, 10,  0,-30,
+    -30,  5, 15, 20, 20, 15,  5,-30,
+    -30,  0, 15, 20, 20, 15,  0,-30,
+    -30,  5, 10, 15, 15, 10,  5,-30,
+    -40,-20,  0,  5,  5,  0,-20,-40,
+    -50,-40,-30,-30,-30,-30,-40,-50,
+]  # fmt: skip
+BISHOP_TABLE = [
+    -20,-10,-10,-10,-10,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5, 10, 10,  5,  0,-10,
+    -10,  5,  5, 10, 10,  5,  5,-10,
+    -10,  0, 10, 10, 10, 10,  0,-10,
+    -10, 10, 10, 10, 10, 10, 10,-10,
+    -10,  5,  0,  0,  0,  0,  5,-10,
+    -20,-10,-10,-10,-10,-10,-10,-20,
+]  # fmt: skip
+ROOK_TABLE = [
+     0,  0,  0,  0,  0,  0,  0,  0,
+     5, 10, 10, 10, 10, 10, 10,  5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+    -5,  0,  0,  0,  0,  0,  0, -5,
+     0,  0,  0,  5,  5,  0,  0,  0,
+]  # fmt: skip
+QUEEN_TABLE = [
+    -20,-10,-10, -5, -5,-10,-10,-20,
+    -10,  0,  0,  0,  0,  0,  0,-10,
+    -10,  0,  5,  5,  5,  5,  0,-10,
+     -5,  0,  5,  5,  5,  5,  0, -5,
+      0,  0,  5,  5,  5,  5,  0, -5,
+    -10,  5,  5,  5,  5,  5,  0,-10,
+    -10,  0,  5,  0,  0,  0,  0,-10,
+    -20,-10,-10, -5, -5,-10,-10,-20,
+]  # fmt: skip
+KING_MIDDLEGAME_TABLE = [
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -30,-40,-40,-50,-50,-40,-40,-30,
+    -20,-30,-30,-40,-40,-30,-30,-20,
+    -10,-20,-20,-20,-20,-20,-20,-10,
+     20, 20,  0,  0,  0,  0, 20, 20,
+     20, 30, 10,  0,  0, 10, 30, 20,
+]  # fmt: skip
+KING_ENDGAME_TABLE = [
+    -50,-40,-30,-20,-20,-30,-40,-50,
+    -30,-20,-10,  0,  0,-10,-20,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-30,  0,  0,  0,  0,-30,-30,
+    -50,-30,-30,-30,-30,-30,-30,-50,
+]  # fmt: skip
+
+
+def _piece_square_values(table, piece_type):
+    """Material + table value for every (piece code, square), signed from white's view."""
+    white = [PIECE_VALUES[piece_type] + table[sq] for sq in range(64)]
+    black = [-(PIECE_VALUES[piece_type] + table[sq ^ 56]) for sq in range(64)]
+    return white, black
+
+
+# PST[code][sq]: material plus position for non-king pieces, from white's view
+PST = [None] * 16
+for _pt, _table in (
+    (PAWN, PAWN_TABLE),
+    (KNIGHT, KNIGHT_TABLE),
+    (BISHOP, BISHOP_TABLE),
+    (ROOK, ROOK_TABLE),
+    (QUEEN, QUEEN_TABLE),
+):
+    PST[_pt], PST[_pt | BLACK] = _piece_square_values(_table, _pt)
+KING_MG = _piece_square_values(KING_MIDDLEGAME_TABLE, KING)
+KING_EG = _piece_square_values(KING_ENDGAME_TABLE, KING)
+
+SearchResult = namedtuple("SearchResult", ["move", "score", "depth", "nodes", "seconds", "nps", "pv"])
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time or node limit is reached."""
+
+
+def evaluate(logic):
+    """Static evaluation in centipawns from the side to move's point of view."""
+    score = 0
+    phase = 0
+    pst = PST
+    for sq, code in enumerate(logic.squares):
+        if code and code & 7 != KING:
+            score += pst[code][sq]
+            phase += PHASE_WEIGHTS[code & 7]
+    # Blend the king tables by how much material is left
+    phase = min(phase, 24)
+    white_king, black_king = logic.kings
+    if white_king >= 0:
+        score += (KING_MG[0][white_king] * phase + KING_EG[0][white_king] * (24 - phase)) // 24
+    if black_king >= 0:
+        score += (KING_MG[1][black_king] * phase + KING_EG[1][black_king] * (24 - phase)) // 24
+    return -score if logic.side else score
+
+
+def tablebase_score(wdl, ply):
+    """Search score for a tablebase WDL; wins spoiled by the 50-move rule count as draws."""
+    if wdl == 2:
+        return TB_WIN - ply
+    if wdl == -2:
+        return -TB_WIN + ply
+    return 0
+
+
+def score_to_str(score):
+    """Centipawn score -> 'cp 35' or 'mate 3' (UCI style)."""
+    if score > MATE_BOUND:
+        return f"mate {(MATE_SCORE - score + 1) // 2}"
+    if score < -MATE_BOUND:
+        return f"mate -{(MATE_SCORE + score) // 2}"
+    return f"cp {score}"
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results, indexed by the low bits of the Zobrist key.
+
+    Each slot holds two 64-bit words: the key (to detect index collisions) and the
+    packed entry: move (16 bits) | bound (2) | depth (8) | score + SCORE_OFFSET (22).
+    keys/data can be any int-indexable storage; a newer or deeper entry replaces the slot.
+    """
+
+    SCORE_OFFSET = 1 << 21
+
+    def __init__(self, size=1 << 20, keys=None, data=None):
+        # Round down to a power of two so the index is a mask
+        self.size = 1 << (size.bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys = keys if keys is not None else [0] * self.size
+        self.data = data if data is not None else [0] * self.size
+
+    def probe(self, key):
+        """(depth, bound, score, move) stored for key, or None."""
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        entry = self.data[index]
+        return (
+            entry >> 18 & 0xFF,
+            entry >> 16 & 3,
+            (entry >> 26) - self.SCORE_OFFSET,
+            entry & 0xFFFF,
+        )
+
+    def store(self, key, depth, bound, score, move):
+        index = key & self.mask
+        if self.keys[index] == key and depth < (self.data[index] >> 18 & 0xFF) and bound != EXACT:
+            # Keep the deeper result for this position
+            return
+        self.keys[index] = key
+        depth = min(depth, 0xFF)
+        self.data[index] = move | bound << 16 | depth << 18 | (score + self.SCORE_OFFSET) << 26
+
+    def clear(self):
+        for i in range(self.size):
+            self.keys[i] = 0
+            self.data[i] = 0
+
+
+class Engine:
+    def __init__(self, tt_size=1 << 20, tt=None, tablebase=None):
+        self.tt = tt if tt is not None else TranspositionTable(tt_size)
+        # Optional tablebase.Tablebase for perfect play in covered endgames
+        self.tablebase = tablebase
+        # History heuristic: cutoff counts per side and (from, to)
+        self.history = [0] * 8192
+        # Two killer moves (quiet moves that caused a cutoff) per ply
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.nodes = 0
+        self.stop_time = None
+        self.max_nodes = None
+        self.stop = None
+
+    def search(
+        self, logic, depth=None, movetime=None, nodes=None, on_iteration=None, stop=None, first_depth=1
+    ):
+        """Search the position for the side to move and return a SearchResult.
+
+        depth is the maximum iteration depth, movetime the time budget in seconds and
+        nodes a node budget; with none of them given the search stops at depth 6.
+        on_iteration(result) is called after every completed iteration.
+        stop() is polled with the other limits and aborts the search when it returns True;
+        first_depth lets parallel helpers start deepening at a different depth.
+        The logic is left exactly as it was passed in.
+        """
+        if depth is None:
+            depth = MAX_PLY if (movetime or nodes) else 6
+        start = time.perf_counter()
+        self.stop_time = start + movetime if movetime else None
+        self.max_nodes = nodes
+        self.stop = stop
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        # Age the history so old cutoffs don't dominate the new search
+        self.history = [h >> 3 for h in self.history]
+
+        root_moves = logic.legal_moves()
+        result = SearchResult(root_moves[0] if root_moves else 0, 0, 0, 0, 0.0, 0, [])
+        if len(root_moves) <= 1:
+            # Nothing to think about
+            return result
+        if self.tablebase is not None:
+            tb = self.tablebase.root_move(logic)
+            if tb is not None:
+                move = logic.parse_uci(tb[0])
+                seconds = time.perf_counter() - start
+                return SearchResult(move, tablebase_score(tb[1], 0), 0, 0, seconds, 0, [move])
+        for d in range(min(first_depth, depth), depth + 1):
+            try:
+                score = self.negamax(logic, d, -INFINITY, INFINITY, 0, True)
+            except SearchTimeout:
+                break
+            seconds = time.perf_counter() - start
+            pv = self.principal_variation(logic, d)
+            result = SearchResult(
+                pv[0] if pv else result.move,
+                score,
+                d,
+                self.nodes,
+                seconds,
+                int(self.nodes / seconds) if seconds > 0 else 0,
+                pv,
+            )
+            if on_iteration:
+                on_iteration(result)
+            if abs(score) > MATE_BOUND and MATE_SCORE - abs(score) <= d:
+                # Found the shortest mate this search can see
+                break
+            if self.stop_time and time.perf_counter() - start > (self.stop_time - start) / 2:
+                # The next iteration would not finish in the remaining time
+                break
+        seconds = time.perf_counter() - start
+        return result._replace(
+            nodes=self.nodes, seconds=seconds, nps=int(self.nodes / seconds) if seconds > 0 else 0
+        )
+
+    def check_limits(self):
+        if self.stop_time is not None and time.perf_counter() >= self.stop_time:
+            raise SearchTimeout()
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchTimeout()
+        if self.stop is not None and self.stop():
+            raise SearchTimeout()
+
+    def order_moves(self, logic, moves, tt_move, ply):
+        board = logic.squares
+        killers = self.killers[ply]
+        history = self.history
+        side_offset = logic.side << 12
+        scores = {}
+        for move in moves:
+            if move == tt_move:
+                scores[move] = 1 << 30
+                continue
+            victim = board[move >> 6 & 63]
+            flag = move >> 12
+            if victim or flag == FLAG_EN_PASSANT or flag >= FLAG_PROMO_KNIGHT:
+                # MVV-LVA: most valuable victim first, then least valuable attacker
+                victim_value = PIECE_VALUES[victim & 7] if victim else PIECE_VALUES[PAWN]
+                if flag >= FLAG_PROMO_KNIGHT:
+                    victim_value += PIECE_VALUES[flag - 2]
+                scores[move] = (1 << 28) + victim_value * 8 - (board[move & 63] & 7)
+            elif move == killers[0]:
+                scores[move] = (1 << 27) + 1
+            elif move == killers[1]:
+                scores[move] = 1 << 27
+            else:
+                scores[move] = history[side_offset | move & 0xFFF]
+        moves.sort(key=scores.__getitem__, reverse=True)
+        return moves
+
+    def negamax(self, logic, depth, alpha, beta, ply, can_null):
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.check_limits()
+        if ply:
+            # Draw by the 50-move rule or by repetition (one repeat is enough inside the tree)
+            if logic.halfmove_clock >= 100 or logic.repetition_count() >= 2:
+                return 0
+            if ply >= MAX_PLY:
+                return evaluate(logic)
+            # Probe right after captures and pawn moves, where the piece count can drop
+            if self.tablebase is not None and logic.halfmove_clock == 0:
+                wdl = self.tablebase.probe_wdl(logic)
+                if wdl is not None:
+                    return tablebase_score(wdl, ply)
+        in_check = logic.in_check()
+        if in_check:
+            # Check extension
+            depth += 1
+        if depth <= 0:
+            return self.quiesce(logic, alpha, beta, ply)
+
+        key = logic.zobrist_key
+        tt_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, bound, tt_score, tt_move = entry
+            if ply and tt_depth >= depth:
+                # Mate scores are stored relative to the node, not the root
+                if tt_score > MATE_BOUND:
+                    tt_score -= ply
+                elif tt_score < -MATE_BOUND:
+                    tt_score += ply
+                if bound == EXACT:
+                    return tt_score
+                if bound == LOWER and tt_score >= beta:
+                    return tt_score
+                if bound == UPPER and tt_score <= alpha:
+                    return tt_score
+
+        side = logic.side
+        # Null move pruning: if passing still fails high, a real move will too.
+        # Skipped in pawn endgames, where zugzwang makes passing misleading.
+        if (
+            can_null
+            and ply
+            and depth >= 3
+            and not in_check
+            and beta < MATE_BOUND
+            and self.has_pieces(logic, side)
+        ):
+            undo = logic.make_null()
+            try:
+                score = -self.negamax(logic, depth - 3, -beta, -beta + 1, ply + 1, False)
+            finally:
+                logic.unmake_null(undo)
+            if score >= beta:
+                return beta
+
+        moves = logic.legal_moves()
+        if not moves:
+            # Checkmate (sooner is worse) or stalemate
+            return -MATE_SCORE + ply if in_check else 0
+        self.order_moves(logic, moves, tt_move, ply)
+
+        board = logic.squares
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        for i, move in enumerate(moves):
+            flag = move >> 12
+            quiet = not board[move >> 6 & 63] and flag != FLAG_EN_PASSANT and flag < FLAG_PROMO_KNIGHT
+            undo = logic.make(move)
+            try:
+                if i == 0:
+                    score = -self.negamax(logic, depth - 1, -beta, -alpha, ply + 1, True)
+                else:
+                    # Late quiet moves are searched one ply shallower first
+                    reduction = 1 if depth >= 3 and i >= 4 and quiet and not in_check else 0
+                    score = -self.negamax(logic, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1, True)
+                    if score > alpha and (reduction or score < beta):
+                        score = -self.negamax(logic, depth - 1, -beta, -alpha, ply + 1, True)
+            finally:
+                logic.unmake(move, undo)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if quiet:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[side << 12 | move & 0xFFF] += depth * depth
+                        break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        stored = best_score
+        if stored > MATE_BOUND:
+            stored += ply
+        elif stored < -MATE_BOUND:
+            stored -= ply
+        self.tt.store(key, depth, bound, stored, best_move)
+        return best_score
+
+    def quiesce(self, logic, alpha, beta, ply):
+        """Search captures only until the position is quiet, so the evaluation isn't taken mid-exchange."""
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.check_limits()
+        stand_pat = evaluate(logic)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        side = logic.side
+        board = logic.squares
+        moves = logic.capture_moves(side)
+        moves.sort(
+            key=lambda m: PIECE_VALUES[board[m >> 6 & 63] & 7] * 8 - (board[m & 63] & 7),
+            reverse=True,
+        )
+        for move in moves:
+            undo = logic.make(move)
+            try:
+                if logic.square_attacked(logic.kings[side], side ^ 1):
+                    # Illegal: leaves our own king in check
+                    continue
+                score = -self.quiesce(logic, -beta, -alpha, ply + 1)
+            finally:
+                logic.unmake(move, undo)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    @staticmethod
+    def has_pieces(logic, side):
+        """True if side has anything besides pawns and the king."""
+        for code in logic.squares:
+            if code and code >> 3 == side and code & 7 not in (PAWN, KING):
+                return True
+        return False
+
+    def principal_variation(self, logic, depth):
+        """Follow best moves stored in the transposition table from the current position."""
+        pv = []
+        made = []
+        for _ in range(depth):
+            entry = self.tt.probe(logic.zobrist_key)
+            if entry is None or entry[3] not in logic.legal_moves():
+                break
+            move = entry[3]
+            pv.append(move)
+            made.append((move, logic.make(move)))
+            if logic.repetition_count() >= 2:
+                break
+        for move, undo in reversed(made):
+            logic.unmake(move, undo)
+        return pv
+
+
+def best_move_uci(fen, movetime=None, depth=None, engine=None):
+    """Best move for a FEN position as a UCI string (None if the game is over).
+    This is the entry point for callers holding python-chess boards, such as server bot seats.
+    """
+    result = (engine or Engine()).search(ChessLogic(fen), depth=depth, movetime=movetime)
+    return move_to_uci(result.move) if result.move else None
+
+
+def print_info(result):
+    print(
+        f"info depth {result.depth} score {score_to_str(result.score)} nodes {result.nodes} "
+        f"nps {result.nps} time {int(result.seconds * 1000)} "
+        f"pv {' '.join(move_to_uci(m) for m in result.pv)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search a position with the ChessLogic engine")
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--depth", type=int, help="maximum search depth")
+    parser.add_argument("--movetime", type=float, help="time budget in seconds")
+    parser.add_argument("--nodes", type=int, help="node budget")
+    parser.add_argument("--syzygy", action="append", help="Syzygy tablebase directory (repeatable)")
+    args = parser.parse_args()
+
+    tablebase = None
+    if args.syzygy:
+        from tablebase import Tablebase
+
+        tablebase = Tablebase(args.syzygy)
+    logic = ChessLogic(args.fen)
+    result = Engine(tablebase=tablebase).search(
+        logic, depth=args.depth, movetime=args.movetime, nodes=args.nodes, on_iteration=print_info
+    )
+    print(f"bestmove {move_to_uci(result.move) if result.move else '(none)'}")
+    print(f"{result.nodes} nodes in {result.seconds:.2f}s ({result.nps} nps)")
+
+
+if __name__ == "__main__":
+    main()
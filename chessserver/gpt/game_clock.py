@@ -0,0 +1,91 @@
+"""Chess clock that keeps time with time.monotonic() instead of counting ticks.
+
+The clock only reads the time when a move is made (press) or when someone asks how
+much is left, so the UI can repaint as often or as rarely as it likes without the
+accounting drifting. A networked client can feed it the server's numbers with
+sync() and use it just for display between updates.
+"""
+
+import time
+
+SIDES = ("white", "black")
+# Below this many seconds the display shows tenths
+TENTHS_BELOW = 10.0
+
+
+def format_clock(seconds):
+    """MM:SS, or S.t under ten seconds. Rounds down, so it never shows time that isn't there."""
+    seconds = max(0.0, seconds)
+    if seconds < TENTHS_BELOW:
+        tenths = int(seconds * 10)
+        return f"{tenths // 10}.{tenths % 10}"
+    whole = int(seconds)
+    return f"{whole // 60:02d}:{whole % 60:02d}"
+
+
+class GameClock:
+    def __init__(self, base, increment=0.0, reset_each_move=False, timer=time.monotonic):
+        """base and increment in seconds. With reset_each_move every turn starts from
+        base again (a per-move limit rather than a game clock)."""
+        self.base = float(base)
+        self.increment = float(increment)
+        self.reset_each_move = reset_each_move
+        self.timer = timer
+        self.remaining = {side: self.base for side in SIDES}
+        self.turn = None  # side whose clock is running, None when stopped
+        self.started = None  # timer() when that side's clock was started
+
+    def start(self, turn):
+        self.turn = turn
+        self.started = self.timer()
+
+    def stop(self):
+        """Charge the running side and stop both clocks."""
+        if self.turn is not None:
+            self.remaining[self.turn] = self.left(self.turn)
+        self.turn = None
+        self.started = None
+
+    def press(self):
+        """End the running side's move: charge its time, add the increment, start the other side."""
+        side = self.turn
+        if side is None:
+            return
+        now = self.timer()
+        self.remaining[side] = max(0.0, self.remaining[side] - (now - self.started)) + self.increment
+        other = SIDES[1 - SIDES.index(side)]
+        if self.reset_each_move:
+            self.remaining[other] = self.base
+        self.turn = other
+        self.started = now
+
+    def left(self, side):
+        """Seconds left for side right now."""
+        if side != self.turn:
+            return self.remaining[side]
+        return max(0.0, self.remaining[side] - (self.timer() - self.started))
+
+    def flagged(self):
+        """The side that ran out of time, or None."""
+        if self.turn is not None and self.left(self.turn) <= 0:
+            return self.turn
+        return None
+
+    def next_change(self):
+        """Seconds until the running side's display changes; a UI can sleep exactly that long."""
+        if self.turn is None:
+            return None
+        left = self.left(self.turn)
+        # Step of the text that comes next: at exactly TENTHS_BELOW that is already tenths
+        step = 0.1 if left <= TENTHS_BELOW else 1.0
+        # Displays round down, so the text changes when left crosses a multiple of step
+        return left - int(left / step) * step or step
+
+    def sync(self, white, black, turn):
+        """Take remaining times reported by a server; turn's clock runs from now."""
+        self.remaining = {"white": float(white), "black": float(black)}
+        if turn is None:
+            self.turn = None
+            self.started = None
+        else:
+            self.start(turn)
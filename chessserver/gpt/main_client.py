@@ -1,25 +1,65 @@
+import copy
+import os
+import queue
+import threading
 import tkinter as tk
-from chess_logic import ChessLogic
+from chess_logic import ChessLogic, move_to_dict
 from chess_gui import ChessGUI
-import random
+from engine import Engine
+from book import OpeningBook
 
+# Seconds the engine may think per move
+ENGINE_MOVETIME = 2.0
+# Opening book built with book.py; used while the game is still in it
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+# How often the Tk thread looks for a finished search
+POLL_MS = 20
 
-# Server stub function to simulate opponent. It takes the user's move (not used in this simple stub)
-# and returns a random legal move for the opponent using ChessLogic.
+# (position key, packed move) from the search thread, picked up by poll_engine
+engine_replies = queue.Queue()
+
+
+# Server stub function to simulate opponent. It takes the user's move (not used in this simple stub).
+# A book reply is returned at once. Otherwise the engine searches on a worker thread,
+# this returns None and poll_engine plays the reply, so the Tk mainloop keeps running.
 def server_make_move(user_move):
     # The ChessLogic instance is global or passed in; here we'll assume a global 'logic' defined below.
     global logic
-    # Generate all legal moves for the side whose turn it is now
-    moves = logic.generate_moves()
-    if not moves:
-        return None
-    # Choose a random move
-    move = random.choice(moves)
-    return move
+    if book is not None:
+        uci = book.choose(logic)
+        move = logic.parse_uci(uci) if uci else None
+        if move:
+            return move_to_dict(move)
+    # The GUI keeps using logic meanwhile (move highlights make and unmake moves), so search a copy
+    position = copy.deepcopy(logic)
+    threading.Thread(target=search_reply, args=(position,), daemon=True).start()
+    root.after(POLL_MS, poll_engine)
+    return None
+
+
+def search_reply(position):
+    """Worker thread: search the position for the side whose turn it is now."""
+    key = position.zobrist_key
+    result = engine.search(position, movetime=ENGINE_MOVETIME)
+    engine_replies.put((key, result.move))
+
+
+def poll_engine():
+    """Tk thread: play the engine's reply once the search is done."""
+    try:
+        key, move = engine_replies.get_nowait()
+    except queue.Empty:
+        root.after(POLL_MS, poll_engine)
+        return
+    # A reply to a position that is no longer on the board is dropped
+    if move and key == logic.zobrist_key:
+        gui.perform_opponent_move(move_to_dict(move))
 
 
 if __name__ == "__main__":
     logic = ChessLogic()
+    engine = Engine()
+    book = OpeningBook(BOOK_PATH) if os.path.exists(BOOK_PATH) else None
     root = tk.Tk()
     root.title("Chess Client")
     # You can set user_color to 'white' or 'black'
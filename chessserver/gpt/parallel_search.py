@@ -0,0 +1,249 @@
+"""Lazy SMP: several processes search the same position and share one transposition table.
+
+The table lives in a multiprocessing.shared_memory block, so helpers fill it with
+results the main search picks up as TT cutoffs and better move ordering. Only the
+main search's answer is used; helpers exist to warm the table.
+
+    python parallel_search.py --fen "<fen>" --workers 4 --movetime 5
+    python parallel_search.py --bench --max-workers 8 --depth 7
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+from chess_logic import START_FEN, ChessLogic, move_to_uci
+from engine import EXACT, MAX_PLY, Engine, TranspositionTable, print_info
+from perft import POSITIONS
+
+# Words after the table: [0] is the id of the running search, 0 means "stop"
+CONTROL_WORDS = 1
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """TranspositionTable in shared memory: keys, then data, then the control words, all uint64.
+
+    Slots are written without locks. The key word holds key ^ data, so a slot torn by two
+    processes writing at once fails the key check on probe instead of returning a wrong entry.
+    Create with name=None; helpers attach by passing the creator's shm.name and size.
+    """
+
+    def __init__(self, size=1 << 20, name=None):
+        size = 1 << (size.bit_length() - 1)
+        self.owner = name is None
+        if self.owner:
+            self.shm = SharedMemory(create=True, size=(2 * size + CONTROL_WORDS) * 8)
+            self.shm.buf[:] = bytes(len(self.shm.buf))
+        else:
+            self.shm = SharedMemory(name=name)
+        self.words = self.shm.buf.cast("Q")
+        super().__init__(size, self.words[:size], self.words[size : 2 * size])
+        self.control = self.words[2 * size : 2 * size + CONTROL_WORDS]
+
+    def probe(self, key):
+        index = key & self.mask
+        entry = self.data[index]
+        if self.keys[index] ^ entry != key:
+            return None
+        return (
+            entry >> 18 & 0xFF,
+            entry >> 16 & 3,
+            (entry >> 26) - self.SCORE_OFFSET,
+            entry & 0xFFFF,
+        )
+
+    def store(self, key, depth, bound, score, move):
+        index = key & self.mask
+        old = self.data[index]
+        if self.keys[index] ^ old == key and depth < (old >> 18 & 0xFF) and bound != EXACT:
+            # Keep the deeper result for this position
+            return
+        depth = min(depth, 0xFF)
+        entry = move | bound << 16 | depth << 18 | (score + self.SCORE_OFFSET) << 26
+        self.data[index] = entry
+        self.keys[index] = key ^ entry
+
+    def clear(self):
+        self.shm.buf[: 16 * self.size] = bytes(16 * self.size)
+
+    def close(self):
+        # The views must be released before the block can be closed
+        for view in (self.keys, self.data, self.control, self.words):
+            view.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _helper(index, name, tt_size, jobs, results):
+    """Helper process: search every job until the main search moves the control word on."""
+    tt = SharedTranspositionTable(tt_size, name=name)
+    control = tt.control
+    engine = Engine(tt=tt)
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            job_id, fen, key_history, movetime = job
+            logic = ChessLogic(fen)
+            logic.key_history = key_history
+            # Odd helpers skip depth 1 so the processes spread over different iterations
+            result = engine.search(
+                logic,
+                depth=MAX_PLY,
+                movetime=movetime,
+                stop=lambda: control[0] != job_id,
+                first_depth=1 + index % 2,
+            )
+            results.put((job_id, result.nodes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tt.close()
+
+
+class ParallelEngine:
+    """Engine-compatible search running on `workers` processes (the caller's process included).
+
+    Helper processes are started once and reused for every search, so a move costs no
+    process start-up. Call close() (or use it as a context manager) to stop them.
+    """
+
+    def __init__(self, workers=None, tt_size=1 << 20):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.tt = SharedTranspositionTable(tt_size)
+        self.engine = Engine(tt=self.tt)
+        self.job_id = 0
+        self.results = mp.Queue()
+        self.helpers = []
+        for index in range(1, self.workers):
+            jobs = mp.Queue()
+            process = mp.Process(
+                target=_helper,
+                args=(index, self.tt.shm.name, self.tt.size, jobs, self.results),
+                daemon=True,
+            )
+            process.start()
+            self.helpers.append((process, jobs))
+
+    def search(self, logic, depth=None, movetime=None, nodes=None, on_iteration=None):
+        """Same arguments and SearchResult as Engine.search; nodes/nps count all processes."""
+        self.job_id += 1
+        job_id = self.job_id
+        self.tt.control[0] = job_id
+        job = (job_id, logic.fen(), list(logic.key_history), movetime)
+        for _, jobs in self.helpers:
+            jobs.put(job)
+        start = time.perf_counter()
+        try:
+            result = self.engine.search(
+                logic, depth=depth, movetime=movetime, nodes=nodes, on_iteration=on_iteration
+            )
+        finally:
+            self.tt.control[0] = 0
+        total = result.nodes
+        pending = len(self.helpers)
+        while pending:
+            finished_id, helper_nodes = self.results.get()
+            # Results of an interrupted earlier search are dropped
+            if finished_id == job_id:
+                total += helper_nodes
+                pending -= 1
+        seconds = time.perf_counter() - start
+        return result._replace(nodes=total, seconds=seconds, nps=int(total / seconds) if seconds > 0 else 0)
+
+    def close(self):
+        for _, jobs in self.helpers:
+            jobs.put(None)
+        for process, _ in self.helpers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.helpers = []
+        self.tt.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def bench(max_workers, depth, positions, tt_size):
+    """Time-to-depth for 1..max_workers processes; speedup is against the single-process run."""
+    rows = []
+    for workers in range(1, max_workers + 1):
+        with ParallelEngine(workers, tt_size) as engine:
+            seconds = 0.0
+            nodes = 0
+            for name, fen in positions:
+                # Every position starts from an empty table so runs are comparable
+                engine.tt.clear()
+                result = engine.search(ChessLogic(fen), depth=depth)
+                seconds += result.seconds
+                nodes += result.nodes
+        row = {
+            "workers": workers,
+            "seconds": round(seconds, 3),
+            "nodes": nodes,
+            "nps": int(nodes / seconds) if seconds > 0 else 0,
+            "speedup": round(rows[0]["seconds"] / seconds, 2) if rows and seconds > 0 else 1.0,
+        }
+        rows.append(row)
+        print(
+            f"{workers:>3} workers  {row['seconds']:>8.2f}s  {nodes:>10} nodes  "
+            f"{row['nps']:>9} nps  x{row['speedup']:.2f}"
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel (Lazy SMP) search with a shared hash table")
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to search with")
+    parser.add_argument("--depth", type=int, help="maximum search depth")
+    parser.add_argument("--movetime", type=float, help="time budget in seconds")
+    parser.add_argument("--tt-size", type=int, default=1 << 20, help="hash table slots (power of two)")
+    parser.add_argument("--bench", action="store_true", help="measure scaling from 1 to --max-workers")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--position",
+        action="append",
+        choices=[name for name, _, _ in POSITIONS],
+        help="benchmark position (repeatable, default: all)",
+    )
+    parser.add_argument("--output", help="write benchmark results to this JSON file")
+    args = parser.parse_args()
+
+    if args.bench:
+        depth = args.depth or 6
+        positions = [(name, fen) for name, fen, _ in POSITIONS if not args.position or name in args.position]
+        print(f"Time to depth {depth} over {len(positions)} positions")
+        rows = bench(args.max_workers, depth, positions, args.tt_size)
+        if args.output:
+            report = {
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "depth": depth,
+                "positions": [name for name, _ in positions],
+                "results": rows,
+            }
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        return
+
+    with ParallelEngine(args.workers, args.tt_size) as engine:
+        result = engine.search(
+            ChessLogic(args.fen), depth=args.depth, movetime=args.movetime, on_iteration=print_info
+        )
+    print(f"bestmove {move_to_uci(result.move) if result.move else '(none)'}")
+    print(f"{result.nodes} nodes in {result.seconds:.2f}s ({result.nps} nps, {args.workers} processes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""Perft benchmark and correctness check for the move generators in this repo.
+
+Counts leaf nodes of the legal move tree for standard test positions, reports
+nodes per second and compares the counts with python-chess and with the
+published reference values. Results can be written as JSON so runs can be diffed.
+
+By default only the gpt generator runs. The GUI generators (offline, legacy) skip
+rules on purpose, so their counts differ from the reference. Run them by name to
+measure them; their mismatches are reported but do not fail the run.
+
+    python perft.py --depth 3
+    python perft.py --generator gpt --depth 4 --output perft.json
+    python perft.py --generator offline --generator legacy
+"""
+
+import argparse
+import copy
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+
+from chess_logic import ChessLogic, move_to_uci
+
+try:
+    import chess  # python-chess, the reference implementation
+except ImportError:
+    chess = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHESSSERVER_DIR = os.path.dirname(HERE)
+
+# Standard perft positions with their reference node counts for depth 1, 2, 3, ...
+POSITIONS = [
+    (
+        "startpos",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        [20, 400, 8902, 197281, 4865609],
+    ),
+    (
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603],
+    ),
+    (
+        "endgame",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238, 674624],
+    ),
+    (
+        "promotions",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333],
+    ),
+    (
+        "talkchess",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379, 2103487],
+    ),
+    (
+        "middlegame",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594],
+    ),
+]
+
+
+def square_name(row, col):
+    """(row, col) with row 0 = rank 8 -> 'e4' style name."""
+    return "abcdefgh"[col] + str(8 - row)
+
+
+def load_module(name, filename):
+    """Import a sibling script by path, so chessserver/chess.py can't shadow python-chess."""
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class GptGenerator:
+    """chessserver/gpt/chess_logic.py: ChessLogic.legal_moves + make/unmake on packed moves."""
+
+    name = "gpt"
+    # Expected to match the reference counts; a mismatch fails the run
+    exact = True
+
+    def __init__(self, fen):
+        self.logic = ChessLogic(fen)
+
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        logic = self.logic
+        moves = logic.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            undo = logic.make(move)
+            nodes += self.perft(depth - 1)
+            logic.unmake(move, undo)
+        return nodes
+
+    def divide(self, depth):
+        logic = self.logic
+        result = {}
+        for move in logic.legal_moves():
+            undo = logic.make(move)
+            result[move_to_uci(move)] = self.perft(depth - 1)
+            logic.unmake(move, undo)
+        return result
+
+
+class OfflineGenerator:
+    """chessserver/stable_full_chess_offline.py: get_possible_moves + filter_legal_moves.
+
+    The offline GUI has no castling and picks the promotion piece interactively,
+    so a promotion counts as a single move here and always makes a queen.
+    """
+
+    name = "offline"
+    exact = False
+    module = None
+
+    def __init__(self, fen):
+        if OfflineGenerator.module is None:
+            OfflineGenerator.module = load_module(
+                "stable_full_chess_offline",
+                os.path.join(CHESSSERVER_DIR, "stable_full_chess_offline.py"),
+            )
+        # Only the rules methods are used, so skip the Tk setup in __init__
+        self.gui = OfflineGenerator.module.ChessGUI.__new__(
+            OfflineGenerator.module.ChessGUI
+        )
+        logic = ChessLogic(fen)
+        self.gui.board = [row[:] for row in logic.board]
+        self.gui.turn = logic.turn
+        # The GUI tracks its kings from __init__ on; is_in_check and is_legal_move use that
+        self.gui.king_pos = {
+            color: self.gui.find_king(self.gui.board, color) for color in ("white", "black")
+        }
+        self.gui.en_passant_target = None
+        if logic.en_passant_target:
+            ep_r, ep_c = logic.en_passant_target
+            self.gui.en_passant_target = (ep_c, ep_r)
+
+    def legal_moves(self):
+        gui = self.gui
+        is_white = gui.turn == "white"
+        moves = []
+        for y in range(8):
+            for x in range(8):
+                piece = gui.board[y][x]
+                if piece and piece.isupper() == is_white:
+                    for target in gui.filter_legal_moves(piece, (x, y)):
+                        moves.append((piece, (x, y), target))
+        return moves
+
+    def push(self, move):
+        gui = self.gui
+        piece, (sx, sy), (tx, ty) = move
+        state = (copy.deepcopy(gui.board), gui.turn, gui.en_passant_target, dict(gui.king_pos))
+        if piece.lower() == "p" and (tx, ty) == gui.en_passant_target:
+            gui.board[sy][tx] = None
+        gui.board[ty][tx] = piece
+        gui.board[sy][sx] = None
+        if piece.lower() == "p" and ty in (0, 7):
+            gui.board[ty][tx] = "Q" if piece.isupper() else "q"
+        if piece.lower() == "p" and abs(ty - sy) == 2:
+            gui.en_passant_target = (sx, (sy + ty) // 2)
+        else:
+            gui.en_passant_target = None
+        if piece.lower() == "k":
+            gui.king_pos[gui.turn] = (tx, ty)
+        gui.turn = "black" if gui.turn == "white" else "white"
+        return state
+
+    def pop(self, state):
+        gui = self.gui
+        gui.board, gui.turn, gui.en_passant_target, gui.king_pos = state
+
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            state = self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop(state)
+        return nodes
+
+    def divide(self, depth):
+        result = {}
+        for move in self.legal_moves():
+            piece, (sx, sy), (tx, ty) = move
+            state = self.push(move)
+            result[square_name(sy, sx) + square_name(ty, tx)] = self.perft(depth - 1)
+            self.pop(state)
+        return result
+
+
+class LegacyGenerator:
+    """chessserver/chess.py: ChessLogic.get_legal_moves (pseudo-legal, no special moves)."""
+
+    name = "legacy"
+    exact = False
+    module = None
+
+    def __init__(self, fen):
+        if LegacyGenerator.module is None:
+            LegacyGenerator.module = load_module(
+                "chessserver_chess", os.path.join(CHESSSERVER_DIR, "chess.py")
+            )
+        logic = ChessLogic(fen)
+        board = [[piece or "" for piece in row] for row in logic.board]
+        self.logic = LegacyGenerator.module.ChessLogic(brd=board)
+        self.white = logic.turn == "white"
+
+    def legal_moves(self):
+        board = self.logic.board
+        moves = []
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece and piece.isupper() == self.white:
+                    found = self.logic.get_legal_moves(row, col)
+                    for target in found["move"] + found["capture"]:
+                        moves.append(((row, col), target))
+        return moves
+
+    def push(self, move):
+        board = self.logic.board
+        (fr, fc), (tr, tc) = move
+        captured = board[tr][tc]
+        board[tr][tc] = board[fr][fc]
+        board[fr][fc] = ""
+        self.white = not self.white
+        return captured
+
+    def pop(self, move, captured):
+        board = self.logic.board
+        (fr, fc), (tr, tc) = move
+        board[fr][fc] = board[tr][tc]
+        board[tr][tc] = captured
+        self.white = not self.white
+
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            captured = self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop(move, captured)
+        return nodes
+
+    def divide(self, depth):
+        result = {}
+        for move in self.legal_moves():
+            captured = self.push(move)
+            result[square_name(*move[0]) + square_name(*move[1])] = self.perft(depth - 1)
+            self.pop(move, captured)
+        return result
+
+
+class PythonChessGenerator:
+    """python-chess, used as the reference for the other generators."""
+
+    name = "python-chess"
+    exact = True
+
+    def __init__(self, fen):
+        self.board = chess.Board(fen)
+
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        board = self.board
+        if depth == 1:
+            return board.legal_moves.count()
+        nodes = 0
+        for move in board.legal_moves:
+            board.push(move)
+            nodes += self.perft(depth - 1)
+            board.pop()
+        return nodes
+
+    def divide(self, depth):
+        result = {}
+        for move in self.board.legal_moves:
+            self.board.push(move)
+            result[move.uci()] = self.perft(depth - 1)
+            self.board.pop()
+        return result
+
+
+GENERATORS = {
+    "gpt": GptGenerator,
+    "offline": OfflineGenerator,
+    "legacy": LegacyGenerator,
+    "python-chess": PythonChessGenerator,
+}
+
+
+def timed_perft(generator, depth):
+    """Run perft at the given depth; returns (nodes, seconds)."""
+    start = time.perf_counter()
+    nodes = generator.perft(depth)
+    return nodes, time.perf_counter() - start
+
+
+def divide_diff(name, fen, depth):
+    """Root moves whose subtree counts differ from python-chess (useful to locate a bug)."""
+    ours = GENERATORS[name](fen).divide(depth)
+    reference = PythonChessGenerator(fen).divide(depth)
+    diff = {}
+    for uci in sorted(set(ours) | set(reference)):
+        if ours.get(uci) != reference.get(uci):
+            diff[uci] = {"nodes": ours.get(uci), "python_chess": reference.get(uci)}
+    return diff
+
+
+def run(generators, depth, positions, compare=True):
+    """Run every generator over every position for depths 1..depth; returns result records."""
+    results = []
+    for pos_name, fen, expected in positions:
+        reference = {}
+        for name in generators:
+            for d in range(1, depth + 1):
+                try:
+                    nodes, seconds = timed_perft(GENERATORS[name](fen), d)
+                except Exception as e:
+                    results.append(
+                        {"generator": name, "position": pos_name, "depth": d, "error": repr(e)}
+                    )
+                    print(f"{name:13s} {pos_name:11s} d{d} error: {e!r}")
+                    break
+                record = {
+                    "generator": name,
+                    "position": pos_name,
+                    "fen": fen,
+                    "depth": d,
+                    "nodes": nodes,
+                    "seconds": round(seconds, 6),
+                    "nps": int(nodes / seconds) if seconds > 0 else None,
+                    "expected": expected[d - 1] if d <= len(expected) else None,
+                }
+                if compare and chess is not None and name != "python-chess":
+                    if d not in reference:
+                        reference[d] = PythonChessGenerator(fen).perft(d)
+                    record["python_chess"] = reference[d]
+                reference_nodes = record.get("python_chess", record["expected"])
+                record["ok"] = None if reference_nodes is None else nodes == reference_nodes
+                if record["ok"] is False:
+                    record["divide_diff"] = (
+                        divide_diff(name, fen, d) if chess is not None and d > 1 else None
+                    )
+                results.append(record)
+                status = {True: "ok", False: "MISMATCH", None: "?"}[record["ok"]]
+                if record["ok"] is False and not GENERATORS[name].exact:
+                    status = "differs (known)"
+                print(
+                    f"{name:13s} {pos_name:11s} d{d} nodes={nodes:<10d} "
+                    f"{seconds:8.3f}s {record['nps'] or 0:>9d} nps  {status}"
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft benchmark for the chess move generators")
+    parser.add_argument("--depth", type=int, default=3, help="maximum depth (default 3)")
+    parser.add_argument(
+        "--generator",
+        action="append",
+        choices=sorted(GENERATORS),
+        help="generator to run, may be repeated (default: gpt)",
+    )
+    parser.add_argument(
+        "--position",
+        action="append",
+        choices=[name for name, _, _ in POSITIONS],
+        help="test position, may be repeated (default: all)",
+    )
+    parser.add_argument("--fen", help="run a custom position instead of the standard set")
+    parser.add_argument("--no-compare", action="store_true", help="skip the python-chess cross-check")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    generators = args.generator or ["gpt"]
+    if args.fen:
+        positions = [("custom", args.fen, [])]
+    elif args.position:
+        positions = [p for p in POSITIONS if p[0] in args.position]
+    else:
+        positions = POSITIONS
+    if chess is None and not args.no_compare:
+        print("python-chess is not installed, comparing against reference counts only")
+
+    results = run(generators, args.depth, positions, compare=not args.no_compare)
+    if args.output:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "depth": args.depth,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    failed = [
+        r
+        for r in results
+        if GENERATORS[r["generator"]].exact and (r.get("ok") is False or "error" in r)
+    ]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
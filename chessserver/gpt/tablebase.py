@@ -0,0 +1,149 @@
+"""Syzygy endgame tablebase probing for ChessLogic and python-chess boards.
+
+Needs python-chess (chess.syzygy reads and memory-maps the .rtbw/.rtbz files).
+Results are cached in LRU caches keyed by the Zobrist key, because the engine and
+the server probe the same few endgame positions over and over.
+
+WDL values are from the side to move: 2 win, 1 win spoiled by the 50-move rule,
+0 draw, -1 loss saved by the 50-move rule, -2 loss.
+"""
+
+from collections import OrderedDict
+
+from book import position_key
+from chess_logic import ChessLogic
+
+try:
+    import chess
+    import chess.syzygy
+except ImportError:
+    chess = None
+
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        try:
+            value = self.items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+
+# Stored in the caches for positions the tables cannot answer
+NO_RESULT = "none"
+
+
+class Tablebase:
+    """Probe Syzygy tables from one or more directories. Call close() when done."""
+
+    def __init__(self, paths, cache_size=1 << 16):
+        if chess is None:
+            raise RuntimeError("tablebase probing needs python-chess")
+        if isinstance(paths, str):
+            paths = [paths]
+        self.tables = chess.syzygy.Tablebase()
+        for path in paths:
+            self.tables.add_directory(path)
+        # "KQvK" -> 3 pieces; positions with more pieces are not probed at all
+        self.max_pieces = max((len(name) - 1 for name in self.tables.wdl), default=0)
+        self.wdl_cache = LRUCache(cache_size)
+        self.dtz_cache = LRUCache(cache_size)
+
+    def close(self):
+        self.tables.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def covers(self, position):
+        """True if position has few enough pieces and no castling rights."""
+        if isinstance(position, ChessLogic):
+            return not position.castling and 64 - position.squares.count(0) <= self.max_pieces
+        return not position.castling_rights and chess.popcount(position.occupied) <= self.max_pieces
+
+    @staticmethod
+    def to_board(position):
+        return chess.Board(position.fen()) if isinstance(position, ChessLogic) else position
+
+    def probe(self, position, cache, probe):
+        if not self.covers(position):
+            return None
+        key = position_key(position)
+        value = cache.get(key)
+        if value is None:
+            try:
+                value = probe(self.to_board(position))
+            except KeyError:
+                # Missing table
+                value = NO_RESULT
+            cache.put(key, value)
+        return None if value is NO_RESULT else value
+
+    def probe_wdl(self, position):
+        """WDL for a ChessLogic or python-chess board, or None if the tables don't cover it."""
+        return self.probe(position, self.wdl_cache, self.tables.probe_wdl)
+
+    def probe_dtz(self, position):
+        """Distance to the next capture or pawn move (signed like WDL), or None."""
+        return self.probe(position, self.dtz_cache, self.tables.probe_dtz)
+
+    def root_move(self, position):
+        """(uci, wdl) of the move that keeps the best result fastest, or None.
+        Winning: the shortest way to the next zeroing move; losing: the longest.
+        """
+        if not self.covers(position):
+            return None
+        board = self.to_board(position).copy(stack=False)
+        best = None
+        best_rank = None
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            try:
+                mate = board.is_checkmate()
+                wdl = self.probe_wdl(board)
+                dtz = self.probe_dtz(board)
+            finally:
+                board.pop()
+            if wdl is None or dtz is None:
+                return None
+            # Plies to the next zeroing move for us
+            distance = 1 if zeroing else abs(dtz) + 1
+            our_wdl = -wdl
+            if our_wdl > 0:
+                rank = (our_wdl, mate, -distance)
+            else:
+                rank = (our_wdl, False, distance)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = (move.uci(), our_wdl), rank
+        return best
+
+    def adjudicate(self, board):
+        """Game result string for a python-chess board if the tables settle it, else None."""
+        wdl = self.probe_wdl(board)
+        if wdl is None:
+            return None
+        if wdl == 2:
+            return "1-0" if board.turn else "0-1"
+        if wdl == -2:
+            return "0-1" if board.turn else "1-0"
+        # Draws, including wins the 50-move rule spoils
+        return "1/2-1/2"
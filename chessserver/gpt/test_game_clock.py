@@ -0,0 +1,41 @@
+from game_clock import TENTHS_BELOW, GameClock, format_clock
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def running_clock(left):
+    timer = FakeTimer()
+    clock = GameClock(left, timer=timer)
+    clock.start("white")
+    return clock, timer
+
+
+def test_next_change_whole_seconds():
+    clock, _ = running_clock(65.5)
+    assert abs(clock.next_change() - 0.5) < 1e-9
+
+
+def test_next_change_at_tenths_boundary():
+    clock, timer = running_clock(TENTHS_BELOW)
+    step = clock.next_change()
+    assert abs(step - 0.1) < 1e-9
+    before = format_clock(clock.left("white"))
+    timer.now += step
+    assert format_clock(clock.left("white")) != before
+
+
+def test_next_change_just_above_tenths():
+    clock, timer = running_clock(TENTHS_BELOW + 0.25)
+    assert abs(clock.next_change() - 0.25) < 1e-9
+    timer.now += 0.25
+    assert abs(clock.next_change() - 0.1) < 1e-9
+
+
+def test_next_change_stopped():
+    assert GameClock(60).next_change() is None
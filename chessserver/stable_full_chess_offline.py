@@ -3,7 +3,15 @@ from tkinter import Canvas, messagebox
 from PIL import Image, ImageTk
 import math
 import os
-import copy
+import sys
+
+# Модули gpt/ импортируются по имени: так game_clock находится и при запуске
+# этого файла, и когда его загружает gpt/perft.py
+GPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gpt")
+if GPT_DIR not in sys.path:
+    sys.path.append(GPT_DIR)
+
+from game_clock import GameClock, format_clock  # noqa: E402
 
 CELL_SIZE = 80
 BOARD_SIZE = 8
@@ -28,6 +36,11 @@ PIECE_MAP = {
     "k": "bk.png",
 }
 
+KNIGHT_STEPS = [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (1, -2), (-1, 2), (1, 2)]
+KING_STEPS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+
 
 class ChessGUI:
     def __init__(self, root, start_side="white", timer_seconds=15, increment=0):
@@ -51,14 +64,18 @@ class ChessGUI:
         self.promotion_choices = []
         self.promotion_pos = None
         self.halfmove_clock = 0
+        # Где стоят короли: обновляется при каждом ходе короля, чтобы не искать их по доске
+        self.king_pos = {"white": (4, 7), "black": (4, 0)}
 
-        # Таймеры
-        self.base_time = timer_seconds
-        self.white_time = self.base_time
-        self.black_time = self.base_time
+        # Таймеры: время считает GameClock по time.monotonic() на границах ходов,
+        # а update_timer только перерисовывает надпись, когда она должна измениться.
+        # Каждый ход начинается с timer_seconds (лимит на ход, а не на партию)
+        self.clock = GameClock(timer_seconds, increment, reset_each_move=True)
         self.timer_label = tk.Label(root, font=("Arial", 16))
         self.timer_label.pack()
+        self.timer_after = None
         self.active = True
+        self.clock.start(self.turn)
         self.update_timer()
 
         # Для взятия на проходе
@@ -71,41 +88,37 @@ class ChessGUI:
         self.draw_board()
 
     def update_timer(self):
+        self.timer_after = None
         if not self.active:
             return
-        if self.turn == "white":
-            self.white_time -= 1
-        else:
-            self.black_time -= 1
-
-        white_minutes, white_seconds = divmod(self.white_time, 60)
-        black_minutes, black_seconds = divmod(self.black_time, 60)
-        self.timer_label.config(
-            text=f"White: {white_minutes:02d}:{white_seconds:02d}   Black: {black_minutes:02d}:{black_seconds:02d}"
-        )
+        white = format_clock(self.clock.left("white"))
+        black = format_clock(self.clock.left("black"))
+        self.timer_label.config(text=f"White: {white}   Black: {black}")
 
-        if self.white_time <= 0:
-            self.white_time = 0
-            self.timer_label.config(
-                text=f"White: 00:00   Black: {self.black_time // 60:02d}:{self.black_time % 60:02d}"
-            )
+        flagged = self.clock.flagged()
+        if flagged:
+            self.clock.stop()
             self.active = False
             self.draw_board()
             self.root.update_idletasks()  # ОБНОВЛЯЕМ ИНТЕРФЕЙС ДО ПОКАЗА ОКНА
-            messagebox.showinfo("Время вышло", "Белые проиграли по времени")
-            return
-        elif self.black_time <= 0:
-            self.black_time = 0
-            self.timer_label.config(
-                text=f"White: {self.white_time // 60:02d}:{self.white_time % 60:02d}   Black: 00:00"
-            )
-            self.active = False
-            self.draw_board()
-            self.root.update_idletasks()  # ОБНОВЛЯЕМ ИНТЕРФЕЙС ДО ПОКАЗА ОКНА
-            messagebox.showinfo("Время вышло", "Черные проиграли по времени")
+            loser = "Белые" if flagged == "white" else "Черные"
+            messagebox.showinfo("Время вышло", f"{loser} проиграли по времени")
             return
 
-        self.root.after(1000, self.update_timer)
+        # Следующая перерисовка — ровно когда сменится показываемое значение
+        delay = int(self.clock.next_change() * 1000) + 1
+        self.timer_after = self.root.after(delay, self.update_timer)
+
+    def press_clock(self):
+        """Ход сделан: списываем время, добавляем инкремент и запускаем часы соперника."""
+        self.clock.press()
+        if self.timer_after is not None:
+            self.root.after_cancel(self.timer_after)
+        self.update_timer()
+
+    def end_game(self):
+        self.active = False
+        self.clock.stop()
 
     def load_images(self):
         for piece, filename in PIECE_MAP.items():
@@ -261,27 +274,83 @@ class ChessGUI:
                 ny += dy
         return moves
 
-    def is_in_check(self, board_state, color):
+    def find_king(self, board_state, color):
         king = "K" if color == "white" else "k"
-        king_pos = None
         for y in range(8):
             for x in range(8):
                 if board_state[y][x] == king:
-                    king_pos = (x, y)
-                    break
+                    return (x, y)
+        return None
+
+    def is_attacked(self, board_state, pos, by_white):
+        """Бьёт ли клетку pos хоть одна фигура стороны by_white.
+        Один проход от самой клетки: пешки, кони, король и лучи до первой фигуры.
+        """
+        x, y = pos
+        pawn, knight, bishop, rook, queen, king = "PNBRQK" if by_white else "pnbrqk"
+        # Белая пешка бьёт вверх, значит атакует клетку с ряда ниже
+        pawn_y = y + 1 if by_white else y - 1
+        if 0 <= pawn_y < 8:
+            for px in (x - 1, x + 1):
+                if 0 <= px < 8 and board_state[pawn_y][px] == pawn:
+                    return True
+        for dx, dy in KNIGHT_STEPS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < 8 and 0 <= ny < 8 and board_state[ny][nx] == knight:
+                return True
+        for dx, dy in KING_STEPS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < 8 and 0 <= ny < 8 and board_state[ny][nx] == king:
+                return True
+        for directions, sliders in (
+            (ROOK_DIRECTIONS, (rook, queen)),
+            (BISHOP_DIRECTIONS, (bishop, queen)),
+        ):
+            for dx, dy in directions:
+                nx, ny = x + dx, y + dy
+                while 0 <= nx < 8 and 0 <= ny < 8:
+                    target = board_state[ny][nx]
+                    if target:
+                        if target in sliders:
+                            return True
+                        break
+                    nx += dx
+                    ny += dy
+        return False
+
+    def is_in_check(self, board_state, color):
+        if board_state is self.board:
+            king_pos = self.king_pos[color]
+        else:
+            king_pos = self.find_king(board_state, color)
         if not king_pos:
             return False
-        for y in range(8):
-            for x in range(8):
-                piece = board_state[y][x]
-                if piece and (
-                    (piece.islower() and color == "white")
-                    or (piece.isupper() and color == "black")
-                ):
-                    if king_pos in self.get_possible_moves(piece, (x, y), board_state):
-                        return king_pos
+        if self.is_attacked(board_state, king_pos, color == "black"):
+            return king_pos
         return False
 
+    def is_legal_move(self, piece, pos, move):
+        """Делает ход прямо на доске, проверяет шах своему королю и возвращает всё назад."""
+        (sx, sy), (tx, ty) = pos, move
+        board = self.board
+        captured = board[ty][tx]
+        # Взятие на проходе снимает пешку с соседней клетки, а не с клетки хода
+        en_passant = piece.lower() == "p" and move == self.en_passant_target and not captured
+        if en_passant:
+            passed = board[sy][tx]
+            board[sy][tx] = None
+        board[ty][tx] = piece
+        board[sy][sx] = None
+        try:
+            color = "white" if piece.isupper() else "black"
+            king_pos = move if piece.lower() == "k" else self.king_pos[color]
+            return not king_pos or not self.is_attacked(board, king_pos, color == "black")
+        finally:
+            board[sy][sx] = piece
+            board[ty][tx] = captured
+            if en_passant:
+                board[sy][tx] = passed
+
     def is_checkmate_or_stalemate(self):
         for y in range(8):
             for x in range(8):
@@ -290,12 +359,8 @@ class ChessGUI:
                     (self.turn == "white" and piece.isupper())
                     or (self.turn == "black" and piece.islower())
                 ):
-                    moves = self.get_possible_moves(piece, (x, y))
-                    for move in moves:
-                        new_board = copy.deepcopy(self.board)
-                        new_board[move[1]][move[0]] = piece
-                        new_board[y][x] = None
-                        if not self.is_in_check(new_board, self.turn):
+                    for move in self.get_possible_moves(piece, (x, y)):
+                        if self.is_legal_move(piece, (x, y), move):
                             return None
         if self.is_in_check(self.board, self.turn):
             return "Checkmate"
@@ -303,15 +368,11 @@ class ChessGUI:
             return "Stalemate"
 
     def filter_legal_moves(self, piece, pos):
-        legal_moves = []
-        moves = self.get_possible_moves(piece, pos)
-        for move in moves:
-            new_board = copy.deepcopy(self.board)
-            new_board[move[1]][move[0]] = piece
-            new_board[pos[1]][pos[0]] = None
-            if not self.is_in_check(new_board, self.turn):
-                legal_moves.append(move)
-        return legal_moves
+        return [
+            move
+            for move in self.get_possible_moves(piece, pos)
+            if self.is_legal_move(piece, pos, move)
+        ]
 
     def on_click(self, event):
         x, y = self.pixel_to_cell(event.x, event.y)
@@ -326,12 +387,7 @@ class ChessGUI:
                     self.promotion_choices = []
                     self.turn = "black" if self.turn == "white" else "white"
                     self.check_pos = self.is_in_check(self.board, self.turn)
-
-                    # Сброс таймера после превращения
-                    if self.turn == "white":
-                        self.white_time = self.base_time
-                    else:
-                        self.black_time = self.base_time
+                    self.press_clock()
 
                     self.draw_board()
 
@@ -448,12 +504,9 @@ class ChessGUI:
                     captured = True
 
                 self.board[ty_final][tx_final] = self.selected_piece
-
-                # Инкремент времени
-                if self.turn == "white":
-                    self.white_time += self.increment
-                else:
-                    self.black_time += self.increment
+                if self.selected_piece.lower() == "k":
+                    color = "white" if self.selected_piece.isupper() else "black"
+                    self.king_pos[color] = (tx_final, ty_final)
 
                 # Правило 50 ходов - сбрасываем, если взятие или ход пешкой
                 if captured or self.selected_piece.lower() == "p":
@@ -481,12 +534,7 @@ class ChessGUI:
 
                 self.turn = "black" if self.turn == "white" else "white"
                 self.check_pos = self.is_in_check(self.board, self.turn)
-
-                # Сброс таймера на следующий ход
-                if self.turn == "white":
-                    self.white_time = self.base_time
-                else:
-                    self.black_time = self.base_time
+                self.press_clock()
 
                 self.draw_board()
 
@@ -496,7 +544,7 @@ class ChessGUI:
                     self.check_pos = self.is_in_check(self.board, self.turn)
                     self.reset_selection()
                     self.draw_board()
-                    self.active = False
+                    self.end_game()
                     self.root.after(
                         500,
                         lambda: messagebox.showinfo(
@@ -507,7 +555,7 @@ class ChessGUI:
                 elif result == "Stalemate":
                     self.reset_selection()
                     self.draw_board()
-                    self.active = False
+                    self.end_game()
                     self.root.after(
                         500, lambda: messagebox.showinfo("Игра окончена", "Пат. Ничья")
                     )
@@ -517,7 +565,7 @@ class ChessGUI:
                 if self.halfmove_clock >= 50:
                     self.reset_selection()
                     self.draw_board()
-                    self.active = False
+                    self.end_game()
                     self.root.after(
                         500,
                         lambda: messagebox.showinfo(